@@ -3,30 +3,147 @@
 不依赖 langgraph dev 和 langgraph_sdk
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
 from pydantic import BaseModel
-from typing import List, Dict, Any, AsyncGenerator
+from typing import Dict, Any, AsyncGenerator, AsyncIterator, Callable, List, Optional, Set, Tuple, cast
+from contextlib import asynccontextmanager
 import asyncio
+import functools
 import json
 import os
+import time
 from dotenv import load_dotenv
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.state import CompiledStateGraph
+from langchain_core.runnables import RunnableConfig
 
 # 导入我们的图和相关组件
-from react_agent.graph import graph
+from react_agent.graph import GRAPH_NAME, builder
+from react_agent.checkpointing import close_checkpointer, create_checkpointer
 from react_agent.context import Context
-from react_agent.state import InputState
-from react_agent.tools import TOOLS
-from langchain_core.messages import HumanMessage, AIMessage
+from react_agent.state import InputState, State
+from react_agent.tools import TOOLS, SEARCH_CACHE
+from react_agent import tool_output
+from react_agent.cancellation import CANCELLATION_STATS, RunCancelled, iterate_until
+from react_agent.prompt_cache import PROMPT_CACHE_STATS
+from react_agent.deadline import DEADLINE_STATS
+from react_agent.routing import MODEL_ROUTER
+from react_agent.response_cache import create_response_cache, is_complete_answer, response_cache_key
+from react_agent.startup import StartupStatus, warm_up, warmup_models
+from react_agent.conversations import (
+    ConversationStore,
+    InMemoryConversationStore,
+    create_conversation_store,
+)
+from react_agent.rate_limit import RATE_LIMITER
+from react_agent.metrics import METRICS_HANDLER, SSE_BYTES, render_metrics
+from react_agent.admission import AdmissionRejected, Ticket, create_admission_controller
+from react_agent.batch import BATCH_MAX_CONCURRENCY, run_batch
+from react_agent.sse import (
+    RunStream,
+    coalesce,
+    coalesce_settings,
+    create_stream_registry,
+    parse_event_id,
+)
+from react_agent.multiplex import Multiplexer
+from react_agent.jobs import Job, JobEvent, WorkerPool, create_job_queue, create_worker_pool
+from react_agent.profiling import (
+    Profile,
+    ProfilingCallbackHandler,
+    create_profile,
+    finish_profile,
+    profile_section,
+    requested_mode,
+)
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage
 
 # 加载环境变量
 load_dotenv()
 
+# 带检查点的图：按 conversation_id（thread_id）保存完整状态，每轮只需发送新消息。
+# CHECKPOINTER=memory（默认）或 sqlite（CHECKPOINT_DB_PATH 指定本地文件）
+checkpointer: Optional[BaseCheckpointSaver[Any]] = None
+agent_graph: Optional[CompiledStateGraph[State, Context, InputState, State]] = None
+
+async def get_agent_graph() -> CompiledStateGraph[State, Context, InputState, State]:
+    """
+    获取带检查点的图，首次调用时创建检查点存储并编译
+    """
+    global checkpointer, agent_graph
+    if agent_graph is None:
+        checkpointer = await create_checkpointer()
+        agent_graph = builder.compile(checkpointer=checkpointer, name=GRAPH_NAME)
+        # 内存检查点会保留每个线程的全部状态：对话被内存对话存储淘汰时一并删除，
+        # 否则检查点仍会无限增长
+        if isinstance(checkpointer, InMemorySaver) and isinstance(
+            conversation_store, InMemoryConversationStore
+        ):
+            conversation_store.on_evict = checkpointer.delete_thread
+    return agent_graph
+
+def thread_config(conversation_id: str, profile: Optional[Profile] = None) -> RunnableConfig:
+    """
+    将 conversation_id 映射为 LangGraph 的 thread_id，并挂上指标采集回调；
+    请求开启了性能分析时再挂上记录节点、模型和工具耗时的回调
+    """
+    callbacks: List[Any] = [METRICS_HANDLER]
+    if profile is not None:
+        callbacks.append(ProfilingCallbackHandler(profile))
+    return {
+        "configurable": {"thread_id": conversation_id},
+        "callbacks": callbacks
+    }
+
+# 后台任务：任务保存在本地 SQLite 队列（JOB_DB_PATH）中，由 JOB_WORKERS 个 worker 按优先级执行，
+# 重启后未完成的任务会重新排队
+job_pool: Optional[WorkerPool] = None
+
+def get_job_pool() -> WorkerPool:
+    """
+    获取后台任务的 worker 池，首次调用时打开任务队列并启动 worker
+    """
+    global job_pool
+    if job_pool is None:
+        job_pool = create_worker_pool(create_job_queue(), run_chat_job)
+        recovered = job_pool.start()
+        if recovered:
+            print(f"重新排队 {recovered} 个中断的后台任务")
+    return job_pool
+
+# 启动状态：/api/health 只反映进程存活（liveness）；/api/ready 在图编译完成、
+# 预热模型的 provider 集成导入完成后才返回 200（readiness），编排平台据此决定何时切入流量
+startup = StartupStatus()
+warmup_task: Optional["asyncio.Task[None]"] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    global job_pool, warmup_task
+    await get_agent_graph()
+    get_job_pool()
+    # 预热在后台进行：服务立即开始监听，存活检查马上通过，就绪检查等预热结束
+    warmup_task = asyncio.create_task(warm_up(startup, warmup_models()))
+    yield
+    # 关闭期间不再接收新流量
+    startup.ready = False
+    if not warmup_task.done():
+        warmup_task.cancel()
+    if job_pool is not None:
+        await job_pool.stop()
+        job_pool.queue.close()
+        job_pool = None
+    if checkpointer is not None:
+        await close_checkpointer(checkpointer)
+
 app = FastAPI(
     title="LangGraph React Agent API (Direct)",
     description="直接调用 LangGraph React Agent 大模型能力，无需 langgraph dev",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 添加 CORS 中间件
@@ -44,6 +161,17 @@ class ChatRequest(BaseModel):
     conversation_id: str = "default"
     model: str = "openai/gpt-4o-mini"  # 可选：指定模型
     max_search_results: int = 10  # 可选：指定搜索结果数量
+    deadline_seconds: Optional[float] = None  # 可选：本次请求的时间预算（秒），快到时不再调用工具而直接回答
+
+# 未指定 deadline_seconds 时的默认时间预算（秒），0 表示不限制
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "0"))
+
+def request_deadline(request: ChatRequest) -> float:
+    """
+    把请求的时间预算换算为 Context.deadline（Unix 时间），没有预算时为 0
+    """
+    budget = request.deadline_seconds if request.deadline_seconds is not None else CHAT_DEADLINE_SECONDS
+    return time.time() + budget if budget > 0 else 0.0
 
 # 响应模型
 class ChatResponse(BaseModel):
@@ -51,229 +179,806 @@ class ChatResponse(BaseModel):
     conversation_id: str
     status: str = "success"
     model_used: str
+    tool_output_savings: Optional[Dict[str, int]] = None  # 本次请求工具输出压缩节省的字节/token
+    profile: Optional[Dict[str, Any]] = None  # 开启性能分析时：inline 为 Chrome trace，file 为文件路径和摘要
+    routing: Optional[List[Dict[str, Any]]] = None  # 配置了备用模型时：本轮每次模型调用的路由决策（实际模型、是否对冲、切换记录）
+    cached: bool = False  # 是否直接返回了首轮问答缓存中的回答
+
+# 批量请求模型：每一项是一个独立的单轮对话，不读写对话历史
+class BatchItem(BaseModel):
+    message: str
+    id: Optional[str] = None  # 可选：调用方自定义的标识，原样返回
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchItem]
+    model: str = "openai/gpt-4o-mini"
+    max_search_results: int = 10
+    max_concurrency: Optional[int] = None  # 可选：批内并发数，不超过 BATCH_MAX_CONCURRENCY
+
+# 后台任务请求模型
+class JobRequest(ChatRequest):
+    priority: int = 0  # 可选：数值越大越先执行
+
+# 单个批量请求最多包含的条目数
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+# 准入控制：限制同时运行的图数量（可按模型单独限制），超出的请求排队等待，
+# 队列已满或等待超时时立即返回 429/503 并附带 Retry-After
+admission = create_admission_controller()
+
+async def admit_run(model: str, slots: int = 1, partial: bool = False) -> Ticket:
+    """
+    为本次运行申请执行名额（批量请求按批内并发数申请多个，partial 时只取当前空闲的名额，至少一个），
+    无法获得时转换为带 Retry-After 的 HTTP 错误
+    """
+    try:
+        return await admission.acquire(model, slots, partial)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"服务繁忙（{e.reason}），请稍后重试",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def start_profile(http_request: Request, name: str) -> Tuple[Optional[Profile], Optional[str]]:
+    """
+    按 X-Profile 请求头（或 PROFILE_REQUESTS 环境变量）决定是否分析本次请求，
+    返回 (profile, mode)，未开启时均为 None
+    """
+    mode = requested_mode(http_request.headers.get("X-Profile"))
+    if mode is None:
+        return None, None
+    return create_profile(name), mode
+
+async def admit_profiled_run(model: str, profile: Optional[Profile]) -> Ticket:
+    """
+    申请执行名额，开启性能分析时把排队等待记为一个 wait 区间
+    """
+    if profile is None:
+        return await admit_run(model)
+    with profile.section("admission.wait", "wait", model=model):
+        return await admit_run(model)
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    流式响应结束（包括客户端断开）后释放执行名额
+    """
+    def __init__(self, *args: Any, ticket: Ticket, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
 
-# 存储对话历史的简单字典（生产环境建议使用数据库）
-conversation_history: Dict[str, List[Dict[str, str]]] = {}
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+# 对话历史存储：CONVERSATION_STORE=memory（默认，有容量上限的 LRU）或 sqlite（WAL，可多进程共享）
+conversation_store: ConversationStore = create_conversation_store()
+
+# 首轮问答的响应缓存（RESPONSE_CACHE_TTL > 0 时开启）：相同的开场问题直接返回缓存的回答，不再运行图
+response_cache = create_response_cache()
+
+async def lookup_response_cache(request: ChatRequest, http_request: Request) -> Tuple[Optional[str], Optional[str]]:
+    """
+    查找首轮问题的缓存回答，返回 (缓存键, 缓存的回答)。
+    缓存未开启或不是对话的第一轮时缓存键为 None；请求头 X-Response-Cache: bypass 跳过查找，但仍会缓存新的回答
+    """
+    if not response_cache.enabled:
+        return None, None
+    agent = await get_agent_graph()
+    state = await agent.aget_state({"configurable": {"thread_id": request.conversation_id}})
+    if state.values.get("messages"):
+        return None, None
+    key = response_cache_key(
+        request.message,
+        Context(model=request.model, max_search_results=request.max_search_results)
+    )
+    if http_request.headers.get("X-Response-Cache", "").lower() == "bypass":
+        return key, None
+    entry = response_cache.get(key)
+    return key, entry["response"] if entry else None
+
+async def record_cached_turn(request: ChatRequest, response: str) -> None:
+    """
+    把缓存命中的一轮问答写入对话历史和检查点，后续轮次与正常运行时一样能看到它
+    """
+    conversation_store.append(request.conversation_id, {"role": "human", "content": request.message})
+    conversation_store.append(request.conversation_id, {"role": "assistant", "content": response})
+    agent = await get_agent_graph()
+    # 只写入状态，不运行图；下一轮的新输入会从 call_model 正常开始
+    await agent.aupdate_state(
+        {"configurable": {"thread_id": request.conversation_id}},
+        {"messages": [HumanMessage(content=request.message), AIMessage(content=response)]}
+    )
 
 @app.get("/")
 async def root():
     return {
         "message": "LangGraph React Agent API 服务正在运行（直接调用模式）", 
-        "endpoints": ["/api/chat", "/api/chat/stream"],
+        "endpoints": ["/api/chat", "/api/chat/stream", "/api/chat/batch", "/api/jobs", "/api/ws", "/api/metrics"],
         "mode": "direct_graph_invoke",
         "streaming": "支持流式输出"
     }
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     聊天端点，直接调用 graph.invoke() 而不使用 langgraph dev
     """
+    # 命中首轮问答缓存时不需要执行名额，也不运行图
+    cache_key, cached = await lookup_response_cache(request, http_request)
+    if cached is not None:
+        await record_cached_turn(request, cached)
+        return ChatResponse(
+            response=cached,
+            conversation_id=request.conversation_id,
+            model_used=request.model,
+            cached=True
+        )
+    profile, profile_mode = start_profile(http_request, f"chat {request.conversation_id}")
+    ticket = await admit_profiled_run(request.model, profile)
+    if profile is not None:
+        profile.start()
     try:
-        # 获取或初始化对话历史
-        if request.conversation_id not in conversation_history:
-            conversation_history[request.conversation_id] = []
-        
-        # 添加用户消息到历史
-        conversation_history[request.conversation_id].append({
-            "role": "human",
-            "content": request.message
-        })
-        
-        # 准备输入数据 - 转换为 LangChain 消息格式
-        messages = []
-        for msg in conversation_history[request.conversation_id]:
-            if msg["role"] == "human":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
+        # 添加用户消息到历史（不存在的对话会自动创建）
+        with profile_section("conversation_store.append", "store"):
+            conversation_store.append(request.conversation_id, {
+                "role": "human",
+                "content": request.message
+            })
         
         # 创建上下文配置
         context = Context(
             model=request.model,
-            max_search_results=request.max_search_results
+            max_search_results=request.max_search_results,
+            deadline=request_deadline(request)
         )
         
-        # 准备输入状态
-        input_state = InputState(messages=messages)
+        # 准备输入状态：之前的消息（包括工具调用和结果）已由检查点保存，只发送本轮新消息
+        input_state = InputState(messages=[HumanMessage(content=request.message)])
+        agent = await get_agent_graph()
+        # 统计本次请求中工具输出压缩节省的字节和 token
+        savings = tool_output.track_request()
         
         # 直接调用图
         ai_response = ""
+        # 只缓存正常结束的回答：被时限或步数截断的回答不缓存
+        complete = False
+        routing: List[Dict[str, Any]] = []
         try:
             # 使用 graph.ainvoke() 直接调用，使用 context 参数
-            result = await graph.ainvoke(
+            result = await agent.ainvoke(
                 input_state,
+                config=thread_config(request.conversation_id, profile),
                 context=context
             )
             
-            # 从结果中提取 AI 响应
-            if "messages" in result and result["messages"]:
-                # 获取最后一条 AI 消息
-                for message in reversed(result["messages"]):
-                    if isinstance(message, AIMessage) and not message.tool_calls:
-                        ai_response = message.content
-                        break
-                    elif hasattr(message, 'type') and message.type == 'ai':
-                        ai_response = getattr(message, 'content', '')
-                        break
-                    elif isinstance(message, dict) and message.get('type') == 'ai':
-                        ai_response = message.get('content', '')
-                        break
+            # 从结果中提取 AI 响应（状态包含整个对话，只查看本轮用户消息之后的内容）
+            with profile_section("chat.extract_response"):
+                if "messages" in result and result["messages"]:
+                    turn_start = max(
+                        (i for i, m in enumerate(result["messages"]) if isinstance(m, HumanMessage)),
+                        default=0
+                    )
+                    routing = [
+                        m.response_metadata["routing"]
+                        for m in result["messages"][turn_start:]
+                        if isinstance(m, AIMessage) and "routing" in m.response_metadata
+                    ]
+                    # 获取最后一条 AI 消息
+                    for message in reversed(result["messages"][turn_start:]):
+                        if isinstance(message, AIMessage) and not message.tool_calls:
+                            ai_response = message.content
+                            complete = is_complete_answer(message)
+                            break
+                        elif hasattr(message, 'type') and message.type == 'ai':
+                            ai_response = getattr(message, 'content', '')
+                            break
+                        elif isinstance(message, dict) and message.get('type') == 'ai':
+                            ai_response = message.get('content', '')
+                            break
             
         except Exception as e:
             print(f"Graph 调用出错: {e}")
             ai_response = f"调用图时出错: {str(e)}"
+            cache_key = None
         
         # 如果没有获取到响应，使用默认消息
         if not ai_response:
             ai_response = "抱歉，我无法处理您的请求。"
+        elif cache_key is not None and complete:
+            response_cache.set(cache_key, {"response": ai_response})
         
         # 添加 AI 响应到历史
-        conversation_history[request.conversation_id].append({
-            "role": "assistant", 
-            "content": ai_response
-        })
+        with profile_section("conversation_store.append", "store"):
+            conversation_store.append(request.conversation_id, {
+                "role": "assistant", 
+                "content": ai_response
+            })
         
         return ChatResponse(
             response=ai_response,
             conversation_id=request.conversation_id,
             status="success",
-            model_used=request.model
+            model_used=request.model,
+            tool_output_savings=savings.as_dict(),
+            profile=await finish_profile(profile, profile_mode or "inline") if profile is not None else None,
+            routing=routing or None
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理请求时出错: {str(e)}")
+    finally:
+        ticket.release()
+        if profile is not None:
+            await profile.stop()
 
-async def generate_stream_response(
-    request: ChatRequest
-) -> AsyncGenerator[str, None]:
+def _chunk_text(message: AIMessage) -> str:
+    """
+    提取消息中的文本内容（保留 token 首尾空白，兼容 Anthropic 的内容块列表）
+    """
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        c if isinstance(c, str) else (c.get("text") or "")
+        for c in content
+        if isinstance(c, str) or c.get("type") == "text"
+    )
+
+async def wait_for_disconnect(http_request: Request) -> None:
     """
-    生成流式响应的异步生成器
+    等待客户端断开连接（请求体已读完，之后收到的只会是 http.disconnect）
     """
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+def _usage_tokens(message: AIMessage) -> int:
+    """
+    读取模型响应中上报的 token 总数
+    """
+    usage = message.usage_metadata
+    return usage["total_tokens"] if usage else 0
+
+async def generate_stream_events(
+    request: ChatRequest,
+    profile: Optional[Profile] = None,
+    profile_mode: Optional[str] = None,
+    stop: Optional["asyncio.Future[Any]"] = None,
+    cache_key: Optional[str] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    运行图并逐个产生流式事件（start、content、tool_call、tool_result、profile、done、error）
+
+    传入 stop 时在其完成后（例如运行无人跟随超过宽限期）取消正在运行的图；
+    传入 profile 时在 done 事件之前产生一个 profile 事件
+    """
+    if profile is not None:
+        profile.start()
     try:
-        # 获取或初始化对话历史
-        if request.conversation_id not in conversation_history:
-            conversation_history[request.conversation_id] = []
-        
-        # 添加用户消息到历史
-        conversation_history[request.conversation_id].append({
-            "role": "human",
-            "content": request.message
-        })
-        
-        # 准备输入数据 - 转换为 LangChain 消息格式
-        messages = []
-        for msg in conversation_history[request.conversation_id]:
-            if msg["role"] == "human":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
+        # 添加用户消息到历史（不存在的对话会自动创建）
+        with profile_section("conversation_store.append", "store"):
+            conversation_store.append(request.conversation_id, {
+                "role": "human",
+                "content": request.message
+            })
         
         # 创建上下文配置
         context = Context(
             model=request.model,
-            max_search_results=request.max_search_results
+            max_search_results=request.max_search_results,
+            deadline=request_deadline(request)
         )
         
-        # 准备输入状态
-        input_state = InputState(messages=messages)
+        # 准备输入状态：之前的消息（包括工具调用和结果）已由检查点保存，只发送本轮新消息
+        input_state = InputState(messages=[HumanMessage(content=request.message)])
+        agent = await get_agent_graph()
+        # 统计本次请求中工具输出压缩节省的字节和 token
+        savings = tool_output.track_request()
         
         # 发送开始事件
-        yield f"data: {json.dumps({'type': 'start', 'conversation_id': request.conversation_id, 'model': request.model})}\n\n"
+        yield {'type': 'start', 'conversation_id': request.conversation_id, 'model': request.model}
         
-        # 使用 graph.astream() 进行流式调用，但实现token级别的流式输出
+        # 使用 graph.astream() 的 messages 模式获取 call_model 的真实 token 流，
+        # 同时用 updates 模式获取每个节点的完整输出（工具调用、工具结果）
         full_response = ""
+        # 最终回答是否正常结束（没有被时限或步数截断），只缓存正常结束的回答
+        complete = False
+        # 按消息 id 记录已经流式发送的文本，用于在节点完成时补发未流式输出的内容
+        streamed_text: Dict[str, str] = {}
+        # 本次运行已消耗的 token，用于统计取消运行时避免的浪费
+        run_tokens = 0
+        # 配置了备用模型时，本轮每次模型调用的路由决策
+        routing: List[Dict[str, Any]] = []
+        # stop 完成时取消正在运行的图，包括进行中的模型和工具调用
+        if stop is not None:
+            # shield：结束时取消的是这里的等待，stop 由调用方负责取消
+            disconnected = asyncio.shield(stop)
+        else:
+            disconnected = asyncio.get_running_loop().create_future()
         try:
-            async for chunk in graph.astream(input_state, context=context):
-                # 处理每个流式块 - 注意数据结构是 {'call_model': {'messages': [...]}}
+            async for item in iterate_until(
+                agent.astream(
+                    input_state,
+                    config=thread_config(request.conversation_id, profile),
+                    context=context,
+                    stream_mode=["messages", "updates"],
+                ),
+                disconnected,
+            ):
+                # 多种 stream_mode 时每一项是 (mode, chunk)
+                mode, chunk = cast(Tuple[str, Any], item)
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    if metadata.get("langgraph_node") != "call_model":
+                        continue
+                    if not isinstance(message_chunk, AIMessageChunk):
+                        continue
+                    token = _chunk_text(message_chunk)
+                    if token:
+                        message_id = message_chunk.id or ""
+                        streamed_text[message_id] = streamed_text.get(message_id, "") + token
+                        yield {'type': 'content', 'content': token}
+                    continue
+
+                # 处理每个节点的完整输出 - 数据结构是 {'call_model': {'messages': [...]}}
                 for node_name, node_data in chunk.items():
-                    if "messages" in node_data and node_data["messages"]:
-                        for message in node_data["messages"]:
-                            if isinstance(message, AIMessage) and not message.tool_calls:
-                                # 这是一个完整的 AI 响应消息，需要模拟token级别的流式输出
-                                content = message.content
-                                if content:
-                                    # 将内容按字符分割，模拟token级别的流式输出
-                                    import time
-                                    for char in content:
-                                        yield f"data: {json.dumps({'type': 'content', 'content': char})}\n\n"
-                                        full_response += char
-                                        # 添加小延迟以模拟真实的流式输出
-                                        await asyncio.sleep(0.01)
-                            elif isinstance(message, AIMessage) and message.tool_calls:
-                                # 这是一个工具调用消息
-                                tool_calls = []
-                                for tool_call in message.tool_calls:
-                                    tool_calls.append({
-                                        'name': tool_call['name'],
-                                        'args': tool_call['args']
-                                    })
-                                yield f"data: {json.dumps({'type': 'tool_call', 'tools': tool_calls})}\n\n"
-                                
-                                # 执行工具调用
-                                for tool_call in message.tool_calls:
-                                    if tool_call['name'] == 'search':
-                                        # 如果参数为空，使用用户的消息作为查询
-                                        query = tool_call['args'].get('query') if tool_call['args'].get('query') else request.message
-                                        try:
-                                            from react_agent.tools import search
-                                            search_result = await search(query)
-                                            yield f"data: {json.dumps({'type': 'tool_result', 'content': str(search_result)})}\n\n"
-                                        except Exception as e:
-                                            yield f"data: {json.dumps({'type': 'tool_result', 'content': f'搜索出错: {str(e)}'})}\n\n"
-                            elif hasattr(message, 'type') and message.type == 'tool':
-                                # 工具执行结果
-                                yield f"data: {json.dumps({'type': 'tool_result', 'content': getattr(message, 'content', '')})}\n\n"
+                    if not node_data or not node_data.get("messages"):
+                        continue
+                    for message in node_data["messages"]:
+                        if isinstance(message, AIMessage):
+                            run_tokens += _usage_tokens(message)
+                            if "routing" in message.response_metadata:
+                                routing.append(message.response_metadata["routing"])
+                        if isinstance(message, AIMessage) and not message.tool_calls:
+                            # 最终回答：token 已经在 messages 模式中发送，
+                            # 这里只补发没有经过流式输出的部分（例如最后一步的替换消息）
+                            content = _chunk_text(message)
+                            already_sent = streamed_text.get(message.id or "", "")
+                            if content.startswith(already_sent):
+                                remainder = content[len(already_sent):]
+                            else:
+                                remainder = content
+                            if remainder:
+                                yield {'type': 'content', 'content': remainder}
+                            full_response = content
+                            complete = is_complete_answer(message)
+                        elif isinstance(message, AIMessage) and message.tool_calls:
+                            # 这是一个工具调用消息
+                            tool_calls = []
+                            for tool_call in message.tool_calls:
+                                tool_calls.append({
+                                    'id': tool_call.get('id'),
+                                    'name': tool_call['name'],
+                                    'args': tool_call['args']
+                                })
+                            yield {'type': 'tool_call', 'tools': tool_calls}
+                        elif isinstance(message, ToolMessage):
+                            # 工具执行结果：直接来自图中 tools 节点的输出，不在此重复执行工具
+                            yield {'type': 'tool_result', 'name': message.name, 'tool_call_id': message.tool_call_id, 'content': message.content}
+            
+            CANCELLATION_STATS.record_completed(run_tokens)
             
             # 添加 AI 响应到历史
             if full_response:
-                conversation_history[request.conversation_id].append({
-                    "role": "assistant", 
-                    "content": full_response
-                })
+                with profile_section("conversation_store.append", "store"):
+                    conversation_store.append(request.conversation_id, {
+                        "role": "assistant", 
+                        "content": full_response
+                    })
+                if cache_key is not None and complete:
+                    response_cache.set(cache_key, {"response": full_response})
+            
+            if profile is not None:
+                profile_data = await finish_profile(profile, profile_mode or "inline")
+                yield {'type': 'profile', 'profile': profile_data}
             
             # 发送完成事件
-            yield f"data: {json.dumps({'type': 'done', 'full_response': full_response})}\n\n"
+            done: Dict[str, Any] = {'type': 'done', 'full_response': full_response, 'tool_output_savings': savings.as_dict()}
+            if routing:
+                done['routing'] = routing
+            yield done
             
+        except (RunCancelled, GeneratorExit):
+            # 客户端已断开：图已被取消，不再写入历史，也不再发送任何事件
+            CANCELLATION_STATS.record_cancelled(run_tokens)
+            print(f"客户端已断开，取消对话 {request.conversation_id} 的运行")
+            raise
         except Exception as e:
             print(f"Graph 流式调用出错: {e}")
             error_msg = f"调用图时出错: {str(e)}"
-            yield f"data: {json.dumps({'type': 'error', 'error': error_msg})}\n\n"
+            yield {'type': 'error', 'error': error_msg}
             
             # 添加错误响应到历史
-            conversation_history[request.conversation_id].append({
+            conversation_store.append(request.conversation_id, {
                 "role": "assistant", 
                 "content": error_msg
             })
+        finally:
+            disconnected.cancel()
         
+    except RunCancelled:
+        return
     except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'error': f'处理请求时出错: {str(e)}'})}\n\n"
+        yield {'type': 'error', 'error': f'处理请求时出错: {str(e)}'}
+    finally:
+        if profile is not None:
+            await profile.stop()
+
+async def metered(stream: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+    """
+    统计流式响应发送的字节数
+    """
+    sent = 0
+    try:
+        async for frame in stream:
+            sent += len(frame.encode("utf-8"))
+            yield frame
+    finally:
+        SSE_BYTES.observe(sent)
+
+# 可续传的流式运行：每次运行的事件只产生一次，编号后放入有上限的回放缓冲区；
+# 断线重连时带上 Last-Event-ID 即可从断点继续，运行在无人连接时还会保留 STREAM_RESUME_GRACE_SECONDS 秒
+stream_registry = create_stream_registry()
+# 正在产生事件的后台任务，保持引用以免被垃圾回收
+stream_tasks: Set["asyncio.Task[None]"] = set()
+
+async def produce_stream(
+    stream: RunStream,
+    request: ChatRequest,
+    ticket: Ticket,
+    profile: Optional[Profile] = None,
+    profile_mode: Optional[str] = None,
+    cache_key: Optional[str] = None
+) -> None:
+    """
+    在后台运行图，把（合并后的）事件写入 stream；无人跟随超过宽限期时取消运行，运行结束后释放执行名额
+    """
+    window, max_bytes = coalesce_settings()
+    abandoned = asyncio.ensure_future(stream_registry.abandoned(stream))
+    try:
+        events = generate_stream_events(
+            request,
+            profile=profile,
+            profile_mode=profile_mode,
+            stop=abandoned,
+            cache_key=cache_key
+        )
+        async for event in coalesce(events, window, max_bytes):
+            stream.publish(event)
+    finally:
+        abandoned.cancel()
+        stream.close()
+        ticket.release()
+
+def event_stream_response(stream: RunStream, after: int = 0) -> StreamingResponse:
+    """
+    以 text/event-stream 发送 stream 中 id 大于 after 的事件，并持续跟随直到运行结束
+    """
+    return StreamingResponse(
+        metered(stream.follow(after)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "X-Run-Id": stream.run_id
+        }
+    )
 
 @app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     """
     流式聊天端点，使用 Server-Sent Events (SSE) 进行流式输出
+
+    每个事件带有 "<run_id>:<序号>" 形式的 id。连接中断后，带上 Last-Event-ID 请求头重新请求，
+    会从该事件之后继续发送，而不会重新运行图
+    """
+    last_event = parse_event_id(http_request.headers.get("Last-Event-ID"))
+    if last_event is not None:
+        run_id, after = last_event
+        stream = stream_registry.get(run_id)
+        if stream is None:
+            raise HTTPException(status_code=404, detail=f"运行 {run_id} 不存在或已过期")
+        if not stream.can_resume(after):
+            stream_registry.replay_gaps += 1
+            raise HTTPException(status_code=409, detail=f"事件 {after} 之后的内容已不在回放缓冲区中")
+        stream_registry.resumed += 1
+        return event_stream_response(stream, after)
+
+    # 命中首轮问答缓存时直接回放缓存的回答，不需要执行名额
+    cache_key, cached = await lookup_response_cache(request, http_request)
+    if cached is not None:
+        await record_cached_turn(request, cached)
+        stream = stream_registry.create()
+        stream.publish({'type': 'start', 'conversation_id': request.conversation_id, 'model': request.model})
+        stream.publish({'type': 'content', 'content': cached})
+        stream.publish({'type': 'done', 'full_response': cached, 'cached': True})
+        stream.close()
+        return event_stream_response(stream)
+
+    # 在开始响应之前完成准入，被拒绝时仍能返回 429/503 状态码
+    profile, profile_mode = start_profile(http_request, f"chat/stream {request.conversation_id}")
+    ticket = await admit_profiled_run(request.model, profile)
+    stream = stream_registry.create()
+    task = asyncio.ensure_future(produce_stream(stream, request, ticket, profile, profile_mode, cache_key))
+    stream_tasks.add(task)
+    task.add_done_callback(stream_tasks.discard)
+    return event_stream_response(stream)
+
+# WebSocket 多路复用：一个连接上同时运行多个对话，每个运行最多 WS_WINDOW 个未确认事件
+WS_WINDOW = int(os.getenv("WS_WINDOW", "64"))
+WS_MAX_RUNS = int(os.getenv("WS_MAX_RUNS", "32"))
+
+async def websocket_run_events(request: ChatRequest, stop: "asyncio.Future[None]") -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    WebSocket 上的一次运行：申请执行名额后产生与流式端点相同的事件，stop 完成时取消运行
+    """
+    try:
+        ticket = await admission.acquire(request.model)
+    except AdmissionRejected as e:
+        yield {
+            "type": "error",
+            "error": f"服务繁忙（{e.reason}），请稍后重试",
+            "status_code": e.status_code,
+            "retry_after": e.retry_after
+        }
+        return
+    try:
+        window, max_bytes = coalesce_settings()
+        async for event in coalesce(generate_stream_events(request, stop=stop), window, max_bytes):
+            yield event
+    finally:
+        ticket.release()
+
+@app.websocket("/api/ws")
+async def chat_websocket(websocket: WebSocket) -> None:
+    """
+    WebSocket 聊天端点：一个连接上可以同时进行多个对话
+
+    客户端消息（JSON）：
+    - {"type": "chat", "request_id": ..., 以及 /api/chat/stream 的请求字段}：开始一次运行
+    - {"type": "ack", "request_id": ..., "seq": n}：确认已处理该运行序号 n 及之前的事件
+    - {"type": "cancel", "request_id": ...}：取消该运行
+    服务端事件与流式端点相同（start、content、tool_call、tool_result、done、error），
+    另外带有 request_id 和该运行内递增的 seq；取消的运行以 cancelled 事件结束
+    """
+    await websocket.accept()
+    mux = Multiplexer(websocket.send_text, window=WS_WINDOW, max_runs=WS_MAX_RUNS)
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await mux.send({"type": "error", "error": "消息必须是 JSON 对象"})
+                continue
+            request_id = str(message.get("request_id") or message.get("conversation_id") or "default")
+            try:
+                if kind == "chat":
+                    request = ChatRequest(**{k: v for k, v in message.items() if k not in ("type", "request_id")})
+                    mux.start(request_id, functools.partial(websocket_run_events, request))
+                elif kind == "ack":
+                    mux.ack(request_id, int(message.get("seq", 0)))
+                elif kind == "cancel":
+                    if not mux.cancel(request_id):
+                        raise ValueError(f"运行 {request_id} 不存在或已结束")
+                else:
+                    raise ValueError(f"未知的消息类型: {kind}")
+            except (ValueError, TypeError) as e:
+                await mux.send({"type": "error", "request_id": request_id, "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # 连接断开时取消该连接上所有仍在进行的运行
+        await mux.close()
+
+def batch_concurrency(request: BatchChatRequest) -> int:
+    """
+    批内并发数：请求的 max_concurrency（不超过 BATCH_MAX_CONCURRENCY），且不超过条目数
+    """
+    requested = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    return max(min(requested, len(request.items)), 1)
+
+async def generate_batch_response(
+    request: BatchChatRequest,
+    http_request: Optional[Request] = None,
+    max_concurrency: Optional[int] = None
+) -> AsyncGenerator[str, None]:
+    """
+    按完成顺序逐行输出批量结果（NDJSON），单项失败只影响该项
+    """
+    context = Context(
+        model=request.model,
+        max_search_results=request.max_search_results
+    )
+    max_concurrency = max_concurrency or batch_concurrency(request)
+    # 客户端断开时取消整个批次中仍在运行的图
+    disconnected: "asyncio.Future[Any]"
+    if http_request is not None:
+        disconnected = asyncio.ensure_future(wait_for_disconnect(http_request))
+    else:
+        disconnected = asyncio.get_running_loop().create_future()
+    try:
+        async for result in iterate_until(
+            run_batch(
+                [item.message for item in request.items],
+                context,
+                max_concurrency=max_concurrency,
+                config={"callbacks": [METRICS_HANDLER]},
+            ),
+            disconnected,
+        ):
+            line = {
+                "index": result.index,
+                "id": request.items[result.index].id,
+                "status": "success" if result.ok else "error",
+                "response": result.response,
+                "error": result.error,
+            }
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    except RunCancelled:
+        print("客户端已断开，取消批量请求中仍在运行的项")
+    finally:
+        disconnected.cancel()
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request) -> StreamingResponse:
+    """
+    批量聊天端点：一次提交多个独立的提示词，通过 graph.abatch_as_completed 并发运行，
+    结果以 NDJSON 按完成顺序流式返回。批次按批内并发数占用准入名额（受全局和模型上限约束），
+    与同样数量的单个请求计入相同的上限；当前空闲名额不足时只占用空闲的名额（至少一个），
+    并按实际获得的名额降低批内并发，不会排在普通请求后面等待整批名额
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"批量请求最多包含 {BATCH_MAX_ITEMS} 项"
+        )
+    ticket = await admit_run(request.model, batch_concurrency(request), partial=True)
+    return AdmittedStreamingResponse(
+        generate_batch_response(request, http_request, ticket.slots),
+        ticket=ticket,
+        media_type="application/x-ndjson"
+    )
+
+async def admit_job_run(model: str) -> Ticket:
+    """
+    为后台任务申请执行名额，与 /api/chat 计入相同的上限；任务不急于返回，
+    因此队列已满或等待超时时按建议的 Retry-After 等待后重试，而不是让任务失败
+    """
+    while True:
+        try:
+            return await admission.acquire(model)
+        except AdmissionRejected as e:
+            await asyncio.sleep(e.retry_after)
+
+async def run_chat_job(job: Job, emit: Callable[[JobEvent], None]) -> Dict[str, Any]:
+    """
+    在 worker 中执行一个后台聊天任务：与 /api/chat 相同地读写对话历史和检查点，
+    并把工具调用和工具结果作为进度事件发布
+    """
+    request = ChatRequest(**job.payload)
+    conversation_store.append(request.conversation_id, {
+        "role": "human",
+        "content": request.message
+    })
+    context = Context(
+        model=request.model,
+        max_search_results=request.max_search_results,
+        deadline=request_deadline(request)
+    )
+    input_state = InputState(messages=[HumanMessage(content=request.message)])
+    agent = await get_agent_graph()
+    savings = tool_output.track_request()
+    full_response = ""
+    ticket = await admit_job_run(request.model)
+    try:
+        async for chunk in agent.astream(
+            input_state,
+            config=thread_config(request.conversation_id),
+            context=context,
+            stream_mode="updates",
+        ):
+            for node_name, node_data in chunk.items():
+                if not node_data or not node_data.get("messages"):
+                    continue
+                for message in node_data["messages"]:
+                    if isinstance(message, AIMessage) and message.tool_calls:
+                        emit({
+                            "type": "tool_call",
+                            "tools": [{"id": tc.get("id"), "name": tc["name"], "args": tc["args"]} for tc in message.tool_calls]
+                        })
+                    elif isinstance(message, AIMessage):
+                        full_response = _chunk_text(message)
+                    elif isinstance(message, ToolMessage):
+                        # 进度事件只包含工具名，完整结果留在检查点中
+                        emit({"type": "tool_result", "name": message.name, "tool_call_id": message.tool_call_id})
+    finally:
+        ticket.release()
+    if full_response:
+        conversation_store.append(request.conversation_id, {
+            "role": "assistant",
+            "content": full_response
+        })
+    return {
+        "response": full_response,
+        "conversation_id": request.conversation_id,
+        "model_used": request.model,
+        "tool_output_savings": savings.as_dict()
+    }
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest) -> Dict[str, Any]:
+    """
+    提交后台聊天任务，立即返回任务 id；通过 GET /api/jobs/{id} 轮询或订阅 /api/jobs/{id}/events
+    """
+    payload = request.model_dump(exclude={"priority"})
+    job = get_job_pool().submit(payload, priority=request.priority)
+    return {"job_id": job.id, "status": job.status, "priority": job.priority}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    查询后台任务的状态和结果
+    """
+    job = get_job_pool().queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在")
+    return job.as_dict()
+
+async def generate_job_events(pool: WorkerPool, job: Job) -> AsyncGenerator[str, None]:
+    """
+    先回放已记录的进度事件，再持续推送新事件，直到任务结束
     """
+    if job.done and not pool.events.history(job.id):
+        # 任务由其他进程或重启前执行，内存中没有事件记录，只发送最终状态
+        terminal = {"succeeded": "done", "failed": "error"}.get(job.status, job.status)
+        yield f"data: {json.dumps({'type': terminal, 'job_id': job.id, 'result': job.result, 'error': job.error}, default=str)}\n\n"
+        return
+    async for event in pool.events.subscribe(job.id):
+        yield f"data: {json.dumps(event, default=str)}\n\n"
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str) -> StreamingResponse:
+    """
+    订阅后台任务的进度事件（与流式聊天相同的 data: 格式），任务结束后连接关闭
+    """
+    pool = get_job_pool()
+    job = pool.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在")
     return StreamingResponse(
-        generate_stream_response(request),
+        generate_job_events(pool, job),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
             "Content-Type": "text/plain; charset=utf-8"
         }
     )
 
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Dict[str, str]:
+    """
+    取消排队中或正在本进程运行的后台任务
+    """
+    pool = get_job_pool()
+    if pool.queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在")
+    if pool.cancel(job_id):
+        return {"message": f"任务 {job_id} 已取消"}
+    return {"message": f"任务 {job_id} 已结束或正在其他进程中运行，无法取消"}
+
 @app.get("/api/chat/history/{conversation_id}")
 async def get_chat_history(conversation_id: str):
     """
     获取指定对话的历史记录
     """
-    if conversation_id not in conversation_history:
-        return {"messages": [], "conversation_id": conversation_id}
-    
     return {
-        "messages": conversation_history[conversation_id],
+        "messages": conversation_store.get(conversation_id),
         "conversation_id": conversation_id
     }
 
@@ -282,8 +987,10 @@ async def clear_chat_history(conversation_id: str):
     """
     清除指定对话的历史记录
     """
-    if conversation_id in conversation_history:
-        del conversation_history[conversation_id]
+    # 同时清除检查点中保存的图状态
+    if checkpointer is not None:
+        await checkpointer.adelete_thread(conversation_id)
+    if conversation_store.delete(conversation_id):
         return {"message": f"对话 {conversation_id} 的历史记录已清除"}
     else:
         return {"message": f"对话 {conversation_id} 不存在"}
@@ -296,9 +1003,50 @@ async def health_check():
     return {
         "status": "healthy",
         "mode": "direct_graph_invoke",
-        "graph_available": graph is not None
+        "graph_available": agent_graph is not None,
+        "startup": startup.as_dict(),
+        "search_cache": SEARCH_CACHE.stats.as_dict(),
+        "response_cache": response_cache.stats.as_dict(),
+        "tool_output_compaction": tool_output.TOTAL_STATS.as_dict(),
+        "prompt_cache": PROMPT_CACHE_STATS.as_dict(),
+        "cancellations": CANCELLATION_STATS.as_dict(),
+        "deadlines": DEADLINE_STATS.as_dict(),
+        "model_routing": MODEL_ROUTER.stats.as_dict(),
+        "admission": admission.as_dict(),
+        "rate_limits": RATE_LIMITER.as_dict(),
+        "jobs": job_pool.as_dict() if job_pool is not None else None,
+        "streams": stream_registry.as_dict()
     }
 
+@app.get("/api/ready")
+async def readiness_check() -> JSONResponse:
+    """
+    就绪检查端点：启动完成（图已编译、模型的 provider 集成已导入）后返回 200，
+    否则返回 503：启动中、预热失败（如 provider 集成未安装，附带原因）或正在关闭
+    """
+    if startup.ready:
+        status = "ready"
+    elif startup.errors:
+        status = "failed"
+    elif startup.ready_after_seconds is None:
+        status = "starting"
+    else:
+        status = "stopping"
+    return JSONResponse(
+        {"status": status, **startup.as_dict()},
+        status_code=200 if startup.ready else 503
+    )
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Prometheus 指标端点：节点/工具/模型耗时、首 token 延迟、迭代次数、token 数和流式响应字节数
+    """
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,6 +4,19 @@ This module defines a custom reasoning and action agent graph.
 It invokes tools in a simple loop.
 """
 
-from react_agent.graph import graph
+from typing import Any
+
+import react_agent.graph as _graph_module
+
+# Importing the submodule bound `react_agent.graph` to it. Unbind it so the
+# name resolves through `__getattr__` to the compiled graph, as it always has.
+globals().pop("graph", None)
+
+
+def __getattr__(name: str) -> Any:
+    if name == "graph":
+        return _graph_module.compile_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["graph"]
@@ -0,0 +1,301 @@
+"""Admission control for concurrent agent runs.
+
+`AdmissionController` caps how many runs execute at once, globally and
+optionally per model. Runs over the cap wait in a bounded FIFO queue for at most
+`queue_timeout` seconds; a new run does not pass an earlier waiter that is
+waiting for the slots it would take, except one held back only by its own
+model's limit. When the queue is full, or the wait times out, the run
+is rejected straight away with `AdmissionRejected`, which carries a suggested
+``Retry-After`` delay, instead of piling more load onto the model provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run cannot be admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int) -> None:
+        """Create the rejection.
+
+        Args:
+            status_code: HTTP status to answer with (429 or 503).
+            reason: Short machine-readable reason.
+            retry_after: Suggested seconds to wait before retrying.
+        """
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    model: str
+    future: asyncio.Future[None]
+    slots: int = 1
+
+
+@dataclass
+class AdmissionStats:
+    """Counters describing admission decisions and queueing."""
+
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    queued_total: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    run_seconds_avg: float = 0.0
+    """Exponentially weighted average run duration, used for Retry-After."""
+
+
+@dataclass
+class Ticket:
+    """Held run slots. Release them exactly once when the run ends."""
+
+    controller: AdmissionController
+    model: str
+    slots: int = 1
+    """Slots held; a batch holds one per prompt it runs at once."""
+    started_at: float = field(default_factory=time.monotonic)
+    released: bool = False
+
+    def release(self) -> None:
+        """Free the slots. Calling it again is a no-op."""
+        if not self.released:
+            self.released = True
+            self.controller._release(
+                self.model, time.monotonic() - self.started_at, self.slots
+            )
+
+
+class AdmissionController:
+    """Limit concurrent runs with a bounded, deadline-aware wait queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        model_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Create the controller.
+
+        Args:
+            max_concurrent: Runs allowed to execute at once. 0 disables the limit.
+            max_queue: Runs allowed to wait for a slot; more are rejected with 429.
+            queue_timeout: Seconds a run may wait before it is rejected with 503.
+            model_limits: Optional per-model caps, keyed by 'provider/model'.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.model_limits = dict(model_limits or {})
+        self.stats = AdmissionStats()
+        self._running = 0
+        self._running_by_model: Dict[str, int] = {}
+        self._waiters: Deque[_Waiter] = deque()
+
+    @property
+    def running(self) -> int:
+        """Runs currently executing."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Runs currently waiting for a slot."""
+        return sum(1 for w in self._waiters if not w.future.done())
+
+    def _fits(self, slots: int) -> bool:
+        return not self.max_concurrent or self._running + slots <= self.max_concurrent
+
+    def _model_fits(self, model: str, slots: int) -> bool:
+        limit = self.model_limits.get(model)
+        return not limit or self._running_by_model.get(model, 0) + slots <= limit
+
+    def _can_run(self, model: str, slots: int = 1) -> bool:
+        return self._fits(slots) and self._model_fits(model, slots)
+
+    def _queued_ahead(self, model: str) -> bool:
+        # A waiter held back only by its own model's limit does not hold back
+        # other models; any other waiter is ahead of a new run.
+        return any(
+            not w.future.done()
+            and (w.model == model or self._model_fits(w.model, w.slots))
+            for w in self._waiters
+        )
+
+    def _start(self, model: str, slots: int = 1) -> None:
+        self._running += slots
+        self._running_by_model[model] = self._running_by_model.get(model, 0) + slots
+
+    def _release(self, model: str, run_seconds: float, slots: int = 1) -> None:
+        self._running -= slots
+        self._running_by_model[model] -= slots
+        if self.stats.run_seconds_avg:
+            self.stats.run_seconds_avg = (
+                0.9 * self.stats.run_seconds_avg + 0.1 * run_seconds
+            )
+        else:
+            self.stats.run_seconds_avg = run_seconds
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # In arrival order: the first waiter the global limit cannot fit stops
+        # the dispatch, so a multi-slot waiter is not passed by smaller ones.
+        held: Set[str] = set()
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+            elif waiter.model in held:
+                continue
+            elif not self._fits(waiter.slots):
+                break
+            elif self._model_fits(waiter.model, waiter.slots):
+                self._waiters.remove(waiter)
+                self._start(waiter.model, waiter.slots)
+                waiter.future.set_result(None)
+            else:
+                held.add(waiter.model)
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds until a new run could start."""
+        slots = self.max_concurrent or 1
+        backlog = (self.queued + 1) / slots
+        return max(1, math.ceil(backlog * (self.stats.run_seconds_avg or 1.0)))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        if reason == "queue_full":
+            self.stats.rejected_queue_full += 1
+        else:
+            self.stats.rejected_timeout += 1
+        return AdmissionRejected(status_code, reason, self.retry_after())
+
+    def max_slots(self, model: str) -> int:
+        """Return the most slots one ticket for `model` can hold, or 0 for no cap."""
+        caps = [c for c in (self.max_concurrent, self.model_limits.get(model)) if c]
+        return min(caps) if caps else 0
+
+    def free_slots(self, model: str) -> Optional[int]:
+        """Return the slots a run for `model` could take now, or None without a cap."""
+        free = [self.max_concurrent - self._running] if self.max_concurrent else []
+        limit = self.model_limits.get(model)
+        if limit:
+            free.append(limit - self._running_by_model.get(model, 0))
+        return max(min(free), 0) if free else None
+
+    async def acquire(
+        self, model: str, slots: int = 1, partial: bool = False
+    ) -> Ticket:
+        """Wait for `slots` run slots for `model` and return their ticket.
+
+        Requests for more slots than the limits allow are reduced to the limit;
+        the ticket records how many were granted.
+
+        Args:
+            model: The 'provider/model' the run uses.
+            slots: Slots wanted.
+            partial: Take fewer slots when fewer are free right now and no
+                earlier waiter competes for them; with none free, wait for one.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out.
+        """
+        cap = self.max_slots(model)
+        slots = max(min(slots, cap) if cap else slots, 1)
+        free = self.free_slots(model)
+        if partial and free is not None and not self._queued_ahead(model):
+            slots = max(min(slots, free), 1)
+        if self._can_run(model, slots) and not self._queued_ahead(model):
+            self._start(model, slots)
+            self.stats.admitted += 1
+            return Ticket(self, model, slots)
+        if self.queued >= self.max_queue:
+            raise self._reject(429, "queue_full")
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(_Waiter(model, future, slots))
+        self.stats.queued_total += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except TimeoutError:
+            # On Python 3.12+ wait_for can time out after `_dispatch` already
+            # started the run; keep the slot rather than leak it.
+            if not future.done() or future.cancelled():
+                raise self._reject(503, "queue_timeout") from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller went away: hand the slots back.
+                Ticket(self, model, slots).release()
+            raise
+        finally:
+            waited = time.monotonic() - queued_at
+            self.stats.wait_seconds_total += waited
+            self.stats.wait_seconds_max = max(self.stats.wait_seconds_max, waited)
+        self.stats.admitted += 1
+        return Ticket(self, model, slots)
+
+    @asynccontextmanager
+    async def admit(self, model: str) -> AsyncIterator[Ticket]:
+        """Hold a run slot for `model` for the duration of the block."""
+        ticket = await self.acquire(model)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the current queue state and counters."""
+        queued_total = self.stats.queued_total
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "running_by_model": {k: v for k, v in self._running_by_model.items() if v},
+            "admitted": self.stats.admitted,
+            "rejected_queue_full": self.stats.rejected_queue_full,
+            "rejected_timeout": self.stats.rejected_timeout,
+            "wait_seconds_avg": round(
+                self.stats.wait_seconds_total / queued_total, 4
+            )
+            if queued_total
+            else 0.0,
+            "wait_seconds_max": round(self.stats.wait_seconds_max, 4),
+        }
+
+
+def _parse_model_limits(raw: str) -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for item in raw.split(","):
+        if "=" in item:
+            model, limit = item.rsplit("=", 1)
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+def create_admission_controller() -> AdmissionController:
+    """Create a controller configured from environment variables.
+
+    MAX_CONCURRENT_RUNS, MAX_QUEUED_RUNS and QUEUE_TIMEOUT_SECONDS set the global
+    limits; MODEL_CONCURRENCY_LIMITS takes ``provider/model=N`` pairs separated by
+    commas.
+    """
+    return AdmissionController(
+        max_concurrent=int(os.getenv("MAX_CONCURRENT_RUNS", "32")),
+        max_queue=int(os.getenv("MAX_QUEUED_RUNS", "64")),
+        queue_timeout=float(os.getenv("QUEUE_TIMEOUT_SECONDS", "10")),
+        model_limits=_parse_model_limits(os.getenv("MODEL_CONCURRENCY_LIMITS", "")),
+    )
@@ -0,0 +1,91 @@
+"""Run many independent prompts through the graph with bounded parallelism.
+
+`run_batch` feeds the prompts to the graph's `abatch_as_completed`, the
+completion-order form of `abatch`, so each result can be written out as soon as
+it is ready. A prompt whose run raises produces a `BatchResult` with `error` set
+rather than failing the rest of the batch. Batch runs are stateless: they use no
+checkpointer and no conversation history.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from react_agent.context import Context
+from react_agent.graph import compile_graph
+from react_agent.state import InputState
+from react_agent.utils import get_message_text
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+"""Default (and, for the API, maximum) number of prompts run at once."""
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one prompt in a batch."""
+
+    index: int
+    """Position of the prompt in the input."""
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the run finished without raising."""
+        return self.error is None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the result as a plain dict."""
+        return asdict(self)
+
+
+def final_response(messages: Sequence[BaseMessage]) -> str:
+    """Return the text of the last AI message that is not a tool call."""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and not message.tool_calls:
+            return get_message_text(message)
+    return ""
+
+
+async def run_batch(
+    prompts: Sequence[str],
+    context: Optional[Context] = None,
+    *,
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    graph: Optional[Runnable[Any, Any]] = None,
+    config: Optional[RunnableConfig] = None,
+) -> AsyncIterator[BatchResult]:
+    """Run every prompt as its own single-turn conversation.
+
+    Args:
+        prompts: User messages, one per run.
+        context: Context shared by every run; defaults to `Context()`.
+        max_concurrency: Most runs in flight at once.
+        graph: Graph to run; defaults to the uncheckpointed `react_agent.graph`.
+        config: Base run config, e.g. callbacks, applied to every run.
+
+    Yields:
+        One `BatchResult` per prompt, in the order the runs finish.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    inputs = [InputState(messages=[HumanMessage(content=p)]) for p in prompts]
+    batch_config: RunnableConfig = {
+        **(config or {}),
+        "max_concurrency": max_concurrency,
+    }
+    async for index, output in (graph or compile_graph()).abatch_as_completed(
+        inputs,
+        batch_config,
+        return_exceptions=True,
+        context=context or Context(),
+    ):
+        if isinstance(output, Exception):
+            yield BatchResult(index, error=f"{type(output).__name__}: {output}")
+        else:
+            yield BatchResult(index, response=final_response(output["messages"]))
@@ -0,0 +1,302 @@
+"""In-process result caches with TTL, LRU eviction and single-flight lookups.
+
+`TTLCache` keeps JSON-serializable values in memory, bounded both by entry count
+and by the approximate serialized size of the values. An optional
+`SQLiteCacheBackend` persists entries to a local file so a restart does not
+start from a cold cache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how a cache has been used."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    """Lookups that waited on an identical in-flight computation."""
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered without a new computation."""
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters (and hit rate) as a plain dict."""
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class SQLiteCacheBackend:
+    """Persist cache entries in a local SQLite file.
+
+    Expired entries are purged when the file is opened and after every
+    `purge_interval` writes, which also trims the file to its `max_entries`
+    newest entries.
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 10000, purge_interval: int = 256
+    ) -> None:
+        """Open (or create) the cache database at `path`.
+
+        Args:
+            path: SQLite file to store the entries in.
+            max_entries: Most entries kept in the file; it may exceed this by up to
+                `purge_interval` entries between purges.
+            purge_interval: Writes between two purges.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+        )
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        """Return the stored (value, expires_at) for `key`, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float) -> None:
+        """Store `value` under `key` until `expires_at`."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._conn.commit()
+            self._writes += 1
+            purge = self._writes % self.purge_interval == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the store."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self, now: Optional[float] = None) -> None:
+        """Delete every entry whose TTL has passed, then all but the newest `max_entries`."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache WHERE expires_at <= ?", (now or time.time(),)
+            )
+            # Entries of one cache share a TTL, so the latest expiry is the newest.
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        """Return the number of entries in the file, expired or not."""
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0])
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+
+
+class TTLCache:
+    """A bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Concurrent `get_or_compute` calls for the same key share one computation.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        backend: Optional[SQLiteCacheBackend] = None,
+    ) -> None:
+        """Create a cache.
+
+        Args:
+            ttl: Seconds an entry stays valid. A non-positive value disables caching.
+            max_entries: Maximum number of entries held in memory.
+            max_bytes: Maximum total serialized size of the entries held in memory.
+            backend: Optional persistent store consulted on in-memory misses.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.ttl > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        """Return the number of entries held in memory."""
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate serialized size of the in-memory entries."""
+        return self._bytes
+
+    def _lookup(self, key: str) -> tuple[bool, Any]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return True, entry.value
+            self._remove(key)
+            self.stats.expirations += 1
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is not None:
+                raw, expires_at = stored
+                if expires_at > now:
+                    value = json.loads(raw)
+                    self._store(key, value, len(raw), expires_at)
+                    return True, value
+                self.backend.delete(key)
+        return False, None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        found, value = self._lookup(key)
+        if found:
+            self.stats.hits += 1
+            return value
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache `value` under `key`. Values must be JSON-serializable."""
+        if not self.enabled:
+            return
+        raw = json.dumps(value, default=str)
+        if len(raw) > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl
+        self._store(key, value, len(raw), expires_at)
+        if self.backend is not None:
+            self.backend.set(key, raw, expires_at)
+
+    def _store(self, key: str, value: Any, size: int, expires_at: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value=value, size=size, expires_at=expires_at)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def delete(self, key: str) -> None:
+        """Drop `key` from memory and the persistent backend."""
+        if key in self._entries:
+            self._remove(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        self._entries.clear()
+        self._bytes = 0
+        self.stats = CacheStats()
+        if self.backend is not None:
+            self.backend.clear()
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value for `key`, computing it at most once.
+
+        If an identical lookup is already in flight, wait for its result instead
+        of starting a second computation. The computation runs in its own task, so
+        a cancelled caller does not cancel it for the other waiters. Failures are
+        propagated to every waiter and are not cached.
+        """
+        if not self.enabled:
+            self.stats.misses += 1
+            return await compute()
+
+        found, value = self._lookup(key)
+        if found:
+            self.stats.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.misses += 1
+            task = asyncio.ensure_future(self._compute_and_set(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _compute_and_set(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = await compute()
+        self.set(key, value)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Future[Any]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
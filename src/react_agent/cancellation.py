@@ -0,0 +1,84 @@
+"""Stop agent runs whose caller has gone away.
+
+`iterate_until` wraps a graph stream so that it is cancelled, including its
+in-flight model and tool calls, as soon as a stop signal (such as a client
+disconnect) fires. `CANCELLATION_STATS` counts cancelled runs and estimates the
+tokens they would still have used.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class RunCancelled(Exception):
+    """Raised by `iterate_until` when the stop signal fires before the stream ends."""
+
+
+@dataclass
+class CancellationStats:
+    """Counters for runs that finished versus runs that were cancelled."""
+
+    completed_runs: int = 0
+    completed_run_tokens: int = 0
+    cancelled_runs: int = 0
+    tokens_spent_before_cancel: int = 0
+    tokens_avoided_estimate: int = 0
+    """Average tokens of a completed run minus what each cancelled run had used."""
+
+    def record_completed(self, tokens: int) -> None:
+        """Record a run that streamed to the end, using `tokens` in total."""
+        self.completed_runs += 1
+        self.completed_run_tokens += tokens
+
+    def record_cancelled(self, tokens_spent: int) -> None:
+        """Record a run cancelled after using `tokens_spent` tokens."""
+        self.cancelled_runs += 1
+        self.tokens_spent_before_cancel += tokens_spent
+        if self.completed_runs:
+            average = self.completed_run_tokens // self.completed_runs
+            self.tokens_avoided_estimate += max(average - tokens_spent, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters as a plain dict."""
+        return asdict(self)
+
+
+CANCELLATION_STATS = CancellationStats()
+"""Process-wide cancellation counters."""
+
+
+async def iterate_until(
+    stream: AsyncIterator[T], stop: asyncio.Future[Any]
+) -> AsyncIterator[T]:
+    """Yield from `stream` until it ends or `stop` completes.
+
+    When `stop` completes first, the pending step of `stream` is cancelled, the
+    stream is closed and `RunCancelled` is raised.
+    """
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            next_item: asyncio.Future[T] = asyncio.ensure_future(
+                iterator.__anext__()
+            )
+            await asyncio.wait({next_item, stop}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_item.done():
+                next_item.cancel()
+                with suppress(asyncio.CancelledError, StopAsyncIteration):
+                    await next_item
+                raise RunCancelled()
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,56 @@
+"""Checkpointers that persist agent state between conversation turns.
+
+With a checkpointer, the graph keeps the full message list (including tool calls
+and tool results) for each ``thread_id``; callers only send the new message of
+each turn.
+
+The default ``memory`` backend keeps every checkpoint of every thread until the
+thread is deleted. The API deletes a thread when the in-memory conversation
+store evicts its conversation; with ``CONVERSATION_STORE=sqlite`` nothing evicts
+threads, so pair it with ``CHECKPOINTER=sqlite``.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+async def create_checkpointer(
+    backend: Optional[str] = None, path: Optional[str] = None
+) -> BaseCheckpointSaver[Any]:
+    """Create the checkpointer selected by `backend` or the CHECKPOINTER env var.
+
+    Args:
+        backend: ``memory`` (process-local, the default) or ``sqlite``.
+        path: Database file for the ``sqlite`` backend. Defaults to the
+            CHECKPOINT_DB_PATH env var, then ``data/checkpoints.sqlite``.
+    """
+    kind = (backend or os.getenv("CHECKPOINTER") or "memory").lower()
+    if kind == "memory":
+        return InMemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown CHECKPOINTER backend: {kind!r}")
+
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    db_path = path or os.getenv("CHECKPOINT_DB_PATH") or "data/checkpoints.sqlite"
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = await aiosqlite.connect(db_path)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    return saver
+
+
+async def close_checkpointer(checkpointer: BaseCheckpointSaver[Any]) -> None:
+    """Close any connection held by `checkpointer`."""
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None and hasattr(conn, "close"):
+        await conn.close()
@@ -29,6 +29,24 @@ class Context:
         },
     )
 
+    system_time_granularity: str = field(
+        default="minute",
+        metadata={
+            "description": "Precision of the time rendered into the system prompt: "
+            "microsecond, second, minute, hour or day. Coarser values keep the "
+            "prompt prefix identical across calls, so provider prompt caches hit."
+        },
+    )
+
+    prompt_caching: bool = field(
+        default=True,
+        metadata={
+            "description": "Whether to mark the stable part of the system prompt and "
+            "the tool definitions as cache breakpoints for models that support them "
+            "(Anthropic)."
+        },
+    )
+
     max_search_results: int = field(
         default=10,
         metadata={
@@ -36,6 +54,57 @@ class Context:
         },
     )
 
+    max_search_result_tokens: int = field(
+        default=300,
+        metadata={
+            "description": "Maximum tokens kept from the content of each search result "
+            "before it is added to the conversation. Set to 0 to keep full snippets."
+        },
+    )
+
+    max_tool_output_tokens: int = field(
+        default=2000,
+        metadata={
+            "description": "Maximum tokens of a single tool output added to the "
+            "conversation. Lower-ranked results are left out to stay within it. "
+            "Set to 0 for no limit."
+        },
+    )
+
+    max_context_tokens: int = field(
+        default=24000,
+        metadata={
+            "description": "Token budget for the messages sent to the model on each step, "
+            "including the system prompt. Older turns are trimmed to fit. "
+            "Set to 0 to send the full conversation."
+        },
+    )
+
+    max_tool_result_tokens: int = field(
+        default=1500,
+        metadata={
+            "description": "Maximum tokens kept from each tool result of earlier turns "
+            "when fitting the conversation into max_context_tokens."
+        },
+    )
+
+    summarize_dropped_turns: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to fold turns that no longer fit the context budget "
+            "into a running summary instead of discarding them."
+        },
+    )
+
+    deadline: float = field(
+        default=0.0,
+        metadata={
+            "description": "Unix time by which the run should have answered. Once the "
+            "time left is too short for another tool call plus a model call, the "
+            "model is asked for a final answer. 0 means no deadline."
+        },
+    )
+
     def __post_init__(self) -> None:
         """Fetch env vars for attributes that were not passed as args."""
         for f in fields(self):
@@ -43,4 +112,16 @@ class Context:
                 continue
 
             if getattr(self, f.name) == f.default:
-                setattr(self, f.name, os.environ.get(f.name.upper(), f.default))
+                value = os.environ.get(f.name.upper())
+                if value is None:
+                    continue
+                setattr(self, f.name, _coerce(value, f.default))
+
+
+def _coerce(value: str, default: object) -> object:
+    """Convert an env var string to the type of the field's default."""
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    return value
@@ -0,0 +1,210 @@
+"""Fit the conversation into a token budget before each model call.
+
+Messages are grouped into turns, each starting at a HumanMessage. A turn is
+only ever kept or dropped as a whole, so an AIMessage's tool_calls always stay
+next to the ToolMessages that answer them. Tool results from earlier turns are
+truncated first; if the conversation still does not fit, the oldest turns are
+dropped. The current turn is always kept.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langgraph.constants import TAG_NOSTREAM
+
+from react_agent import prompts
+from react_agent.utils import get_message_text
+
+_MESSAGE_OVERHEAD_TOKENS = 4
+_TRUNCATION_MARKER = "\n...[truncated]"
+_SUMMARY_MESSAGE_TOKENS = 500
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+    except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # pragma: no cover - encoding files unavailable offline
+        return None
+
+
+def count_text_tokens(text: str) -> int:
+    """Count the tokens in `text` locally, falling back to ~4 chars per token."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut `text` down to at most `max_tokens` tokens, marking the cut."""
+    encoding = _encoding()
+    if encoding is None:
+        limit = max_tokens * 4
+        return text if len(text) <= limit else text[:limit] + _TRUNCATION_MARKER
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return str(encoding.decode(tokens[:max_tokens])) + _TRUNCATION_MARKER
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        text = json.dumps(content, ensure_ascii=False, default=str)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += json.dumps(message.tool_calls, ensure_ascii=False, default=str)
+    return text
+
+
+def count_message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Count the tokens `messages` take up in a prompt."""
+    return sum(
+        count_text_tokens(_message_text(m)) + _MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    )
+
+
+def split_turns(messages: Sequence[AnyMessage]) -> List[List[AnyMessage]]:
+    """Group messages into turns that each start at a HumanMessage."""
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def drop_unanswered_tool_calls(messages: Sequence[AnyMessage]) -> List[AnyMessage]:
+    """Remove AIMessages whose tool_calls were never all answered.
+
+    A run that was cancelled or failed inside the tools node leaves such a
+    message behind, and providers reject a prompt containing it. Any partial
+    ToolMessages answering it are removed too.
+    """
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    stale_calls: set[str] = set()
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            ids = {tc["id"] for tc in message.tool_calls if tc["id"]}
+            if not ids <= answered:
+                stale_calls |= ids
+    if not stale_calls:
+        return list(messages)
+    return [
+        m
+        for m in messages
+        if not (
+            isinstance(m, AIMessage)
+            and any(tc["id"] in stale_calls for tc in m.tool_calls)
+        )
+        and not (isinstance(m, ToolMessage) and m.tool_call_id in stale_calls)
+    ]
+
+
+def _trim_tool_results(turn: List[AnyMessage], max_tokens: int) -> List[AnyMessage]:
+    trimmed: List[AnyMessage] = []
+    for message in turn:
+        if isinstance(message, ToolMessage) and isinstance(message.content, str):
+            content = truncate_text(message.content, max_tokens)
+            if content is not message.content:
+                message = message.model_copy(update={"content": content})
+        trimmed.append(message)
+    return trimmed
+
+
+@dataclass
+class ContextWindow:
+    """The messages selected for a model call."""
+
+    messages: List[AnyMessage]
+    """Messages to send, oldest first."""
+    dropped: List[AnyMessage] = field(default_factory=list)
+    """Whole turns left out of the window, oldest first."""
+    tokens: int = 0
+    """Token count of `messages`."""
+
+
+def fit_context(
+    messages: Sequence[AnyMessage],
+    max_tokens: int,
+    max_tool_result_tokens: Optional[int] = None,
+    reserved_tokens: int = 0,
+) -> ContextWindow:
+    """Select the most recent turns of `messages` that fit in `max_tokens`.
+
+    Args:
+        messages: The full conversation, oldest first.
+        max_tokens: Token budget for the returned messages plus `reserved_tokens`.
+            A non-positive value disables trimming.
+        max_tool_result_tokens: Cap applied to ToolMessages of earlier turns (and
+            of the current turn, if it alone overflows the budget).
+        reserved_tokens: Tokens already spent elsewhere in the prompt, such as the
+            system message.
+    """
+    if max_tokens <= 0:
+        return ContextWindow(list(messages), tokens=count_message_tokens(messages))
+
+    budget = max_tokens - reserved_tokens
+    turns = split_turns(messages)
+    if not turns:
+        return ContextWindow([])
+
+    *earlier, current = turns
+    if max_tool_result_tokens:
+        earlier = [_trim_tool_results(t, max_tool_result_tokens) for t in earlier]
+    current_tokens = count_message_tokens(current)
+    if current_tokens > budget and max_tool_result_tokens:
+        current = _trim_tool_results(current, max_tool_result_tokens)
+        current_tokens = count_message_tokens(current)
+
+    kept: List[List[AnyMessage]] = [current]
+    used = current_tokens
+    dropped_until = len(earlier)
+    for index in range(len(earlier) - 1, -1, -1):
+        turn_tokens = count_message_tokens(earlier[index])
+        if used + turn_tokens > budget:
+            break
+        kept.append(earlier[index])
+        used += turn_tokens
+        dropped_until = index
+
+    dropped = [m for turn in turns[:dropped_until] for m in turn]
+    selected = [m for turn in reversed(kept) for m in turn]
+    return ContextWindow(selected, dropped=dropped, tokens=used)
+
+
+async def summarize_messages(
+    model: BaseChatModel, summary: str, messages: Sequence[BaseMessage]
+) -> str:
+    """Fold `messages` into the running `summary` with one model call."""
+    transcript = "\n".join(
+        f"{m.type}: {truncate_text(_message_text(m), _SUMMARY_MESSAGE_TOKENS)}"
+        for m in messages
+        if _message_text(m)
+    )
+    # Tagged so LangGraph's message stream does not forward the summary as output.
+    response = await model.ainvoke(
+        prompts.SUMMARY_PROMPT.format(summary=summary, messages=transcript),
+        config={"tags": [TAG_NOSTREAM]},
+    )
+    return get_message_text(response)
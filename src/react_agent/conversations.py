@@ -0,0 +1,231 @@
+"""Conversation history stores used by the HTTP API.
+
+Two backends implement `ConversationStore`:
+
+* `InMemoryConversationStore` keeps a bounded number of conversations in process
+  and evicts the least recently used one when full, calling `on_evict` so other
+  per-conversation state (such as in-memory checkpoints) can be dropped with it.
+* `SQLiteConversationStore` appends messages to a local SQLite database in WAL
+  mode, so several worker processes on one host can share conversations.
+
+Use `create_conversation_store` to pick one from environment variables.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+ConversationMessage = Dict[str, str]
+"""A stored message: ``{"role": "human" | "assistant", "content": ...}``."""
+
+
+class ConversationStore(ABC):
+    """Append-only storage of conversation messages keyed by conversation id."""
+
+    @abstractmethod
+    def get(
+        self, conversation_id: str, limit: Optional[int] = None
+    ) -> List[ConversationMessage]:
+        """Return the messages of a conversation, oldest first.
+
+        Args:
+            conversation_id: The conversation to read.
+            limit: If set, only return the most recent `limit` messages.
+        """
+
+    @abstractmethod
+    def append(self, conversation_id: str, *messages: ConversationMessage) -> None:
+        """Append messages to a conversation, creating it if needed."""
+
+    @abstractmethod
+    def exists(self, conversation_id: str) -> bool:
+        """Return whether the conversation has any stored messages."""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation. Return whether it existed."""
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """A process-local store bounded by conversation count and length."""
+
+    def __init__(
+        self,
+        max_conversations: int = 1000,
+        max_messages: int = 200,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """Create the store.
+
+        Args:
+            max_conversations: Conversations kept before the least recently used
+                one is evicted.
+            max_messages: Messages kept per conversation; older ones are dropped.
+            on_evict: Called with the id of each evicted conversation.
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.on_evict = on_evict
+        self._conversations: OrderedDict[str, List[ConversationMessage]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of stored conversations."""
+        return len(self._conversations)
+
+    def get(
+        self, conversation_id: str, limit: Optional[int] = None
+    ) -> List[ConversationMessage]:
+        """Return the messages of a conversation, oldest first."""
+        with self._lock:
+            messages = self._conversations.get(conversation_id)
+            if messages is None:
+                return []
+            self._conversations.move_to_end(conversation_id)
+            return list(messages[-limit:] if limit else messages)
+
+    def append(self, conversation_id: str, *messages: ConversationMessage) -> None:
+        """Append messages to a conversation, evicting old data when over a cap."""
+        evicted = []
+        with self._lock:
+            stored = self._conversations.setdefault(conversation_id, [])
+            self._conversations.move_to_end(conversation_id)
+            stored.extend(dict(m) for m in messages)
+            if len(stored) > self.max_messages:
+                del stored[: len(stored) - self.max_messages]
+            while len(self._conversations) > self.max_conversations:
+                evicted.append(self._conversations.popitem(last=False)[0])
+        if self.on_evict is not None:
+            for evicted_id in evicted:
+                self.on_evict(evicted_id)
+
+    def exists(self, conversation_id: str) -> bool:
+        """Return whether the conversation has any stored messages."""
+        return conversation_id in self._conversations
+
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation. Return whether it existed."""
+        with self._lock:
+            return self._conversations.pop(conversation_id, None) is not None
+
+
+class SQLiteConversationStore(ConversationStore):
+    """A durable store backed by a local SQLite database in WAL mode.
+
+    Messages are only ever inserted, never rewritten, and are looked up through
+    an index on ``(conversation_id, id)``. Each process opens its own connection,
+    so the same file can be shared by several uvicorn workers.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0) -> None:
+        """Open (or create) the database at `path`."""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_conversation
+                ON messages (conversation_id, id);
+            """
+        )
+        self._conn.commit()
+
+    def get(
+        self, conversation_id: str, limit: Optional[int] = None
+    ) -> List[ConversationMessage]:
+        """Return the messages of a conversation, oldest first."""
+        with self._lock:
+            if limit:
+                rows = self._conn.execute(
+                    "SELECT role, content FROM ("
+                    "SELECT id, role, content FROM messages WHERE conversation_id = ? "
+                    "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (conversation_id, limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT role, content FROM messages WHERE conversation_id = ? "
+                    "ORDER BY id",
+                    (conversation_id,),
+                ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, conversation_id: str, *messages: ConversationMessage) -> None:
+        """Append messages to a conversation in a single transaction."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO messages (conversation_id, role, content, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(conversation_id, m["role"], m["content"], now) for m in messages],
+            )
+            self._conn.commit()
+
+    def exists(self, conversation_id: str) -> bool:
+        """Return whether the conversation has any stored messages."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM messages WHERE conversation_id = ? LIMIT 1",
+                (conversation_id,),
+            ).fetchone()
+        return row is not None
+
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation. Return whether it existed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def create_conversation_store() -> ConversationStore:
+    """Create the store selected by the CONVERSATION_STORE environment variable.
+
+    ``memory`` (the default) uses CONVERSATION_STORE_MAX_CONVERSATIONS and
+    CONVERSATION_STORE_MAX_MESSAGES; ``sqlite`` writes to CONVERSATION_DB_PATH.
+    """
+    backend = os.getenv("CONVERSATION_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteConversationStore(
+            os.getenv("CONVERSATION_DB_PATH", "data/conversations.sqlite")
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown CONVERSATION_STORE backend: {backend!r}")
+    return InMemoryConversationStore(
+        max_conversations=int(
+            os.getenv("CONVERSATION_STORE_MAX_CONVERSATIONS", "1000")
+        ),
+        max_messages=int(os.getenv("CONVERSATION_STORE_MAX_MESSAGES", "200")),
+    )
@@ -0,0 +1,109 @@
+"""Per-request latency budgets for the ReAct loop.
+
+A run may carry a deadline (`Context.deadline`, a Unix timestamp). Before each
+model call, and again after it when the model asks for tools, the agent checks
+whether the time left still covers another tool round: the tool call plus the
+model call that reads its result. When it does not, the model is asked for a
+final answer instead, or, once it has already replied with tool calls, those are
+dropped and the text of its reply becomes the answer. The durations are estimated from the live node-latency
+histograms in `react_agent.metrics`, so the budget follows what the model
+provider and the tools are actually doing; until enough runs have been observed,
+configured defaults are used.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+from react_agent.metrics import NODE_SECONDS, Histogram
+
+
+@dataclass
+class DeadlineStats:
+    """How often deadlines cut the agent loop short."""
+
+    final_answers_forced: int = 0
+    """Model calls that were asked to answer without tools."""
+    tool_rounds_skipped: int = 0
+    """Tool calls dropped because the deadline came too close."""
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return asdict(self)
+
+
+DEADLINE_STATS = DeadlineStats()
+"""Process-wide deadline counters, updated by the graph."""
+
+
+class StepEstimator:
+    """Estimate how long the agent's next steps will take."""
+
+    def __init__(
+        self,
+        quantile: float = 0.9,
+        min_samples: int = 5,
+        default_model_seconds: float = 5.0,
+        default_tool_seconds: float = 3.0,
+        histogram: Histogram = NODE_SECONDS,
+    ) -> None:
+        """Create the estimator.
+
+        Args:
+            quantile: Quantile of the observed durations to plan for.
+            min_samples: Observations needed before the histogram is trusted.
+            default_model_seconds: Estimate for a model call until then.
+            default_tool_seconds: Estimate for a tool round until then.
+            histogram: Node durations labelled by node name.
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_model_seconds = default_model_seconds
+        self.default_tool_seconds = default_tool_seconds
+        self.histogram = histogram
+
+    def _estimate(self, node: str, default: float) -> float:
+        if self.histogram.count(node) < self.min_samples:
+            return default
+        value = self.histogram.quantile(self.quantile, node)
+        return default if value is None else value
+
+    def model_seconds(self) -> float:
+        """Return the expected duration of one `call_model` step."""
+        return self._estimate("call_model", self.default_model_seconds)
+
+    def tool_seconds(self) -> float:
+        """Return the expected duration of one `tools` step."""
+        return self._estimate("tools", self.default_tool_seconds)
+
+    def allows_tool_round(self, deadline: float, *, before_model_call: bool) -> bool:
+        """Whether another tool round still fits before `deadline`.
+
+        Args:
+            deadline: Unix time by which the run should answer; 0 means none.
+            before_model_call: Whether the model call that would request the
+                tools has yet to run, so its duration must fit as well.
+        """
+        if not deadline:
+            return True
+        needed = self.tool_seconds() + self.model_seconds()
+        if before_model_call:
+            needed += self.model_seconds()
+        return deadline - time.time() >= needed
+
+
+def create_step_estimator() -> StepEstimator:
+    """Create an estimator from DEADLINE_QUANTILE, DEADLINE_MIN_SAMPLES, DEADLINE_DEFAULT_MODEL_SECONDS and DEADLINE_DEFAULT_TOOL_SECONDS."""
+    return StepEstimator(
+        quantile=float(os.getenv("DEADLINE_QUANTILE", "0.9")),
+        min_samples=int(os.getenv("DEADLINE_MIN_SAMPLES", "5")),
+        default_model_seconds=float(os.getenv("DEADLINE_DEFAULT_MODEL_SECONDS", "5")),
+        default_tool_seconds=float(os.getenv("DEADLINE_DEFAULT_TOOL_SECONDS", "3")),
+    )
+
+
+STEP_ESTIMATOR = create_step_estimator()
+"""Process-wide estimator used by `call_model`."""
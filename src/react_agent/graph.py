@@ -4,17 +4,37 @@
 """
 
 from datetime import UTC, datetime
-from typing import Dict, List, Literal, cast
+from functools import lru_cache
+from typing import Any, Dict, Literal, cast
 
 from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import ToolNode
 from langgraph.runtime import Runtime
 
+from react_agent import prompts
 from react_agent.context import Context
+from react_agent.context_window import (
+    count_text_tokens,
+    drop_unanswered_tool_calls,
+    fit_context,
+    summarize_messages,
+)
+from react_agent.deadline import DEADLINE_STATS, STEP_ESTIMATOR
+from react_agent.profiling import profile_section
+from react_agent.prompt_cache import (
+    PROMPT_CACHE_STATS,
+    append_system_text,
+    build_system_content,
+    supports_cache_breakpoints,
+    system_content_text,
+    truncate_time,
+)
+from react_agent.routing import MODEL_ROUTER, Candidate
 from react_agent.state import InputState, State
 from react_agent.tools import TOOLS
-from react_agent.utils import load_chat_model
+from react_agent.utils import get_message_text, load_bound_chat_model, load_chat_model
 
 # 定义调用模型的函数
 
@@ -22,7 +42,7 @@ from react_agent.utils import load_chat_model
 async def call_model(
     state: State, 
     runtime: Runtime[Context]
-) -> Dict[str, List[AIMessage]]:
+) -> Dict[str, Any]:
     """调用驱动我们"代理"的大语言模型。
 
     此函数准备提示词，初始化模型，并处理响应。
@@ -34,35 +54,150 @@ async def call_model(
     Returns:
         dict: 包含模型响应消息的字典。
     """
-    # 初始化带有工具绑定的模型。在此处更改模型或添加更多工具。
-    model = load_chat_model(runtime.context.model).bind_tools(TOOLS)
+    # 是否为该模型添加提示词缓存断点（目前只有 Anthropic 支持显式断点）
+    cache_breakpoints = runtime.context.prompt_caching and supports_cache_breakpoints(
+        runtime.context.model
+    )
+
+    # 获取带有工具绑定的模型（按模型名和端点配置缓存，跨请求复用同一客户端）。
+    # 在此处更改模型或添加更多工具。
+    model = load_bound_chat_model(
+        runtime.context.model, TOOLS, cache_tools=cache_breakpoints
+    )
 
     # 格式化系统提示词。自定义此部分以更改代理的行为。
-    system_message = runtime.context.system_prompt.format(
-        system_time=datetime.now(tz=UTC).isoformat()
+    # 时间按配置的粒度取整，使提示词前缀在多次调用间保持字节一致，命中服务端缓存
+    system_time = truncate_time(
+        datetime.now(tz=UTC), runtime.context.system_time_granularity
+    ).isoformat()
+    system_content = build_system_content(
+        runtime.context.system_prompt, system_time, cache_breakpoint=cache_breakpoints
     )
+    system_message = system_content_text(system_content)
+
+    # 按 token 预算裁剪上下文：保留最近的轮次，截断旧的工具结果，
+    # 整轮丢弃最旧的对话，保证 tool_calls 与 ToolMessage 的配对不被拆开
+    # 被取消或出错的运行可能留下没有对应 ToolMessage 的 tool_calls，发送前先移除
+    messages = drop_unanswered_tool_calls(state.messages)
+    summary = state.context_summary
+    with profile_section("call_model.fit_context"):
+        window = fit_context(
+            messages,
+            max_tokens=runtime.context.max_context_tokens,
+            max_tool_result_tokens=runtime.context.max_tool_result_tokens,
+            reserved_tokens=count_text_tokens(system_message)
+            + count_text_tokens(summary),
+        )
 
-    # 获取模型的响应
-    response = cast(
-        AIMessage,
-        await model.ainvoke(
-            [{"role": "system", "content": system_message}, *state.messages]
-        ),
+    # 可选：将新丢弃的轮次合并进缓存在状态中的摘要，已摘要过的消息不会重复处理
+    updates: Dict[str, Any] = {}
+    if runtime.context.summarize_dropped_turns and window.dropped:
+        # 被丢弃的消息总是 messages 的前缀，按位置找出尚未摘要的部分
+        message_ids = [m.id for m in messages]
+        start = (
+            message_ids.index(state.summarized_until) + 1
+            if state.summarized_until in message_ids
+            else 0
+        )
+        if window.dropped[start:]:
+            summary = await summarize_messages(
+                load_chat_model(runtime.context.model),
+                summary,
+                window.dropped[start:],
+            )
+            updates = {
+                "context_summary": summary,
+                "summarized_until": window.dropped[-1].id,
+            }
+    if summary:
+        system_content = append_system_text(
+            system_content, "\n\n" + prompts.SUMMARY_SECTION.format(summary=summary)
+        )
+
+    # 请求时限：剩余时间不够这次模型调用之后再执行一轮工具和模型调用时，要求模型直接给出最终回答。
+    # 说明追加在系统提示词末尾，缓存的前缀和工具定义保持不变
+    final_answer_only = not STEP_ESTIMATOR.allows_tool_round(
+        runtime.context.deadline, before_model_call=True
     )
+    if final_answer_only:
+        DEADLINE_STATS.final_answers_forced += 1
+        system_content = append_system_text(
+            system_content, "\n\n" + prompts.DEADLINE_SECTION
+        )
+
+    # 获取模型的响应。配置了备用模型时由路由层处理：首 token 迟迟不来时向备用模型发送对冲请求，
+    # 遇到 429/5xx 时立即切换到下一个模型
+    models = MODEL_ROUTER.models(runtime.context.model)
+    prompt = [{"role": "system", "content": system_content}, *window.messages]
+    if len(models) == 1:
+        response = cast(AIMessage, await model.ainvoke(prompt))
+    else:
+        # 备用模型使用纯文本系统提示词，缓存断点只对主模型有意义
+        backup_prompt = [
+            {"role": "system", "content": system_content_text(system_content)},
+            *window.messages,
+        ]
+        response = cast(
+            AIMessage,
+            await MODEL_ROUTER.ainvoke(
+                [
+                    Candidate(runtime.context.model, model, prompt),
+                    *(
+                        Candidate(name, load_bound_chat_model(name, TOOLS), backup_prompt)
+                        for name in models[1:]
+                    ),
+                ]
+            ),
+        )
+    PROMPT_CACHE_STATS.record(response)
 
-    # 处理最后一步时模型仍想使用工具的情况
+    # 处理最后一步时模型仍想使用工具的情况。
+    # 被步数或时限截断的回答在 response_metadata["cut_short"] 中标明原因，调用方据此不缓存它们
     if state.is_last_step and response.tool_calls:
         return {
             "messages": [
                 AIMessage(
                     id=response.id,
                     content="抱歉，我在指定的步骤数内无法找到您问题的答案。",
+                    response_metadata={
+                        **response.response_metadata,
+                        "cut_short": "step_limit",
+                    },
                 )
-            ]
+            ],
+            **updates,
         }
 
+    # 已要求直接回答但模型仍想使用工具，或者模型调用比预计的慢、剩余时间已不够执行工具
+    # 再调用一次模型：丢弃工具调用，保留已生成的文本作为最终回答
+    if response.tool_calls and (
+        final_answer_only
+        or not STEP_ESTIMATOR.allows_tool_round(
+            runtime.context.deadline, before_model_call=False
+        )
+    ):
+        DEADLINE_STATS.tool_rounds_skipped += 1
+        return {
+            "messages": [
+                AIMessage(
+                    id=response.id,
+                    # 只保留文本：Anthropic 的内容块列表中还带有 tool_use 块，
+                    # 留下它们会在下一轮发送没有对应结果的工具调用
+                    content=get_message_text(response)
+                    or "抱歉，我在规定的时间内无法找到您问题的答案。",
+                    response_metadata={
+                        **response.response_metadata,
+                        "cut_short": "deadline",
+                    },
+                )
+            ],
+            **updates,
+        }
+    if final_answer_only:
+        response.response_metadata["cut_short"] = "deadline"
+
     # 将模型的响应作为列表返回，添加到现有消息中
-    return {"messages": [response]}
+    return {"messages": [response], **updates}
 
 
 # 定义一个新的图
@@ -113,5 +248,18 @@ builder.add_conditional_edges(
 # 这创建了一个循环：使用工具后，我们总是返回到模型
 builder.add_edge("tools", "call_model")
 
-# 将构建器编译为可执行图
-graph = builder.compile(name="ReAct Agent")
+GRAPH_NAME = "ReAct Agent"
+
+
+@lru_cache(maxsize=1)
+def compile_graph() -> CompiledStateGraph[State, Context, InputState, State]:
+    """Compile the builder into the uncheckpointed graph, once per process."""
+    return builder.compile(name=GRAPH_NAME)
+
+
+def __getattr__(name: str) -> Any:
+    # 将构建器编译为可执行图：`graph`（LangGraph 服务的入口）在首次访问时才编译，
+    # 只使用带检查点图的 FastAPI 服务启动时不必为它付出编译时间
+    if name == "graph":
+        return compile_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
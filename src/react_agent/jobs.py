@@ -0,0 +1,535 @@
+"""Background jobs for agent runs that should not hold an HTTP request open.
+
+`SQLiteJobQueue` stores jobs in a local SQLite database in WAL mode, so queued
+jobs, and jobs interrupted by a restart, are picked up again when the process
+comes back. `WorkerPool` runs a fixed number of workers that claim the
+highest-priority queued job, pass it to a handler and record the outcome.
+While a job runs, its pool refreshes a heartbeat on it; a running job whose
+heartbeat has gone stale belonged to a process that died, and any pool sharing
+the file puts it back in the queue, or fails it after `max_attempts` starts.
+Progress events published while a job runs are kept in `JobEvents`, from which
+clients replay and then follow them.
+
+Use `create_job_queue` and `create_worker_pool` to configure them from
+environment variables.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+)
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+"""Statuses a job never leaves."""
+
+TERMINAL_EVENTS = ("done", "error", "cancelled")
+"""Event types that end a job's event stream."""
+
+JobEvent = Dict[str, Any]
+"""A progress event: ``{"type": ..., "job_id": ..., ...}``."""
+
+JobHandler = Callable[["Job", Callable[[JobEvent], None]], Awaitable[Dict[str, Any]]]
+"""Runs a job, publishing progress through the callback, and returns its result."""
+
+
+@dataclass
+class Job:
+    """A queued, running or finished job."""
+
+    id: str
+    payload: Dict[str, Any]
+    priority: int = 0
+    """Higher runs first; equal priorities run in submission order."""
+    status: str = "queued"
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    """How many times a worker has started the job."""
+    owner: Optional[str] = None
+    """The queue instance (one per process) that claimed the job last."""
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has reached a terminal status."""
+        return self.status in TERMINAL_STATUSES
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the job as a plain dict."""
+        return asdict(self)
+
+
+_COLUMNS = (
+    "id, payload, priority, status, result, error, attempts, "
+    "created_at, started_at, finished_at, owner"
+)
+
+
+def _row_to_job(row: Any) -> Job:
+    payload, result = row[1], row[4]
+    return Job(
+        id=row[0],
+        payload=json.loads(payload),
+        priority=row[2],
+        status=row[3],
+        result=json.loads(result) if result is not None else None,
+        error=row[5],
+        attempts=row[6],
+        created_at=row[7],
+        started_at=row[8],
+        finished_at=row[9],
+        owner=row[10],
+    )
+
+
+class SQLiteJobQueue:
+    """A durable priority queue of jobs in a local SQLite database.
+
+    A job is claimed by flipping it from ``queued`` to ``running`` only if it is
+    still queued, so several processes can share one file without running a job
+    twice. Each claim records the claiming queue as the job's owner, and the
+    owner's heartbeats show the job is still being worked on, so `recover` only
+    touches jobs whose process has stopped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        busy_timeout: float = 5.0,
+        heartbeat_timeout: float = 30.0,
+        max_attempts: int = 3,
+    ) -> None:
+        """Open (or create) the database at `path` (``:memory:`` for a scratch queue).
+
+        Args:
+            path: SQLite file shared by every process running jobs.
+            busy_timeout: Seconds to wait for another process's write lock.
+            heartbeat_timeout: Seconds without a heartbeat after which a running
+                job is considered abandoned.
+            max_attempts: Starts after which an abandoned job is failed rather
+                than requeued, so a job that crashes its process stops retrying.
+        """
+        self.path = path
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_queue
+                ON jobs (status, priority DESC, created_at);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                # Files created before claims had owners.
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.commit()
+
+    def submit(self, payload: Dict[str, Any], priority: int = 0) -> Job:
+        """Queue a job and return it."""
+        job = Job(
+            id=uuid.uuid4().hex,
+            payload=payload,
+            priority=priority,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, payload, priority, status, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?)",
+                (job.id, json.dumps(payload), priority, job.created_at),
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with `job_id`, if it exists."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        """Mark the next queued job as running and return it, if there is one."""
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, "
+                    "heartbeat_at = ?, owner = ?, attempts = attempts + 1 "
+                    "WHERE id = ? AND status = 'queued'",
+                    (now, now, self.owner, row[0]),
+                )
+                self._conn.commit()
+                if cursor.rowcount:
+                    job = _row_to_job(row)
+                    job.status, job.started_at, job.owner = "running", now, self.owner
+                    job.attempts += 1
+                    return job
+                # Another process claimed it first; try the next one.
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Move a job to a terminal status.
+
+        Returns:
+            False if the job already had a terminal status, or is running under
+            another owner after this one was presumed dead.
+        """
+        if status not in TERMINAL_STATUSES:
+            raise ValueError(f"Not a terminal job status: {status!r}")
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND (status = 'queued' "
+                "OR (status = 'running' AND owner = ?))",
+                (
+                    status,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    self.owner,
+                ),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet. Return whether it was queued."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def requeue(self, job_id: str) -> None:
+        """Put a job this queue is running back in the queue."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, "
+                "heartbeat_at = NULL WHERE id = ? AND status = 'running' AND owner = ?",
+                (job_id, self.owner),
+            )
+            self._conn.commit()
+
+    def heartbeat(self, job_ids: Sequence[str]) -> None:
+        """Record that this queue's owner is still running `job_ids`."""
+        if not job_ids:
+            return
+        marks = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({marks}) "
+                "AND status = 'running' AND owner = ?",
+                (time.time(), *job_ids, self.owner),
+            )
+            self._conn.commit()
+
+    def recover(self) -> int:
+        """Requeue running jobs whose heartbeat went stale. Return the count.
+
+        Abandoned jobs already started `max_attempts` times are failed instead.
+        """
+        stale = (time.time() - self.heartbeat_timeout,)
+        abandoned = "status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = 'abandoned after ' || attempts || ' attempts' "
+                f"WHERE {abandoned} AND attempts >= ?",
+                (time.time(), *stale, self.max_attempts),
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, "
+                f"heartbeat_at = NULL WHERE {abandoned}",
+                stale,
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class JobEvents:
+    """Recent progress events per job, with live subscriptions.
+
+    Events live in process memory: a client following a job sees them only if
+    it is connected to the process running the job.
+    """
+
+    def __init__(self, max_jobs: int = 1000, max_events_per_job: int = 200) -> None:
+        """Keep events for the `max_jobs` most recent jobs, `max_events_per_job` each."""
+        self.max_jobs = max_jobs
+        self.max_events_per_job = max_events_per_job
+        self._history: OrderedDict[str, Deque[JobEvent]] = OrderedDict()
+        self._subscribers: Dict[str, List[asyncio.Queue[JobEvent]]] = {}
+
+    def publish(self, job_id: str, event: JobEvent) -> None:
+        """Record `event` for `job_id` and deliver it to its subscribers."""
+        event = {"job_id": job_id, **event}
+        history = self._history.get(job_id)
+        if history is None:
+            history = self._history[job_id] = deque(maxlen=self.max_events_per_job)
+            while len(self._history) > self.max_jobs:
+                self._history.popitem(last=False)
+        history.append(event)
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait(event)
+
+    def history(self, job_id: str) -> List[JobEvent]:
+        """Return the events recorded for `job_id`, oldest first."""
+        return list(self._history.get(job_id, ()))
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[JobEvent]:
+        """Yield the recorded events of `job_id`, then new ones until it ends."""
+        queue: asyncio.Queue[JobEvent] = asyncio.Queue()
+        subscribers = self._subscribers.setdefault(job_id, [])
+        subscribers.append(queue)
+        try:
+            for event in self.history(job_id):
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+
+class WorkerPool:
+    """A fixed number of workers running jobs from a `SQLiteJobQueue`."""
+
+    def __init__(
+        self,
+        queue: SQLiteJobQueue,
+        handler: JobHandler,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        events: Optional[JobEvents] = None,
+        heartbeat_interval: Optional[float] = None,
+    ) -> None:
+        """Create the pool; call `start` to begin running jobs.
+
+        Args:
+            queue: Where jobs are claimed from and results recorded.
+            handler: Runs one job and returns its result.
+            workers: Jobs run at the same time.
+            poll_interval: Seconds an idle worker waits before checking the queue
+                again, for jobs submitted by other processes.
+            events: Where progress events are published.
+            heartbeat_interval: Seconds between heartbeats on the jobs running
+                here, which is also how often abandoned jobs are recovered.
+                Defaults to a third of the queue's heartbeat timeout.
+        """
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.events = events or JobEvents()
+        self.heartbeat_interval = heartbeat_interval or queue.heartbeat_timeout / 3
+        self._tasks: List[asyncio.Task[None]] = []
+        self._running: Dict[str, asyncio.Task[Dict[str, Any]]] = {}
+        self._cancelled: Set[str] = set()
+        self._wake = asyncio.Event()
+
+    def submit(self, payload: Dict[str, Any], priority: int = 0) -> Job:
+        """Queue a job and wake an idle worker."""
+        job = self.queue.submit(payload, priority)
+        self.events.publish(job.id, {"type": "queued", "priority": priority})
+        self._wake.set()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or a job running in this pool.
+
+        Returns:
+            Whether the job was cancelled; False if it had finished or is running
+            in another process.
+        """
+        running = self._running.get(job_id)
+        if running is not None:
+            self._cancelled.add(job_id)
+            running.cancel()
+            return True
+        if self.queue.cancel(job_id):
+            self.events.publish(job_id, {"type": "cancelled"})
+            return True
+        return False
+
+    def start(self) -> int:
+        """Requeue abandoned jobs and start the workers.
+
+        Returns:
+            The number of abandoned jobs requeued.
+        """
+        recovered = self.queue.recover()
+        self._wake.set()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._keep_alive()))
+        return recovered
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back in the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            # Clear before looking, so a submit that lands in between still wakes us.
+            self._wake.clear()
+            job = self.queue.claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.queue.heartbeat(list(self._running))
+            # Jobs of a process that died while sharing the file.
+            if self.queue.recover():
+                self._wake.set()
+
+    async def _run(self, job: Job) -> None:
+        def emit(event: JobEvent) -> None:
+            self.events.publish(job.id, event)
+
+        emit({"type": "started", "attempt": job.attempts})
+        run = asyncio.ensure_future(self.handler(job, emit))
+        self._running[job.id] = run
+        try:
+            result = await run
+        except asyncio.CancelledError:
+            if job.id not in self._cancelled:
+                # The pool is stopping: leave the job for the next process.
+                self.queue.requeue(job.id)
+                raise
+            self._cancelled.discard(job.id)
+            if self.queue.finish(job.id, "cancelled"):
+                emit({"type": "cancelled"})
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if self.queue.finish(job.id, "failed", error=error):
+                emit({"type": "error", "error": error})
+        else:
+            # Not recorded if the job was cancelled or reclaimed by another
+            # process meanwhile; its events are then that outcome's to publish.
+            if self.queue.finish(job.id, "succeeded", result=result):
+                emit({"type": "done", "result": result})
+        finally:
+            self._running.pop(job.id, None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the pool size, jobs running here and job counts by status."""
+        return {
+            "workers": self.workers,
+            "running_here": len(self._running),
+            "jobs": self.queue.counts(),
+        }
+
+
+def create_job_queue() -> SQLiteJobQueue:
+    """Open the queue at JOB_DB_PATH (default ``data/jobs.sqlite``).
+
+    JOB_HEARTBEAT_TIMEOUT (default 30 seconds) and JOB_MAX_ATTEMPTS (default 3)
+    control when and how often abandoned jobs are recovered.
+    """
+    return SQLiteJobQueue(
+        os.getenv("JOB_DB_PATH", "data/jobs.sqlite"),
+        heartbeat_timeout=float(os.getenv("JOB_HEARTBEAT_TIMEOUT", "30")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    )
+
+
+def create_worker_pool(queue: SQLiteJobQueue, handler: JobHandler) -> WorkerPool:
+    """Create a pool sized by JOB_WORKERS and polling every JOB_POLL_INTERVAL seconds."""
+    return WorkerPool(
+        queue,
+        handler,
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+    )
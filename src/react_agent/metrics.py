@@ -0,0 +1,319 @@
+"""Latency and token histograms for graph runs, in Prometheus text format.
+
+`MetricsCallbackHandler` is attached to a run through its config. It times each
+graph node, each tool and each chat-model call (including time to first token),
+counts ReAct iterations per run, and records prompt and completion tokens. The
+histograms are plain in-process counters that cost a dict lookup and a bisect per
+observation, so they can stay on in production. `render_metrics` produces the
+text served at ``/api/metrics``.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 25)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """A Prometheus histogram with optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        label_names: Sequence[str] = (),
+    ) -> None:
+        """Create the histogram.
+
+        Args:
+            name: Metric name.
+            documentation: The ``# HELP`` text.
+            buckets: Upper bounds of the buckets, ascending; ``+Inf`` is implied.
+            label_names: Names of the labels passed to `observe`, in order.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(float(b) for b in buckets)
+        self.label_names = tuple(label_names)
+        # Per label set: per-bucket (non-cumulative) counts, then sum and count.
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation for the given label values."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        """Return how many observations were recorded for the label values."""
+        series = self._series.get(labels)
+        return int(series[-1]) if series else 0
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Estimate the `q` quantile for the label values, or None if unobserved.
+
+        Interpolates linearly within the bucket holding the quantile, like
+        Prometheus' ``histogram_quantile``; values past the last bound are
+        reported as that bound.
+        """
+        series = self._series.get(labels)
+        if not series or not series[-1]:
+            return None
+        rank = q * series[-1]
+        cumulative = 0.0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets, series):
+            if bucket_count and cumulative + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def clear(self) -> None:
+        """Drop every observation."""
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        """Return the exposition lines for this histogram."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, series in sorted(self._series.items()):
+            pairs = [
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.label_names, labels)
+            ]
+            prefix = ",".join(pairs)
+            cumulative = 0.0
+            bounds = [*(_format_number(b) for b in self.buckets), "+Inf"]
+            for bound, bucket_count in zip(bounds, series):
+                cumulative += bucket_count
+                le = ",".join([*pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {_format_number(cumulative)}")
+            suffix = f"{{{prefix}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{suffix} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{suffix} {_format_number(series[-1])}")
+        return lines
+
+
+NODE_SECONDS = Histogram(
+    "react_agent_node_duration_seconds",
+    "Wall time of each graph node run.",
+    LATENCY_BUCKETS,
+    ("node",),
+)
+TOOL_SECONDS = Histogram(
+    "react_agent_tool_duration_seconds",
+    "Wall time of each tool call.",
+    LATENCY_BUCKETS,
+    ("tool",),
+)
+MODEL_SECONDS = Histogram(
+    "react_agent_model_duration_seconds",
+    "Wall time of each chat-model call.",
+    LATENCY_BUCKETS,
+    ("model",),
+)
+TTFT_SECONDS = Histogram(
+    "react_agent_time_to_first_token_seconds",
+    "Time from a streamed chat-model call starting to its first token.",
+    TTFT_BUCKETS,
+    ("model",),
+)
+ITERATIONS = Histogram(
+    "react_agent_iterations",
+    "call_model steps taken per graph run.",
+    ITERATION_BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "react_agent_prompt_tokens",
+    "Input tokens reported per chat-model call.",
+    TOKEN_BUCKETS,
+    ("model",),
+)
+COMPLETION_TOKENS = Histogram(
+    "react_agent_completion_tokens",
+    "Output tokens reported per chat-model call.",
+    TOKEN_BUCKETS,
+    ("model",),
+)
+SSE_BYTES = Histogram(
+    "react_agent_sse_response_bytes",
+    "Bytes sent per streamed chat response.",
+    BYTE_BUCKETS,
+)
+
+HISTOGRAMS: List[Histogram] = [
+    NODE_SECONDS,
+    TOOL_SECONDS,
+    MODEL_SECONDS,
+    TTFT_SECONDS,
+    ITERATIONS,
+    PROMPT_TOKENS,
+    COMPLETION_TOKENS,
+    SSE_BYTES,
+]
+"""Every histogram rendered by `render_metrics`."""
+
+
+def render_metrics() -> str:
+    """Render every histogram in the Prometheus text exposition format."""
+    return "\n".join(line for h in HISTOGRAMS for line in h.render()) + "\n"
+
+
+def _model_label(metadata: Optional[Dict[str, Any]]) -> str:
+    metadata = metadata or {}
+    provider = metadata.get("ls_provider")
+    model = metadata.get("ls_model_name") or "unknown"
+    return f"{provider}/{model}" if provider else str(model)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record node, tool and model timings for the runs it is attached to."""
+
+    run_inline = True
+    """Handle events on the event loop rather than in a worker thread."""
+
+    def __init__(self) -> None:
+        """Create a handler with no runs in flight."""
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._tools: Dict[UUID, Tuple[str, float]] = {}
+        self._models: Dict[UUID, Tuple[str, float, bool]] = {}
+        self._iterations: Dict[UUID, int] = {}
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a graph run or one of its nodes."""
+        if parent_run_id is None:
+            self._iterations[run_id] = 0
+            return
+        node = (metadata or {}).get("langgraph_node")
+        if node is None or kwargs.get("name") != node:
+            return
+        self._nodes[run_id] = (node, time.perf_counter())
+        if node == "call_model" and parent_run_id in self._iterations:
+            self._iterations[parent_run_id] += 1
+
+    def _end_chain(self, run_id: UUID) -> None:
+        node = self._nodes.pop(run_id, None)
+        if node is not None:
+            NODE_SECONDS.observe(time.perf_counter() - node[1], node[0])
+            return
+        iterations = self._iterations.pop(run_id, None)
+        if iterations:
+            ITERATIONS.observe(iterations)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the duration of a node, or the iterations of a graph run."""
+        self._end_chain(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Record a node or run that failed the same way as one that finished."""
+        self._end_chain(run_id)
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a chat-model call."""
+        self._models[run_id] = (_model_label(metadata), time.perf_counter(), False)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the time to first token of a streamed call."""
+        call = self._models.get(run_id)
+        if call is not None and not call[2]:
+            TTFT_SECONDS.observe(time.perf_counter() - call[1], call[0])
+            self._models[run_id] = (call[0], call[1], True)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the duration and token usage of a chat-model call."""
+        call = self._models.pop(run_id, None)
+        if call is None:
+            return
+        model = call[0]
+        MODEL_SECONDS.observe(time.perf_counter() - call[1], model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = (
+                    getattr(generation.message, "usage_metadata", None)
+                    if isinstance(generation, ChatGeneration)
+                    else None
+                )
+                if usage:
+                    PROMPT_TOKENS.observe(usage.get("input_tokens", 0), model)
+                    COMPLETION_TOKENS.observe(usage.get("output_tokens", 0), model)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Forget a chat-model call that failed."""
+        self._models.pop(run_id, None)
+
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a tool call."""
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._tools[run_id] = (str(name), time.perf_counter())
+
+    def _end_tool(self, run_id: UUID) -> None:
+        tool = self._tools.pop(run_id, None)
+        if tool is not None:
+            TOOL_SECONDS.observe(time.perf_counter() - tool[1], tool[0])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the duration of a tool call."""
+        self._end_tool(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Record the duration of a tool call that raised."""
+        self._end_tool(run_id)
+
+
+METRICS_HANDLER = MetricsCallbackHandler()
+"""Process-wide handler; add it to a run's ``callbacks`` to instrument it."""
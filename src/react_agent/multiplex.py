@@ -0,0 +1,157 @@
+"""Run many streamed conversations over one connection.
+
+`Multiplexer` drives any number of runs at once and sends their events,
+tagged with the run's ``request_id`` and a per-run ``seq``, through a single
+``send`` callable such as a WebSocket. Each run has a credit window: at most
+`window` events may be unacknowledged before that run pauses, so a slow
+consumer of one conversation does not hold up the others. A run is cancelled
+on its own through the stop future handed to its event source.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from react_agent.sse import StreamEvent, dumps_json
+
+EventSource = Callable[["asyncio.Future[None]"], AsyncIterator[StreamEvent]]
+"""Starts a run given its stop future and returns the run's events."""
+
+
+class RunWindow:
+    """Credit-based flow control for the events of one run."""
+
+    def __init__(self, window: int) -> None:
+        """Allow `window` unacknowledged events; 0 means unlimited."""
+        self.window = window
+        self.sent = 0
+        self.acked = 0
+        self._changed = asyncio.Event()
+
+    def ack(self, seq: int) -> None:
+        """Record that the client has handled every event up to `seq`."""
+        if seq > self.acked:
+            self.acked = min(seq, self.sent)
+            self._changed.set()
+
+    def release(self) -> None:
+        """Stop holding back events, e.g. because the run is being cancelled."""
+        self.window = 0
+        self._changed.set()
+
+    async def wait(self) -> None:
+        """Wait until another event may be sent."""
+        while self.window and self.sent - self.acked >= self.window:
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class _Run:
+    def __init__(self, window: int) -> None:
+        self.window = RunWindow(window)
+        self.stop: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task[None]] = None
+
+
+class Multiplexer:
+    """Concurrent runs sharing one outgoing message channel."""
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        window: int = 64,
+        max_runs: int = 32,
+    ) -> None:
+        """Create the multiplexer.
+
+        Args:
+            send: Sends one encoded message to the client.
+            window: Unacknowledged events allowed per run; 0 turns flow control off.
+            max_runs: Runs allowed at once on this channel.
+        """
+        self._send = send
+        self.window = window
+        self.max_runs = max_runs
+        self._runs: Dict[str, _Run] = {}
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def active(self) -> int:
+        """Number of runs in progress."""
+        return len(self._runs)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Encode and send one message; concurrent runs never interleave frames."""
+        text = dumps_json(message)
+        async with self._send_lock:
+            await self._send(text)
+
+    def start(self, request_id: str, source: EventSource) -> None:
+        """Start a run whose events are tagged with `request_id`.
+
+        Raises:
+            ValueError: `request_id` is already running, or too many runs are.
+        """
+        if request_id in self._runs:
+            raise ValueError(f"Request {request_id!r} is already running")
+        if len(self._runs) >= self.max_runs:
+            raise ValueError(f"At most {self.max_runs} runs may be active at once")
+        run = _Run(self.window)
+        self._runs[request_id] = run
+        run.task = asyncio.ensure_future(self._pump(request_id, run, source))
+
+    def ack(self, request_id: str, seq: int) -> None:
+        """Acknowledge the events of `request_id` up to `seq`."""
+        run = self._runs.get(request_id)
+        if run is not None:
+            run.window.ack(seq)
+
+    def cancel(self, request_id: str) -> bool:
+        """Ask a run to stop. Return whether it was running."""
+        run = self._runs.get(request_id)
+        if run is None:
+            return False
+        if not run.stop.done():
+            run.stop.set_result(None)
+        run.window.release()
+        return True
+
+    async def close(self) -> None:
+        """Cancel every run and wait for them to wind down."""
+        tasks = [run.task for run in self._runs.values() if run.task is not None]
+        for request_id in list(self._runs):
+            self.cancel(request_id)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _pump(self, request_id: str, run: _Run, source: EventSource) -> None:
+        events = source(run.stop)
+        try:
+            async for event in events:
+                await run.window.wait()
+                if run.stop.done():
+                    break
+                run.window.sent += 1
+                await self.send(
+                    {**event, "request_id": request_id, "seq": run.window.sent}
+                )
+            if run.stop.done():
+                run.window.sent += 1
+                await self.send(
+                    {
+                        "type": "cancelled",
+                        "request_id": request_id,
+                        "seq": run.window.sent,
+                    }
+                )
+        except Exception as e:
+            with suppress(Exception):
+                await self.send(
+                    {"type": "error", "request_id": request_id, "error": str(e)}
+                )
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            self._runs.pop(request_id, None)
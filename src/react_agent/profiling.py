@@ -0,0 +1,395 @@
+"""Opt-in, request-scoped profiling with Chrome trace output.
+
+`Profile` collects a timeline for one request: graph node spans, model and tool
+calls (via `ProfilingCallbackHandler`), sections marked with `profile_section`,
+and event-loop lag sampled at a fixed interval. The timeline is exported in the
+Chrome Trace Event format, which chrome://tracing, Perfetto and speedscope open.
+
+Profiling is off unless a request asks for it, so `profile_section` only costs a
+ContextVar lookup on the normal path. When on, the number of recorded events is
+capped and lag is sampled rather than traced.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+
+PROFILE_MODES = ("inline", "file")
+"""`inline` returns the trace with the response; `file` writes it to PROFILE_DIR."""
+
+_current: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+@dataclass
+class Span:
+    """A timed section of the request."""
+
+    name: str
+    category: str
+    start: float
+    end: float
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class Profile:
+    """Timeline of one request."""
+
+    def __init__(
+        self,
+        name: str,
+        lag_interval: float = 0.01,
+        max_events: int = 10000,
+    ) -> None:
+        """Create an empty profile.
+
+        Args:
+            name: Label for the trace, e.g. the endpoint and conversation id.
+            lag_interval: Seconds between event-loop lag samples; 0 disables them.
+            max_events: Spans and samples kept; later ones are counted as dropped.
+        """
+        self.name = name
+        self.lag_interval = lag_interval
+        self.max_events = max_events
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.instants: List[Tuple[str, str, float, Dict[str, Any]]] = []
+        self.lag_samples: List[Tuple[float, float]] = []
+        self.dropped = 0
+        self._sampler: Optional[asyncio.Task[None]] = None
+        self._token: Optional[Token[Optional[Profile]]] = None
+
+    def _has_room(self) -> bool:
+        if (
+            len(self.spans) + len(self.instants) + len(self.lag_samples)
+            < self.max_events
+        ):
+            return True
+        self.dropped += 1
+        return False
+
+    def add_span(
+        self, name: str, category: str, start: float, end: float, **args: Any
+    ) -> None:
+        """Record a section that ran from `start` to `end` (perf_counter seconds)."""
+        if self._has_room():
+            self.spans.append(Span(name, category, start, end, args))
+
+    def mark(self, name: str, category: str, **args: Any) -> None:
+        """Record a point in time, such as a model's first token."""
+        if self._has_room():
+            self.instants.append((name, category, time.perf_counter(), args))
+
+    @contextmanager
+    def section(self, name: str, category: str = "cpu", **args: Any) -> Iterator[None]:
+        """Record the enclosed block as a span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), **args)
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(loop.time() - expected, 0.0)
+            if self._has_room():
+                self.lag_samples.append((time.perf_counter(), lag))
+
+    def start(self) -> None:
+        """Make this the current profile and start sampling event-loop lag."""
+        self._token = _current.set(self)
+        if self.lag_interval and self._sampler is None:
+            self._sampler = asyncio.ensure_future(self._sample_lag())
+
+    async def stop(self) -> None:
+        """Stop sampling event-loop lag and stop being the current profile."""
+        if self._token is not None:
+            # Fails only if stopped from another context, which already lacks it.
+            with suppress(ValueError):
+                _current.reset(self._token)
+            self._token = None
+        if self._sampler is not None:
+            self._sampler.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sampler
+            self._sampler = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Return total span time per category and the worst event-loop lag."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.category] = (
+                totals.get(span.category, 0.0) + span.end - span.start
+            )
+        lags = [lag for _, lag in self.lag_samples]
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "span_ms_by_category": {k: round(v * 1000, 3) for k, v in totals.items()},
+            "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 3),
+            "loop_lag_samples": len(lags),
+            "dropped_events": self.dropped,
+        }
+
+    def _us(self, t: float) -> float:
+        return round((t - self.started) * 1e6, 1)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Export the timeline in the Chrome Trace Event format."""
+        events: List[Dict[str, Any]] = [
+            {"ph": "M", "pid": 1, "name": "process_name", "args": {"name": self.name}}
+        ]
+        # Overlapping spans of a category go on separate lanes so they nest cleanly.
+        lanes: Dict[str, List[float]] = {}
+        lane_ids: Dict[Tuple[str, int], int] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            ends = lanes.setdefault(span.category, [])
+            lane = next(
+                (i for i, end in enumerate(ends) if end <= span.start), len(ends)
+            )
+            if lane == len(ends):
+                ends.append(span.end)
+            else:
+                ends[lane] = span.end
+            tid = lane_ids.setdefault((span.category, lane), len(lane_ids) + 1)
+            events.append(
+                {
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": tid,
+                    "name": span.name,
+                    "cat": span.category,
+                    "ts": self._us(span.start),
+                    "dur": round((span.end - span.start) * 1e6, 1),
+                    "args": span.args,
+                }
+            )
+        for (category, lane), tid in lane_ids.items():
+            label = category if lane == 0 else f"{category} #{lane + 1}"
+            events.append(
+                {
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": tid,
+                    "name": "thread_name",
+                    "args": {"name": label},
+                }
+            )
+        for name, category, t, args in self.instants:
+            events.append(
+                {
+                    "ph": "i",
+                    "s": "p",
+                    "pid": 1,
+                    "name": name,
+                    "cat": category,
+                    "ts": self._us(t),
+                    "args": args,
+                }
+            )
+        for t, lag in self.lag_samples:
+            events.append(
+                {
+                    "ph": "C",
+                    "pid": 1,
+                    "name": "event_loop_lag_ms",
+                    "ts": self._us(t),
+                    "args": {"lag": round(lag * 1000, 3)},
+                }
+            )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": self.summary(),
+        }
+
+    def write(self, directory: str) -> str:
+        """Write the Chrome trace to a new file in `directory` and return its path."""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.name)[:80]
+        path = Path(directory) / f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}.trace.json"
+        path.write_text(json.dumps(self.to_chrome_trace(), default=str))
+        return str(path)
+
+
+def current_profile() -> Optional[Profile]:
+    """Return the profile of the current request, if it is being profiled."""
+    return _current.get()
+
+
+@contextmanager
+def profile_section(name: str, category: str = "cpu", **args: Any) -> Iterator[None]:
+    """Record the enclosed block in the current profile, if there is one."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with profile.section(name, category, **args):
+        yield
+
+
+def requested_mode(header: Optional[str]) -> Optional[str]:
+    """Return the profiling mode for a request, or None to skip profiling.
+
+    The ``X-Profile`` header (`inline`, `file`, or any true value for `inline`)
+    wins. Otherwise PROFILE_REQUESTS turns profiling on for a fraction
+    PROFILE_SAMPLE_RATE (default 1.0) of requests.
+    """
+    value = (header or "").strip().lower()
+    if value in PROFILE_MODES:
+        return value
+    if value in ("1", "true", "yes", "on"):
+        return "inline"
+    if value in ("0", "false", "no", "off"):
+        return None
+    mode = os.getenv("PROFILE_REQUESTS", "").strip().lower()
+    if mode not in PROFILE_MODES:
+        return None
+    if random.random() >= float(os.getenv("PROFILE_SAMPLE_RATE", "1.0")):
+        return None
+    return mode
+
+
+def create_profile(name: str) -> Profile:
+    """Create a profile configured from PROFILE_LAG_INTERVAL_MS and PROFILE_MAX_EVENTS."""
+    return Profile(
+        name,
+        lag_interval=float(os.getenv("PROFILE_LAG_INTERVAL_MS", "10")) / 1000,
+        max_events=int(os.getenv("PROFILE_MAX_EVENTS", "10000")),
+    )
+
+
+def profile_dir() -> str:
+    """Directory that `file` mode writes traces to (PROFILE_DIR)."""
+    return os.getenv("PROFILE_DIR") or "./profiles"
+
+
+async def finish_profile(profile: Profile, mode: str) -> Dict[str, Any]:
+    """Stop `profile` and return what the response carries for `mode`.
+
+    Returns:
+        The Chrome trace for `inline`; for `file`, the path it was written to
+        and the summary.
+    """
+    await profile.stop()
+    if mode == "file":
+        path = await asyncio.to_thread(profile.write, profile_dir())
+        return {"path": path, "summary": profile.summary()}
+    return profile.to_chrome_trace()
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """Record graph nodes, model calls and tool calls into a profile."""
+
+    run_inline = True
+
+    def __init__(self, profile: Profile) -> None:
+        """Record into `profile`."""
+        self.profile = profile
+        self._open: Dict[UUID, Tuple[str, str, float, Dict[str, Any]]] = {}
+
+    def _begin(self, run_id: UUID, name: str, category: str, **args: Any) -> None:
+        self._open[run_id] = (name, category, time.perf_counter(), args)
+
+    def _finish(self, run_id: UUID, **args: Any) -> None:
+        opened = self._open.pop(run_id, None)
+        if opened is not None:
+            name, category, start, start_args = opened
+            self.profile.add_span(
+                name, category, start, time.perf_counter(), **start_args, **args
+            )
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open a span for a graph node."""
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            self._begin(
+                run_id, node, "node", step=(metadata or {}).get("langgraph_step")
+            )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close a node span."""
+        self._finish(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close a node span that failed."""
+        self._finish(run_id, error=type(error).__name__)
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open a span for a model call."""
+        model = (metadata or {}).get("ls_model_name") or "model"
+        self._begin(
+            run_id, f"llm {model}", "llm", messages=len(messages[0]) if messages else 0
+        )
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        """Mark the first streamed token of a model call."""
+        opened = self._open.get(run_id)
+        if opened is not None and not opened[3].get("first_token"):
+            opened[3]["first_token"] = True
+            self.profile.mark("first_token", "llm")
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close a model call span."""
+        self._finish(run_id)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close a model call span that failed."""
+        self._finish(run_id, error=type(error).__name__)
+
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Open a span for a tool call."""
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._begin(run_id, f"tool {name}", "tool")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close a tool call span."""
+        self._finish(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close a tool call span that failed."""
+        self._finish(run_id, error=type(error).__name__)
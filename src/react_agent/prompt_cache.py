@@ -0,0 +1,121 @@
+"""Keep the prompt prefix byte-identical across calls so providers can cache it.
+
+Provider-side prompt caching (automatic on OpenAI, opt-in via cache breakpoints
+on Anthropic) only helps when the start of the prompt does not change between
+calls. This module renders the system time at a coarse granularity, splits the
+system prompt into a stable prefix and a volatile suffix, and counts how many
+input tokens the provider reported as read from its cache.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Union
+
+from langchain_core.messages import BaseMessage
+
+TIME_GRANULARITIES = ("microsecond", "second", "minute", "hour", "day")
+
+_TIME_PLACEHOLDER = "{system_time}"
+_CACHE_BREAKPOINT = {"type": "ephemeral"}
+
+
+def truncate_time(now: datetime, granularity: str) -> datetime:
+    """Round `now` down to the given granularity."""
+    if granularity == "microsecond":
+        return now
+    if granularity not in TIME_GRANULARITIES:
+        raise ValueError(
+            f"Unknown system_time_granularity {granularity!r}; "
+            f"expected one of {', '.join(TIME_GRANULARITIES)}"
+        )
+    now = now.replace(microsecond=0)
+    if granularity in ("minute", "hour", "day"):
+        now = now.replace(second=0)
+    if granularity in ("hour", "day"):
+        now = now.replace(minute=0)
+    if granularity == "day":
+        now = now.replace(hour=0)
+    return now
+
+
+def supports_cache_breakpoints(fully_specified_name: str) -> bool:
+    """Return whether the provider takes explicit cache_control breakpoints."""
+    return fully_specified_name.split("/", maxsplit=1)[0] == "anthropic"
+
+
+def build_system_content(
+    template: str, system_time: str, cache_breakpoint: bool = False
+) -> Union[str, List[Dict[str, Any]]]:
+    """Render the system prompt, optionally as cache-annotated content blocks.
+
+    With `cache_breakpoint`, the text before ``{system_time}`` becomes its own
+    block marked with ``cache_control`` and the time (plus anything after it)
+    goes in a second, uncached block.
+    """
+    if not cache_breakpoint or _TIME_PLACEHOLDER not in template:
+        text = template.format(system_time=system_time)
+        if not cache_breakpoint:
+            return text
+        return [{"type": "text", "text": text, "cache_control": _CACHE_BREAKPOINT}]
+
+    prefix, suffix = template.split(_TIME_PLACEHOLDER, 1)
+    blocks: List[Dict[str, Any]] = []
+    stable = prefix.format()
+    if stable:
+        blocks.append(
+            {"type": "text", "text": stable, "cache_control": _CACHE_BREAKPOINT}
+        )
+    blocks.append({"type": "text", "text": system_time + suffix.format()})
+    return blocks
+
+
+def system_content_text(content: Union[str, List[Dict[str, Any]]]) -> str:
+    """Return the plain text of content built by `build_system_content`."""
+    if isinstance(content, str):
+        return content
+    return "".join(block["text"] for block in content)
+
+
+def append_system_text(
+    content: Union[str, List[Dict[str, Any]]], text: str
+) -> Union[str, List[Dict[str, Any]]]:
+    """Append `text` to system content without touching cached blocks."""
+    if isinstance(content, str):
+        return content + text
+    return [*content, {"type": "text", "text": text}]
+
+
+@dataclass
+class PromptCacheStats:
+    """Input tokens reported by providers, and how many were cache reads."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of input tokens served from the provider's prompt cache."""
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def record(self, message: BaseMessage) -> None:
+        """Add the usage reported on a model response."""
+        usage = getattr(message, "usage_metadata", None)
+        if not usage:
+            return
+        details = usage.get("input_token_details") or {}
+        self.calls += 1
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.cache_read_tokens += details.get("cache_read") or 0
+        self.cache_creation_tokens += details.get("cache_creation") or 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters and hit rate as a plain dict."""
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+PROMPT_CACHE_STATS = PromptCacheStats()
+"""Process-wide prompt cache counters, updated by `call_model`."""
@@ -3,3 +3,21 @@
 SYSTEM_PROMPT = """You are a helpful AI assistant.
 
 System time: {system_time}"""
+
+SUMMARY_PROMPT = """Summarize the earlier part of a conversation between a user and \
+an AI assistant so the assistant can continue it without the original messages.
+Keep facts, names, numbers, decisions and open questions. Drop pleasantries.
+Use at most 200 words.
+
+Existing summary (may be empty):
+{summary}
+
+New messages to fold in:
+{messages}"""
+
+SUMMARY_SECTION = """Summary of earlier conversation:
+{summary}"""
+
+DEADLINE_SECTION = """The time available for this request is nearly up. Do not call any \
+more tools: answer now with the information you already have, and say briefly if \
+it may be incomplete."""
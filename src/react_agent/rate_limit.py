@@ -0,0 +1,283 @@
+"""Pace outgoing provider calls with token buckets tuned by rate-limit headers.
+
+One `RateLimiter` is shared by every chat-model client and the search tool. It
+keeps a request bucket and a token bucket per key (``provider/model``, or
+``tavily/search``) and makes callers wait for capacity before a call goes out.
+The buckets start from configured limits, or unlimited, and are resized from
+the ``x-ratelimit-*`` (OpenAI) and ``anthropic-ratelimit-*`` headers on every
+response. A 429 pauses the key until its ``Retry-After`` has passed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from functools import cache
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+import httpx
+
+from react_agent.profiling import profile_section
+
+_WINDOW_SECONDS = 60.0
+"""Providers publish per-minute limits; buckets refill at limit / minute."""
+
+_HEADER_PREFIXES = ("x-ratelimit-", "anthropic-ratelimit-")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: str, now: Optional[float] = None) -> Optional[float]:
+    """Return the seconds until a rate-limit reset.
+
+    Accepts plain seconds (``Retry-After``), Go-style durations such as
+    ``6m0s`` or ``20ms`` (OpenAI), RFC 3339 timestamps (Anthropic) and HTTP
+    dates.
+    """
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    wall_now = time.time() if now is None else now
+    for parse in (datetime.fromisoformat, parsedate_to_datetime):
+        try:
+            moment = parse(value)
+        except (TypeError, ValueError):
+            continue
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=UTC)
+        return max(moment.timestamp() - wall_now, 0.0)
+    return None
+
+
+class TokenBucket:
+    """A token bucket that lets callers reserve capacity ahead of time.
+
+    Reservations may take the level below zero; the caller then waits until the
+    refill has paid the debt back, which spaces calls out evenly instead of
+    releasing them in bursts.
+    """
+
+    def __init__(self, per_minute: float = 0.0) -> None:
+        """Create a bucket allowing `per_minute` units per minute (0 = unlimited)."""
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in units per second."""
+        return self.capacity / _WINDOW_SECONDS
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units and return how many seconds to wait for them."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float) -> None:
+        """Adopt the limit and remaining capacity reported by the provider."""
+        self._refill(now)
+        if limit:
+            if not self.capacity:
+                self.level = limit
+            self.capacity = limit
+        if remaining is not None and self.capacity:
+            self.level = min(self.level, remaining)
+
+
+@dataclass
+class KeyLimits:
+    """Buckets and counters for one provider/model key."""
+
+    requests: TokenBucket
+    tokens: TokenBucket
+    paused_until: float = 0.0
+    waits: int = 0
+    wait_seconds: float = 0.0
+    throttled: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the current limits and counters."""
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 4),
+            "throttled": self.throttled,
+        }
+
+
+class RateLimiter:
+    """Token-bucket limiters keyed by ``provider/model``."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[Dict[str, float]] = None,
+        tokens_per_minute: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Create the limiter.
+
+        Args:
+            requests_per_minute: Starting request limits per key. Keys without one
+                are unlimited until a response reports their limit.
+            tokens_per_minute: Starting token limits per key.
+        """
+        self.requests_per_minute = dict(requests_per_minute or {})
+        self.tokens_per_minute = dict(tokens_per_minute or {})
+        self._keys: Dict[str, KeyLimits] = {}
+
+    def limits(self, key: str) -> KeyLimits:
+        """Return the buckets for `key`, creating them on first use."""
+        if key not in self._keys:
+            self._keys[key] = KeyLimits(
+                requests=TokenBucket(self.requests_per_minute.get(key, 0.0)),
+                tokens=TokenBucket(self.tokens_per_minute.get(key, 0.0)),
+            )
+        return self._keys[key]
+
+    async def acquire(self, key: str, tokens: int = 0) -> float:
+        """Wait until one request (and `tokens` tokens) may be sent for `key`.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        limits = self.limits(key)
+        now = time.monotonic()
+        # Capacity is reserved on arrival, so waiting callers keep FIFO order.
+        delay = max(
+            limits.paused_until - now,
+            limits.requests.reserve(1, now),
+            limits.tokens.reserve(tokens, now),
+            0.0,
+        )
+        if delay:
+            limits.waits += 1
+            limits.wait_seconds += delay
+            with profile_section("rate_limit.wait", "wait", key=key):
+                await asyncio.sleep(delay)
+        return delay
+
+    def observe(self, key: str, headers: Mapping[str, str], status_code: int = 200) -> None:
+        """Update the buckets for `key` from a response's headers."""
+        limits = self.limits(key)
+        now = time.monotonic()
+        values = {
+            name[len(prefix) :]: value
+            for name, value in ((k.lower(), v) for k, v in headers.items())
+            for prefix in _HEADER_PREFIXES
+            if name.startswith(prefix)
+        }
+
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(values[name])
+            except (KeyError, ValueError):
+                return None
+
+        for kind, bucket in (("requests", limits.requests), ("tokens", limits.tokens)):
+            # OpenAI says "limit-requests", Anthropic says "requests-limit".
+            limit = number(f"limit-{kind}") or number(f"{kind}-limit")
+            remaining = number(f"remaining-{kind}")
+            if remaining is None:
+                remaining = number(f"{kind}-remaining")
+            bucket.sync(limit, remaining, now)
+            reset = values.get(f"reset-{kind}") or values.get(f"{kind}-reset")
+            if remaining == 0 and reset:
+                limits.paused_until = max(
+                    limits.paused_until, now + (parse_reset(reset) or 0.0)
+                )
+
+        if status_code == 429:
+            limits.throttled += 1
+            retry_after = headers.get("retry-after") or headers.get("Retry-After")
+            pause = parse_reset(retry_after) if retry_after else None
+            limits.paused_until = max(limits.paused_until, now + (pause or 1.0))
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Return the limits and counters of every key seen so far."""
+        return {key: limits.as_dict() for key, limits in self._keys.items()}
+
+
+def _parse_limits(raw: str) -> Dict[str, float]:
+    limits: Dict[str, float] = {}
+    for item in raw.split(","):
+        if "=" in item:
+            key, limit = item.rsplit("=", 1)
+            limits[key.strip()] = float(limit)
+    return limits
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Create a limiter with starting limits from environment variables.
+
+    RATE_LIMIT_RPM and RATE_LIMIT_TPM take ``key=N`` pairs separated by commas,
+    e.g. ``openai/gpt-4o-mini=500,tavily/search=100``.
+    """
+    return RateLimiter(
+        requests_per_minute=_parse_limits(os.getenv("RATE_LIMIT_RPM", "")),
+        tokens_per_minute=_parse_limits(os.getenv("RATE_LIMIT_TPM", "")),
+    )
+
+
+RATE_LIMITER = create_rate_limiter()
+"""Process-wide limiter shared by chat-model clients and the search tool."""
+
+
+def _request_key(provider: str, request: httpx.Request) -> str:
+    try:
+        model = json.loads(request.content).get("model")
+    except (ValueError, AttributeError, httpx.RequestNotRead):
+        model = None
+    return f"{provider}/{model}" if model else provider
+
+
+@cache
+def rate_limit_hooks(
+    provider: str,
+) -> Dict[str, List[Callable[..., Awaitable[None]]]]:
+    """Return httpx event hooks that pace requests to `provider` and read limits.
+
+    The hooks key each call by the ``model`` field of its JSON body, so one
+    HTTP client can be shared by several models. Retries made by the provider
+    SDK pass through the hooks too.
+    """
+
+    async def pace(request: httpx.Request) -> None:
+        await RATE_LIMITER.acquire(
+            _request_key(provider, request), tokens=len(request.content) // 4
+        )
+
+    async def observe(response: httpx.Response) -> None:
+        RATE_LIMITER.observe(
+            _request_key(provider, response.request),
+            response.headers,
+            response.status_code,
+        )
+
+    return {"request": [pace], "response": [observe]}
+
+
+def install_rate_limit_hooks(client: httpx.AsyncClient, provider: str) -> None:
+    """Add the `provider` hooks to an existing client, at most once."""
+    for event, hooks in rate_limit_hooks(provider).items():
+        installed = client.event_hooks[event]
+        for hook in hooks:
+            if hook not in installed:
+                installed.append(hook)
@@ -0,0 +1,68 @@
+"""Cache of final answers to repeated first-turn questions.
+
+Many conversations open with the same question (FAQs, status checks). When the
+cache is enabled, the answer to a conversation's first turn is stored under a key
+built from the normalized message, the model, the system prompt and the search
+settings, so an identical opening question is answered without running the
+graph. Later turns depend on the conversation so far and are never cached, and
+neither are answers the deadline or the step limit cut short, which a later
+request with more time would answer better.
+
+Entries live in a `TTLCache` (TTL plus LRU eviction) and, with
+RESPONSE_CACHE_PATH set, in a local SQLite file that survives restarts. The
+cache is off unless RESPONSE_CACHE_TTL is positive.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+
+from react_agent.cache import SQLiteCacheBackend, TTLCache
+from react_agent.context import Context
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?。！？]+$")
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a question so case, spacing and final punctuation do not matter."""
+    text = re.sub(r"\s+", " ", message).strip().casefold()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def response_cache_key(message: str, context: Context) -> str:
+    """Return the cache key of a first-turn `message` answered under `context`."""
+    parts = [
+        normalize_message(message),
+        context.model,
+        context.system_prompt,
+        context.max_search_results,
+    ]
+    digest = hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_complete_answer(message: AIMessage) -> bool:
+    """Whether `message` is a final answer that ended normally and may be cached."""
+    return not message.tool_calls and "cut_short" not in message.response_metadata
+
+
+def create_response_cache() -> TTLCache:
+    """Create the cache from environment variables.
+
+    RESPONSE_CACHE_TTL (seconds; 0, the default, disables it),
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES and RESPONSE_CACHE_PATH
+    (optional SQLite file for persistence).
+    """
+    path: Optional[str] = os.getenv("RESPONSE_CACHE_PATH")
+    return TTLCache(
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "0")),
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        backend=SQLiteCacheBackend(path) if path else None,
+    )
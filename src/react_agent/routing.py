@@ -0,0 +1,287 @@
+"""Hedged requests and fast failover across equivalent chat models.
+
+Each model may have an ordered list of fallbacks (``MODEL_FALLBACKS``). A call
+starts on the primary. If no token has arrived once the primary's usual time to
+first token has passed (a quantile of the live TTFT histogram), the same request
+is also sent to the first fallback, and whichever call produces a token first
+wins; the other is cancelled. A call that fails with 429 or a 5xx before its first
+token hands over to the next model in the list at once instead of waiting for the
+provider to recover.
+
+The winner claims the race from inside its own task, in the same event-loop step
+as its first chunk, and cancels the other calls there. A cancelled call never
+resumes, so tokens from a losing call are never streamed to the client.
+
+The routing decision is attached to the returned message as
+``response_metadata["routing"]``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, cast
+
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    BaseMessageChunk,
+    message_chunk_to_message,
+)
+from langchain_core.runnables import Runnable
+
+from react_agent.metrics import TTFT_SECONDS, Histogram
+
+RETRYABLE_STATUS_CODES = frozenset({429})
+"""Statuses, besides 5xx, after which the next model is tried."""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Return the HTTP status carried by a provider SDK or httpx error, if any."""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether `error` is worth retrying on another model: a 429 or a 5xx."""
+    code = status_code(error)
+    return code is not None and (code in RETRYABLE_STATUS_CODES or code >= 500)
+
+
+@dataclass
+class Candidate:
+    """One model a call may be routed to, with the input prepared for it."""
+
+    model: str
+    runnable: Runnable[LanguageModelInput, BaseMessage]
+    input: LanguageModelInput
+
+
+@dataclass
+class RoutingDecision:
+    """How one model call was routed."""
+
+    primary: str
+    model: str = ""
+    """The model whose response was used."""
+    hedged: bool = False
+    """Whether a hedged request was sent."""
+    hedge_after_seconds: Optional[float] = None
+    failovers: List[Dict[str, Any]] = field(default_factory=list)
+    """Calls that failed before their first token: model, status and seconds."""
+    ttft_seconds: Optional[float] = None
+    """Seconds from the start of routing to the winner's first token."""
+    latency_saved_seconds: Optional[float] = None
+    """When a hedge won: the primary's p99 time to first token minus the time
+    the winner needed, an estimate since the primary is cancelled."""
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the decision as a plain dict."""
+        return asdict(self)
+
+
+@dataclass
+class RouterStats:
+    """Counters describing routed model calls."""
+
+    calls: int = 0
+    hedges: int = 0
+    hedges_won: int = 0
+    failovers: int = 0
+    latency_saved_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {**asdict(self), "latency_saved_seconds": round(self.latency_saved_seconds, 3)}
+
+
+class _Race:
+    """Shared state of the calls racing for one response."""
+
+    def __init__(self) -> None:
+        self.winner: Optional[asyncio.Task[BaseMessage]] = None
+        self.tasks: Set[asyncio.Task[BaseMessage]] = set()
+        self.changed = asyncio.Event()
+
+
+class ModelRouter:
+    """Route model calls across ordered lists of equivalent models."""
+
+    def __init__(
+        self,
+        fallbacks: Optional[Dict[str, List[str]]] = None,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_default_seconds: float = 2.0,
+        ttft: Histogram = TTFT_SECONDS,
+    ) -> None:
+        """Create the router.
+
+        Args:
+            fallbacks: Backup models for each primary, in the order they are tried.
+            hedge_quantile: Quantile of the primary's TTFT after which a hedged
+                request is sent; 0 turns hedging off and keeps only failover.
+            hedge_min_samples: TTFT observations needed before the quantile is used.
+            hedge_default_seconds: Hedge delay until then.
+            ttft: Time-to-first-token histogram labelled by model.
+        """
+        self.fallbacks = fallbacks or {}
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_seconds = hedge_default_seconds
+        self.ttft = ttft
+        self.stats = RouterStats()
+
+    def models(self, model: str) -> List[str]:
+        """Return `model` followed by its fallbacks."""
+        return [model, *(m for m in self.fallbacks.get(model, []) if m != model)]
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds without a token from `model` before hedging, or None for never."""
+        if self.hedge_quantile <= 0:
+            return None
+        if self.ttft.count(model) < self.hedge_min_samples:
+            return self.hedge_default_seconds
+        value = self.ttft.quantile(self.hedge_quantile, model)
+        return self.hedge_default_seconds if value is None else value
+
+    async def ainvoke(self, candidates: Sequence[Candidate]) -> BaseMessage:
+        """Return the response of the first candidate to produce a token.
+
+        Raises:
+            Exception: The error of the last call to fail, when no call is left
+                running and no candidate is left to fail over to. An error that
+                is not a 429 or 5xx is not failed over, but a call already
+                racing may still answer.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        decision = RoutingDecision(primary=candidates[0].model)
+        race = _Race()
+        names: Dict[asyncio.Task[BaseMessage], str] = {}
+        first_token: Dict[asyncio.Task[BaseMessage], float] = {}
+        self.stats.calls += 1
+
+        async def call(candidate: Candidate) -> BaseMessage:
+            task = cast("asyncio.Task[BaseMessage]", asyncio.current_task())
+            message: Optional[BaseMessageChunk] = None
+            async for chunk in candidate.runnable.astream(candidate.input):
+                if race.winner is None:
+                    # Claim the race before anything else runs, so the losers
+                    # are cancelled before they can stream a token.
+                    race.winner = task
+                    first_token[task] = loop.time()
+                    for other in race.tasks:
+                        if other is not task:
+                            other.cancel()
+                    race.changed.set()
+                message = (
+                    chunk if message is None else message + chunk  # type: ignore[assignment]
+                )
+            if message is None:
+                return AIMessage(content="")
+            return message_chunk_to_message(message)
+
+        def start(candidate: Candidate) -> None:
+            task = asyncio.ensure_future(call(candidate))
+            race.tasks.add(task)
+            names[task] = candidate.model
+            task.add_done_callback(lambda _: race.changed.set())
+
+        remaining = list(candidates[1:])
+        hedge_after = self.hedge_delay(candidates[0].model) if remaining else None
+        decision.hedge_after_seconds = hedge_after
+        start(candidates[0])
+        try:
+            while race.winner is None:
+                timeout = None
+                if hedge_after is not None and not decision.hedged and remaining:
+                    timeout = max(started + hedge_after - loop.time(), 0.0)
+                race.changed.clear()
+                try:
+                    await asyncio.wait_for(race.changed.wait(), timeout)
+                except TimeoutError:
+                    decision.hedged = True
+                    self.stats.hedges += 1
+                    start(remaining.pop(0))
+                    continue
+                if race.winner is not None:
+                    # The losers it cancelled may be done as well; they are not failures.
+                    break
+                for task in [t for t in race.tasks if t.done()]:
+                    race.tasks.discard(task)
+                    error = task.exception()
+                    if error is None:
+                        # Finished without a single chunk: nothing to race for.
+                        race.winner = task
+                        first_token[task] = loop.time()
+                        break
+                    retryable = is_retryable(error)
+                    if not race.tasks and (not retryable or not remaining):
+                        raise error
+                    if not retryable:
+                        # Another model will not fix this request; only wait for
+                        # the calls already racing.
+                        remaining.clear()
+                    self.stats.failovers += 1
+                    decision.failovers.append(
+                        {
+                            "model": names[task],
+                            "status_code": status_code(error),
+                            "seconds": round(loop.time() - started, 3),
+                        }
+                    )
+                    if remaining and not race.tasks:
+                        start(remaining.pop(0))
+            winner = race.winner
+            response = await winner
+        finally:
+            for task in race.tasks:
+                task.cancel()
+            await asyncio.gather(*race.tasks, return_exceptions=True)
+
+        decision.model = names[winner]
+        decision.ttft_seconds = round(first_token[winner] - started, 3)
+        if decision.hedged and decision.model != decision.primary:
+            self.stats.hedges_won += 1
+            expected = self.ttft.quantile(0.99, decision.primary)
+            if expected is not None:
+                decision.latency_saved_seconds = round(
+                    max(expected - decision.ttft_seconds, 0.0), 3
+                )
+                self.stats.latency_saved_seconds += decision.latency_saved_seconds
+        response.response_metadata["routing"] = decision.as_dict()
+        return response
+
+
+def _parse_fallbacks(raw: str) -> Dict[str, List[str]]:
+    fallbacks: Dict[str, List[str]] = {}
+    for item in raw.split(","):
+        if "=" in item:
+            model, backups = item.split("=", 1)
+            fallbacks[model.strip()] = [b.strip() for b in backups.split("|") if b.strip()]
+    return fallbacks
+
+
+def create_model_router() -> ModelRouter:
+    """Create a router configured from environment variables.
+
+    MODEL_FALLBACKS takes ``provider/model=backup|backup`` entries separated by
+    commas, e.g. ``openai/gpt-4o-mini=anthropic/claude-3-5-haiku-latest``.
+    HEDGE_QUANTILE, HEDGE_MIN_SAMPLES and HEDGE_DEFAULT_SECONDS set when a hedged
+    request is sent.
+    """
+    return ModelRouter(
+        fallbacks=_parse_fallbacks(os.getenv("MODEL_FALLBACKS", "")),
+        hedge_quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+        hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+        hedge_default_seconds=float(os.getenv("HEDGE_DEFAULT_SECONDS", "2")),
+    )
+
+
+MODEL_ROUTER = create_model_router()
+"""Process-wide router used by `call_model`."""
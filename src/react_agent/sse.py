@@ -0,0 +1,286 @@
+"""Resumable server-sent event streams for agent runs.
+
+A run's events are produced once, by a task that is independent of any HTTP
+connection, into a `RunStream`. Each event gets a sequential id of the form
+``<run id>:<n>`` and is encoded into an SSE frame once; the last frames are
+kept in a bounded replay buffer. A client that reconnects with
+``Last-Event-ID`` gets the frames after that id and then follows the live run,
+which keeps going for a grace period while nobody is connected. Finished runs
+are forgotten after a TTL.
+
+Consecutive ``content`` events are coalesced by time and size before they are
+framed, which cuts the number of frames per answer, and frames are encoded with
+orjson when it is installed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from contextlib import suppress
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships with langsmith
+    orjson = None  # type: ignore[assignment]
+
+StreamEvent = Dict[str, Any]
+"""An event of a streamed run: ``{"type": ..., ...}``."""
+
+
+def dumps_json(value: Any) -> str:
+    """Encode `value` as compact JSON, falling back to `str` for unknown types."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str).decode()
+        except TypeError:
+            # orjson rejects some values json accepts, e.g. non-str dict keys.
+            pass
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Split a ``Last-Event-ID`` value into its run id and sequence number."""
+    run_id, _, seq = (value or "").strip().rpartition(":")
+    if not run_id or not seq.isdigit():
+        return None
+    return run_id, int(seq)
+
+
+async def coalesce(
+    events: AsyncIterator[StreamEvent],
+    window: float = 0.025,
+    max_bytes: int = 1024,
+) -> AsyncIterator[StreamEvent]:
+    """Merge consecutive ``content`` events that arrive within `window` seconds.
+
+    Pending text is sent when the window closes, when it reaches `max_bytes`, or
+    when another kind of event arrives. The first token is never held back. A
+    zero `window` turns coalescing off.
+    """
+    if window <= 0:
+        async for passthrough in events:
+            yield passthrough
+        return
+    # `events` is drained by a single task, so context variables it sets (such as
+    # the request's tool-output tracker) stay visible to all of its steps.
+    queue: asyncio.Queue[Tuple[Optional[StreamEvent], Optional[BaseException]]] = (
+        asyncio.Queue()
+    )
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait((event, None))
+        except Exception as e:
+            queue.put_nowait((None, e))
+        else:
+            queue.put_nowait((None, None))
+
+    loop = asyncio.get_running_loop()
+    pump_task = asyncio.ensure_future(pump())
+    pending: List[str] = []
+    pending_bytes = 0
+    deadline = 0.0
+    sent_content = False
+    try:
+        while True:
+            if pending:
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(), max(deadline - loop.time(), 0.0)
+                    )
+                except TimeoutError:
+                    yield {"type": "content", "content": "".join(pending)}
+                    pending, pending_bytes = [], 0
+                    continue
+            else:
+                item = await queue.get()
+            event, error = item
+            if event is None:
+                if pending:
+                    yield {"type": "content", "content": "".join(pending)}
+                if error is not None:
+                    raise error
+                return
+            if event.get("type") == "content" and sent_content:
+                if not pending:
+                    deadline = loop.time() + window
+                pending.append(event["content"])
+                pending_bytes += len(event["content"].encode("utf-8"))
+                if pending_bytes < max_bytes:
+                    continue
+                event = {"type": "content", "content": "".join(pending)}
+                pending, pending_bytes = [], 0
+            elif pending:
+                yield {"type": "content", "content": "".join(pending)}
+                pending, pending_bytes = [], 0
+            sent_content = sent_content or event.get("type") == "content"
+            yield event
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await pump_task
+
+
+class RunStream:
+    """Events of one run, framed once and replayable by any number of clients."""
+
+    def __init__(self, run_id: str, max_events: int = 1000) -> None:
+        """Create an empty stream that keeps the last `max_events` frames."""
+        self.run_id = run_id
+        self.frames: Deque[Tuple[int, str]] = deque(maxlen=max_events)
+        self.last_id = 0
+        self.closed = False
+        self.closed_at: Optional[float] = None
+        self.followers = 0
+        self.created_at = time.monotonic()
+        self._changed = asyncio.Event()
+
+    def publish(self, event: StreamEvent) -> None:
+        """Frame `event` with the next id and wake the followers."""
+        self.last_id += 1
+        frame = f"id: {self.run_id}:{self.last_id}\ndata: {dumps_json(event)}\n\n"
+        self.frames.append((self.last_id, frame))
+        self._notify()
+
+    def close(self) -> None:
+        """Mark the run as finished."""
+        self.closed = True
+        self.closed_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def can_resume(self, after: int) -> bool:
+        """Whether every frame after id `after` is still buffered."""
+        return not self.frames or after >= self.frames[0][0] - 1
+
+    async def follow(self, after: int = 0) -> AsyncIterator[str]:
+        """Yield the frames after id `after`, then new ones until the run ends.
+
+        A follower that falls so far behind that the frames it has not read yet
+        left the buffer gets a ``gap`` event without an id and the follow ends;
+        reconnecting with its ``Last-Event-ID`` then reports the gap instead of
+        silently skipping events.
+        """
+        self.followers += 1
+        try:
+            cursor = after
+            while True:
+                changed = self._changed
+                # Ids are contiguous, so the unsent frames are a suffix of the buffer.
+                frames = self.frames
+                if frames and cursor + 1 < frames[0][0]:
+                    gap = {"type": "gap", "last_event_id": f"{self.run_id}:{cursor}"}
+                    yield f"data: {dumps_json(gap)}\n\n"
+                    return
+                start = cursor + 1 - frames[0][0] if frames else 0
+                batch = [frames[i] for i in range(start, len(frames))]
+                for seq, frame in batch:
+                    cursor = seq
+                    yield frame
+                if self.closed and cursor >= self.last_id:
+                    return
+                await changed.wait()
+        finally:
+            self.followers -= 1
+
+
+class StreamRegistry:
+    """Recent runs by id, so a reconnecting client can find its stream."""
+
+    def __init__(
+        self,
+        max_events: int = 1000,
+        ttl: float = 60.0,
+        grace: float = 15.0,
+    ) -> None:
+        """Create the registry.
+
+        Args:
+            max_events: Frames kept per run for replay.
+            ttl: Seconds a finished run stays available for replay.
+            grace: Seconds a run keeps going with no client connected.
+        """
+        self.max_events = max_events
+        self.ttl = ttl
+        self.grace = grace
+        self._runs: Dict[str, RunStream] = {}
+        self.resumed = 0
+        self.replay_gaps = 0
+
+    def create(self) -> RunStream:
+        """Register a new run."""
+        self.prune()
+        stream = RunStream(uuid.uuid4().hex, self.max_events)
+        self._runs[stream.run_id] = stream
+        return stream
+
+    def get(self, run_id: str) -> Optional[RunStream]:
+        """Return the run with `run_id`, if it is still available."""
+        self.prune()
+        return self._runs.get(run_id)
+
+    def prune(self) -> None:
+        """Forget finished runs older than the TTL."""
+        cutoff = time.monotonic() - self.ttl
+        expired = [
+            run_id
+            for run_id, stream in self._runs.items()
+            if stream.closed_at is not None and stream.closed_at < cutoff
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+    async def abandoned(self, stream: RunStream) -> None:
+        """Return once `stream` has had no followers for the grace period.
+
+        The period is counted from the run's start until a client first follows
+        it, so a run is not given up on before its response has begun.
+        """
+        idle_since: Optional[float] = stream.created_at
+        while True:
+            await asyncio.sleep(min(self.grace, 1.0) if self.grace else 0.05)
+            if stream.followers:
+                idle_since = None
+                continue
+            now = time.monotonic()
+            if idle_since is None:
+                idle_since = now
+            if now - idle_since >= self.grace:
+                return
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return counters for the health endpoint."""
+        return {
+            "runs": len(self._runs),
+            "live_runs": sum(1 for s in self._runs.values() if not s.closed),
+            "resumed": self.resumed,
+            "replay_gaps": self.replay_gaps,
+        }
+
+
+def create_stream_registry() -> StreamRegistry:
+    """Create a registry from STREAM_REPLAY_EVENTS, STREAM_REPLAY_TTL_SECONDS and STREAM_RESUME_GRACE_SECONDS."""
+    return StreamRegistry(
+        max_events=int(os.getenv("STREAM_REPLAY_EVENTS", "1000")),
+        ttl=float(os.getenv("STREAM_REPLAY_TTL_SECONDS", "60")),
+        grace=float(os.getenv("STREAM_RESUME_GRACE_SECONDS", "15")),
+    )
+
+
+def coalesce_settings() -> Tuple[float, int]:
+    """Return the (window seconds, max bytes) from SSE_COALESCE_MS and SSE_COALESCE_BYTES."""
+    return (
+        float(os.getenv("SSE_COALESCE_MS", "25")) / 1000,
+        int(os.getenv("SSE_COALESCE_BYTES", "1024")),
+    )
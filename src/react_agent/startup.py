@@ -0,0 +1,72 @@
+"""Startup readiness, kept apart from liveness.
+
+A process is alive as soon as it answers HTTP, but it should only receive traffic
+once its first request will not pay for start-up work: the checkpointed graph is
+compiled and the integration packages of the models it serves are imported.
+`StartupStatus` tracks that. The warm-up imports run in a worker thread after the
+server starts listening, so liveness probes succeed at once while readiness waits.
+
+WARMUP_MODELS lists the models to warm up, comma separated; it defaults to the
+default model and its fallbacks, and an empty value skips the warm-up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from react_agent.context import Context
+from react_agent.routing import MODEL_ROUTER
+from react_agent.utils import preload_provider
+
+
+@dataclass
+class StartupStatus:
+    """Progress of the process towards serving traffic."""
+
+    started_at: float = field(default_factory=time.monotonic)
+    ready: bool = False
+    ready_after_seconds: Optional[float] = None
+    """Seconds from `started_at` until the process became ready."""
+    preloaded: Dict[str, float] = field(default_factory=dict)
+    """Seconds spent importing each provider package."""
+    errors: Dict[str, str] = field(default_factory=dict)
+    """Models whose provider package could not be imported."""
+
+    def mark_ready(self) -> None:
+        """Record that start-up finished; a failed warm-up keeps the process unready."""
+        self.ready = not self.errors
+        self.ready_after_seconds = round(time.monotonic() - self.started_at, 3)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the status as a plain dict."""
+        return {
+            "ready": self.ready,
+            "ready_after_seconds": self.ready_after_seconds,
+            "preloaded": {k: round(v, 3) for k, v in self.preloaded.items()},
+            "errors": dict(self.errors),
+        }
+
+
+def warmup_models() -> List[str]:
+    """Return the models named by WARMUP_MODELS, or the default model and its fallbacks."""
+    raw = os.getenv("WARMUP_MODELS")
+    if raw is None:
+        return MODEL_ROUTER.models(Context().model)
+    return [m.strip() for m in raw.split(",") if m.strip()]
+
+
+async def warm_up(status: StartupStatus, models: Sequence[str]) -> None:
+    """Import the provider package of every model in `models`, then mark `status` ready."""
+    for model in models:
+        started = time.perf_counter()
+        try:
+            package = await asyncio.to_thread(preload_provider, model)
+        except ImportError as e:
+            status.errors[model] = f"{type(e).__name__}: {e}"
+            continue
+        status.preloaded.setdefault(package, time.perf_counter() - started)
+    status.mark_ready()
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Sequence
+from typing import Optional, Sequence
 
 from langchain_core.messages import AnyMessage
 from langgraph.graph import add_messages
@@ -53,6 +53,16 @@ class State(InputState):
     It is set to 'True' when the step count reaches recursion_limit - 1.
     """
 
+    context_summary: str = field(default="")
+    """
+    Running summary of earlier turns that no longer fit the context budget.
+
+    Only maintained when `Context.summarize_dropped_turns` is enabled.
+    """
+
+    summarized_until: Optional[str] = field(default=None)
+    """The id of the last message folded into `context_summary`."""
+
     # Additional attributes can be added here as needed.
     # Common examples include:
     # retrieved_documents: List[Document] = field(default_factory=list)
@@ -0,0 +1,170 @@
+"""Compact tool output before it is stored as a ToolMessage.
+
+Every ToolMessage is re-sent to the model on each later step, so fields the model
+never reads and oversized snippets cost tokens many times over. The helpers here
+drop unused fields, remove duplicate URLs and cap the size of each result and of
+the whole payload, while recording how much was saved.
+"""
+
+from __future__ import annotations
+
+import json
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit, urlunsplit
+
+from react_agent.context_window import count_text_tokens, truncate_text
+
+KEPT_RESULT_FIELDS = ("title", "url", "content")
+"""Per-result fields passed on to the model; everything else is dropped."""
+
+KEPT_TOP_LEVEL_FIELDS = ("query", "queries", "failed_queries", "answer")
+"""Top-level fields passed on to the model besides the results."""
+
+
+@dataclass
+class CompactionStats:
+    """Size of tool output before and after compaction."""
+
+    calls: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes removed from tool output."""
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens removed from tool output."""
+        return self.tokens_before - self.tokens_after
+
+    def record(self, before: str, after: str) -> None:
+        """Add one compaction of `before` into `after` to the counters."""
+        self.calls += 1
+        self.bytes_before += len(before.encode("utf-8"))
+        self.bytes_after += len(after.encode("utf-8"))
+        self.tokens_before += count_text_tokens(before)
+        self.tokens_after += count_text_tokens(after)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters, including the derived savings."""
+        return {
+            **asdict(self),
+            "bytes_saved": self.bytes_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+TOTAL_STATS = CompactionStats()
+"""Process-wide compaction counters."""
+
+_request_stats: ContextVar[Optional[CompactionStats]] = ContextVar(
+    "tool_output_request_stats", default=None
+)
+
+
+def track_request() -> CompactionStats:
+    """Start collecting compaction stats for the current request and return them.
+
+    Graph nodes run in copies of the caller's context, so compactions performed
+    while the graph runs are added to the returned object.
+    """
+    stats = CompactionStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def _serialize(value: Any) -> str:
+    # Matches how ToolNode turns non-string tool output into message content.
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, parts.query, "")
+    )
+
+
+RANK_FUSION_K = 60
+"""Damping constant of reciprocal rank fusion; larger values flatten the ranks."""
+
+
+def merge_search_results(results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge the result lists of several searches into one ranked list.
+
+    Results are de-duplicated by normalized URL and ranked by reciprocal rank
+    fusion: each appearance adds ``1 / (RANK_FUSION_K + rank)``, so a page found
+    by several queries rises above one found by a single query. Scores reported
+    by different queries are not comparable and only break ties. Each merged
+    entry keeps the fields of its best-ranked appearance.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    fused: Dict[str, float] = {}
+    best: Dict[str, Any] = {}
+    for result in results:
+        items = result.get("results")
+        if not isinstance(items, list):
+            continue
+        for rank, item in enumerate(i for i in items if isinstance(i, dict)):
+            url = _normalize_url(str(item.get("url", ""))) or f"#{id(item)}"
+            fused[url] = fused.get(url, 0.0) + 1 / (RANK_FUSION_K + rank + 1)
+            score = item.get("score") or 0
+            if url not in merged or score > best[url]:
+                merged[url], best[url] = item, score
+    order = sorted(merged, key=lambda url: (fused[url], best[url]), reverse=True)
+    return [merged[url] for url in order]
+
+
+def compact_search_results(
+    result: Dict[str, Any],
+    max_result_tokens: int = 0,
+    max_total_tokens: int = 0,
+) -> Dict[str, Any]:
+    """Strip a search payload down to what the model uses.
+
+    Args:
+        result: The raw search response, with a ``results`` list.
+        max_result_tokens: Cap on each result's ``content``. 0 disables the cap.
+        max_total_tokens: Cap on the serialized payload. Lower-ranked results are
+            left out once it is reached; the first result is always kept.
+            0 disables the cap.
+    """
+    if not isinstance(result.get("results"), list):
+        return result
+
+    compacted: Dict[str, Any] = {
+        key: result[key] for key in KEPT_TOP_LEVEL_FIELDS if result.get(key)
+    }
+    results: List[Dict[str, Any]] = []
+    seen_urls = set()
+    used_tokens = count_text_tokens(_serialize(compacted))
+    for item in result["results"]:
+        if not isinstance(item, dict):
+            continue
+        url = _normalize_url(str(item.get("url", "")))
+        if url and url in seen_urls:
+            continue
+        seen_urls.add(url)
+        entry = {key: item[key] for key in KEPT_RESULT_FIELDS if item.get(key)}
+        if max_result_tokens and isinstance(entry.get("content"), str):
+            entry["content"] = truncate_text(entry["content"], max_result_tokens)
+        entry_tokens = count_text_tokens(_serialize(entry))
+        if max_total_tokens and results and used_tokens + entry_tokens > max_total_tokens:
+            break
+        results.append(entry)
+        used_tokens += entry_tokens
+    compacted["results"] = results
+
+    before, after = _serialize(result), _serialize(compacted)
+    TOTAL_STATS.record(before, after)
+    request_stats = _request_stats.get()
+    if request_stats is not None:
+        request_stats.record(before, after)
+    return compacted
@@ -6,12 +6,141 @@ These tools are intended as free examples to get started. For production use,
 consider implementing more robust and specialized tools tailored to your needs.
 """
 
-from typing import Any, Callable, List, Optional, cast
+import asyncio
+import os
+import re
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, cast
 
-from langchain_tavily import TavilySearch  # type: ignore[import-not-found]
 from langgraph.runtime import get_runtime
 
+from react_agent.cache import SQLiteCacheBackend, TTLCache
 from react_agent.context import Context
+from react_agent.profiling import profile_section
+from react_agent.rate_limit import RATE_LIMITER
+from react_agent.tool_output import compact_search_results, merge_search_results
+
+if TYPE_CHECKING:
+    from langchain_tavily import TavilySearch
+
+
+def __getattr__(name: str) -> Any:
+    # langchain_tavily is imported on the first search, not when the graph is built.
+    if name == "TavilySearch":
+        from langchain_tavily import TavilySearch
+
+        globals()["TavilySearch"] = TavilySearch
+        return TavilySearch
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _build_search_cache() -> TTLCache:
+    path = os.getenv("SEARCH_CACHE_PATH")
+    return TTLCache(
+        ttl=float(os.getenv("SEARCH_CACHE_TTL", "300")),
+        max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        backend=SQLiteCacheBackend(path) if path else None,
+    )
+
+
+SEARCH_CACHE = _build_search_cache()
+"""Shared cache of search results, keyed by normalized query and result count.
+
+Configured through SEARCH_CACHE_TTL (seconds, 0 disables), SEARCH_CACHE_MAX_ENTRIES,
+SEARCH_CACHE_MAX_BYTES and SEARCH_CACHE_PATH (optional SQLite file for persistence).
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache key."""
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+@lru_cache(maxsize=8)
+def _tavily_search(max_results: int) -> "TavilySearch":
+    # Looked up on the module so tests and benchmarks can swap in a stand-in.
+    search_class = cast(
+        "type[TavilySearch]", globals().get("TavilySearch") or __getattr__("TavilySearch")
+    )
+    # TAVILY_BASE_URL points search at a compatible endpoint, like OPENAI_BASE_URL.
+    base_url = os.getenv("TAVILY_BASE_URL")
+    if base_url:
+        return search_class(max_results=max_results, api_base_url=base_url)
+    return search_class(max_results=max_results)
+
+
+SEARCH_RATE_LIMIT_KEY = "tavily/search"
+"""Key under which Tavily calls are paced by the shared rate limiter."""
+
+
+class SearchError(Exception):
+    """Raised when Tavily answers with an error payload instead of results."""
+
+
+def _observe_search_error(error: Any) -> None:
+    """Pause Tavily calls on the shared limiter when `error` is a 429.
+
+    Tavily publishes no rate-limit headers to resize its bucket from, so a 429
+    is the only feedback. Errors raised by an HTTP client carry the response,
+    and with it ``Retry-After``; the aiohttp client inside TavilySearch only
+    keeps ``Error 429: <reason>``, which pauses the key for the default second.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    if status == 429 or (status is None and "Error 429" in str(error)):
+        headers = getattr(response, "headers", None) or {}
+        RATE_LIMITER.observe(SEARCH_RATE_LIMIT_KEY, headers, status_code=429)
+
+
+async def _fetch_search(
+    wrapped: "TavilySearch",
+    query: str,
+    limit: Optional[asyncio.Semaphore],
+    timeout: Optional[float],
+) -> Any:
+    # Held for as long as the request runs; waiting for it does not count
+    # against `timeout`, which only bounds the request itself.
+    async with limit or nullcontext():
+        # Only cache misses reach Tavily, so only they count against its quota.
+        await RATE_LIMITER.acquire(SEARCH_RATE_LIMIT_KEY)
+        with profile_section("tavily.request", "io", query=query):
+            response = await asyncio.wait_for(
+                wrapped.ainvoke({"query": query}), timeout
+            )
+    # TavilySearch reports network and quota failures as {"error": ...}; raising
+    # keeps them out of the cache, so the next lookup tries again.
+    if (
+        not isinstance(response, dict)
+        or "error" in response
+        or not isinstance(response.get("results"), list)
+    ):
+        error = response.get("error") if isinstance(response, dict) else response
+        _observe_search_error(error)
+        raise SearchError(f"Tavily search failed: {error}")
+    return response
+
+
+async def _cached_search(
+    query: str,
+    max_results: int,
+    limit: Optional[asyncio.Semaphore] = None,
+    timeout: Optional[float] = None,
+) -> dict[str, Any]:
+    """Return the raw Tavily response for `query`, from the cache when possible.
+
+    A cache miss fetches the response holding `limit`, if given, and gives up
+    with `TimeoutError` when Tavily takes longer than `timeout` seconds.
+    """
+    wrapped = _tavily_search(max_results)
+    key = f"{max_results}:{normalize_query(query)}"
+    return cast(
+        dict[str, Any],
+        await SEARCH_CACHE.get_or_compute(
+            key, lambda: _fetch_search(wrapped, query, limit, timeout)
+        ),
+    )
 
 
 async def search(query: str) -> Optional[dict[str, Any]]:
@@ -22,8 +151,71 @@ async def search(query: str) -> Optional[dict[str, Any]]:
     for answering questions about current events.
     """
     runtime = get_runtime(Context)
-    wrapped = TavilySearch(max_results=runtime.context.max_search_results)
-    return cast(dict[str, Any], await wrapped.ainvoke({"query": query}))
+    result = await _cached_search(query, runtime.context.max_search_results)
+    # The cache keeps raw results; compact them per request's budget on the way out.
+    with profile_section("search.compact"):
+        return compact_search_results(
+            result,
+            max_result_tokens=runtime.context.max_search_result_tokens,
+            max_total_tokens=runtime.context.max_tool_output_tokens,
+        )
+
+
+MULTI_SEARCH_MAX_QUERIES = int(os.getenv("MULTI_SEARCH_MAX_QUERIES", "5"))
+"""Queries run per `multi_search` call; extra queries are ignored."""
+
+MULTI_SEARCH_CONCURRENCY = int(os.getenv("MULTI_SEARCH_CONCURRENCY", "3"))
+"""Queries of one `multi_search` call in flight at once."""
+
+MULTI_SEARCH_QUERY_TIMEOUT = float(os.getenv("MULTI_SEARCH_QUERY_TIMEOUT", "10"))
+"""Seconds Tavily may take on each query of a `multi_search` call before it is
+skipped, not counting the wait for a free slot."""
+
+
+async def multi_search(queries: List[str]) -> Optional[dict[str, Any]]:
+    """Search the web for several queries at once and merge the results.
+
+    Use this instead of several `search` calls in a row when a question needs
+    more than one search, e.g. to compare things or cover different aspects.
+    Results are de-duplicated by URL and ranked across all queries, with pages
+    found by several queries first.
+    """
+    runtime = get_runtime(Context)
+    max_results = runtime.context.max_search_results
+    # Queries differing only in case or spacing share a cache key; run them once.
+    by_key: dict[str, str] = {}
+    for query in queries:
+        by_key.setdefault(normalize_query(query), query)
+    by_key.pop("", None)
+    unique = list(by_key.values())[:MULTI_SEARCH_MAX_QUERIES]
+    semaphore = asyncio.Semaphore(MULTI_SEARCH_CONCURRENCY)
+
+    outcomes = await asyncio.gather(
+        *(
+            _cached_search(q, max_results, semaphore, MULTI_SEARCH_QUERY_TIMEOUT)
+            for q in unique
+        ),
+        return_exceptions=True,
+    )
+    results: List[dict[str, Any]] = []
+    failed: List[str] = []
+    for query, outcome in zip(unique, outcomes):
+        # Error payloads are no longer cached, but may linger in an older SQLite file.
+        if isinstance(outcome, BaseException) or "error" in outcome:
+            failed.append(query)
+        else:
+            results.append(outcome)
+    merged: dict[str, Any] = {
+        "queries": unique,
+        "failed_queries": failed,
+        "results": merge_search_results(results),
+    }
+    with profile_section("search.compact"):
+        return compact_search_results(
+            merged,
+            max_result_tokens=runtime.context.max_search_result_tokens,
+            max_total_tokens=runtime.context.max_tool_output_tokens,
+        )
 
 
-TOOLS: List[Callable[..., Any]] = [search]
+TOOLS: List[Callable[..., Any]] = [search, multi_search]
@@ -1,8 +1,26 @@
 """Utility & helper functions."""
 
-from langchain.chat_models import init_chat_model
-from langchain_core.language_models import BaseChatModel
+import importlib
+import os
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence
+
+import httpx
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+from react_agent.rate_limit import install_rate_limit_hooks
+
+CHAT_MODEL_CACHE_SIZE = int(os.getenv("CHAT_MODEL_CACHE_SIZE", "16"))
+"""Maximum number of distinct chat-model clients kept alive by the registry."""
+
+PROVIDER_PACKAGES = {
+    "openai": "langchain_openai",
+    "anthropic": "langchain_anthropic",
+    "fireworks": "langchain_fireworks",
+}
+"""Integration package of each provider; others follow ``langchain_<provider>``."""
 
 
 def get_message_text(msg: BaseMessage) -> str:
@@ -17,22 +35,140 @@ def get_message_text(msg: BaseMessage) -> str:
         return "".join(txts).strip()
 
 
-def load_chat_model(fully_specified_name: str) -> BaseChatModel:
-    """Load a chat model from a fully specified name.
+def _endpoint_settings(provider: str) -> tuple[Optional[str], Optional[str]]:
+    """Return the (base_url, api_key) pair a client for `provider` is built with."""
+    base_url = os.getenv(f"{provider.upper()}_BASE_URL")
+    api_key = os.getenv(f"{provider.upper()}_API_KEY")
+    return base_url, api_key
+
+
+def _install_rate_limiting(model: BaseChatModel, provider: str) -> BaseChatModel:
+    """Route the model's async HTTP calls through the shared rate limiter."""
+    sdk_client = getattr(model, "root_async_client", None) or getattr(
+        model, "_async_client", None
+    )
+    http_client = getattr(sdk_client, "_client", None)
+    if isinstance(http_client, httpx.AsyncClient):
+        install_rate_limit_hooks(http_client, provider)
+    return model
+
+
+@lru_cache(maxsize=CHAT_MODEL_CACHE_SIZE)
+def _build_chat_model(
+    fully_specified_name: str, base_url: Optional[str], api_key: Optional[str]
+) -> BaseChatModel:
+    provider = fully_specified_name.split("/", maxsplit=1)[0]
+    model = _create_chat_model(fully_specified_name, base_url, api_key)
+    return _install_rate_limiting(model, provider)
+
+
+def _create_chat_model(
+    fully_specified_name: str, base_url: Optional[str], api_key: Optional[str]
+) -> BaseChatModel:
+    # 延迟导入：init_chat_model 只在首次需要某个模型时才导入对应的 provider 集成
+    from langchain.chat_models import init_chat_model
 
-    Args:
-        fully_specified_name (str): String in the format 'provider/model'.
-    """
-    import os
     provider, model = fully_specified_name.split("/", maxsplit=1)
-    
+
     # 处理 OpenAI 的自定义 base_url
-    if provider == "openai" and os.getenv("OPENAI_BASE_URL"):
+    if provider == "openai" and base_url:
         from langchain_openai import ChatOpenAI
-        return ChatOpenAI(
+
+        return ChatOpenAI(  # type: ignore[call-arg]
             model=model,
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            openai_api_base=os.getenv("OPENAI_BASE_URL")
+            openai_api_key=api_key,
+            openai_api_base=base_url,
+            stream_usage=True,
         )
-    
+
+    if provider == "openai":
+        # 流式调用时也返回 token 用量（包括命中提示词缓存的 token 数）
+        return init_chat_model(model, model_provider=provider, stream_usage=True)
     return init_chat_model(model, model_provider=provider)
+
+
+@lru_cache(maxsize=CHAT_MODEL_CACHE_SIZE)
+def _bind_chat_model(
+    fully_specified_name: str,
+    base_url: Optional[str],
+    api_key: Optional[str],
+    tools: tuple[Callable[..., Any], ...],
+    cache_tools: bool,
+) -> Runnable[LanguageModelInput, BaseMessage]:
+    model = _build_chat_model(fully_specified_name, base_url, api_key)
+    if cache_tools and tools:
+        try:
+            from langchain_anthropic.chat_models import (  # type: ignore[import-not-found, unused-ignore]
+                convert_to_anthropic_tool,
+            )
+        except ImportError:
+            # The anthropic extra is optional: bind the tools without a breakpoint.
+            return model.bind_tools(list(tools))
+        # A breakpoint on the last tool caches every tool definition before it.
+        schemas: list[Any] = [convert_to_anthropic_tool(t) for t in tools]
+        schemas[-1] = {**schemas[-1], "cache_control": {"type": "ephemeral"}}
+        return model.bind_tools(schemas)
+    return model.bind_tools(list(tools))
+
+
+def load_chat_model(fully_specified_name: str) -> BaseChatModel:
+    """Load a chat model from a fully specified name.
+
+    Clients are cached per model name and endpoint settings, so repeated calls
+    share one instance (and its HTTP connection pool) instead of building a new
+    client each time.
+
+    Args:
+        fully_specified_name (str): String in the format 'provider/model'.
+    """
+    provider = fully_specified_name.split("/", maxsplit=1)[0]
+    return _build_chat_model(fully_specified_name, *_endpoint_settings(provider))
+
+
+def load_bound_chat_model(
+    fully_specified_name: str,
+    tools: Sequence[Callable[..., Any]],
+    cache_tools: bool = False,
+) -> Runnable[LanguageModelInput, BaseMessage]:
+    """Load a chat model with `tools` bound, reusing a cached instance if possible.
+
+    Binding converts every tool to its provider schema, so the bound runnable is
+    cached alongside the client it wraps.
+
+    Args:
+        fully_specified_name (str): String in the format 'provider/model'.
+        tools: The tools to bind to the model.
+        cache_tools: Mark the tool definitions as a prompt-cache breakpoint.
+            Only honoured for Anthropic models.
+    """
+    provider = fully_specified_name.split("/", maxsplit=1)[0]
+    return _bind_chat_model(
+        fully_specified_name,
+        *_endpoint_settings(provider),
+        tuple(tools),
+        cache_tools and provider == "anthropic",
+    )
+
+
+def preload_provider(fully_specified_name: str) -> str:
+    """Import the integration package of a model's provider and return its name.
+
+    Provider packages are otherwise imported when a model of that provider is
+    first used, i.e. during the first request that needs it.
+
+    Args:
+        fully_specified_name (str): String in the format 'provider/model'.
+
+    Raises:
+        ImportError: The provider's integration package is not installed.
+    """
+    provider = fully_specified_name.split("/", maxsplit=1)[0]
+    package = PROVIDER_PACKAGES.get(provider, f"langchain_{provider}")
+    importlib.import_module(package)
+    return package
+
+
+def clear_chat_model_cache() -> None:
+    """Drop every cached chat-model client and bound model."""
+    _bind_chat_model.cache_clear()
+    _build_chat_model.cache_clear()
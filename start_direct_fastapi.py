@@ -19,6 +19,7 @@ if __name__ == "__main__":
     print(f"📚 API 文档: http://{host}:{port}/docs")
     print(f"💬 聊天端点: http://{host}:{port}/api/chat")
     print(f"🔧 健康检查: http://{host}:{port}/api/health")
+    print(f"🚦 就绪检查: http://{host}:{port}/api/ready")
     print("✨ 模式: 直接调用 graph.invoke()，无需 langgraph dev")
     
     if reload:
@@ -0,0 +1,183 @@
+"""Fake chat model and search backend with adjustable latency for benchmarks."""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class BenchChatModel(BaseChatModel):
+    """Chat model that searches a fixed number of times, then answers.
+
+    Each call waits `first_token_latency` seconds, then streams the reply word by
+    word with `token_latency` seconds between words.
+    """
+
+    search_rounds: int = 1
+    """Rounds of tool calls per turn before the final answer."""
+    parallel_searches: int = 1
+    """Search calls issued together in each round."""
+    first_token_latency: float = 0.05
+    token_latency: float = 0.0
+    answer_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "BenchChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        turn_start = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)),
+            default=0,
+        )
+        turn = messages[turn_start:]
+        rounds = sum(1 for m in turn if isinstance(m, AIMessage) and m.tool_calls)
+        question = str(turn[0].content) if turn else ""
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        if rounds < self.search_rounds:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "search",
+                        "args": {"query": f"{question} round {rounds} part {i}"},
+                        "id": f"call-{rounds}-{i}",
+                    }
+                    for i in range(self.parallel_searches)
+                ],
+                usage_metadata={
+                    "input_tokens": prompt_tokens,
+                    "output_tokens": 20,
+                    "total_tokens": prompt_tokens + 20,
+                },
+            )
+        sources = sum(1 for m in turn if isinstance(m, ToolMessage))
+        words = [f"word{i}" for i in range(self.answer_words)]
+        return AIMessage(
+            content=f"Answer from {sources} sources: " + " ".join(words),
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": self.answer_words,
+                "total_tokens": prompt_tokens + self.answer_words,
+            },
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        time.sleep(self.first_token_latency)
+        for i, chunk in enumerate(self._chunks(reply)):
+            if i and self.token_latency and chunk.text:
+                time.sleep(self.token_latency)
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._reply(messages)
+        words = len(str(reply.content).split())
+        await asyncio.sleep(self.first_token_latency + self.token_latency * words)
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        await asyncio.sleep(self.first_token_latency)
+        for i, chunk in enumerate(self._chunks(reply)):
+            if i and self.token_latency and chunk.text:
+                await asyncio.sleep(self.token_latency)
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _chunks(self, reply: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """Split `reply` into word chunks, then a chunk with its tool calls."""
+        for i, word in enumerate(str(reply.content).split(" ")):
+            token = word if i == 0 else " " + word
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {
+                        "name": tc["name"],
+                        "args": json.dumps(tc["args"]),
+                        "id": tc["id"],
+                        "index": i,
+                    }
+                    for i, tc in enumerate(reply.tool_calls)
+                ],
+                usage_metadata=reply.usage_metadata,
+            )
+        )
+
+
+class BenchSearch:
+    """Stand-in for ``TavilySearch`` that sleeps, then returns canned results."""
+
+    latency: float = 0.1
+    results: int = 5
+    content_chars: int = 600
+
+    def __init__(self, max_results: int = 10, **kwargs: Any) -> None:
+        self.max_results = max_results
+
+    async def ainvoke(self, payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        query = payload["query"]
+        return {
+            "query": query,
+            "results": [
+                {
+                    "url": f"https://example.com/{abs(hash(query))}/{i}",
+                    "title": f"Result {i} for {query}",
+                    "content": "lorem ipsum " * (self.content_chars // 12),
+                    "score": 1 - i / 10,
+                    "raw_content": None,
+                }
+                for i in range(min(self.results, self.max_results))
+            ],
+            "response_time": self.latency,
+        }
@@ -0,0 +1,330 @@
+"""In-process load test for ``/api/chat`` and ``/api/chat/stream``.
+
+The FastAPI app is driven directly over ASGI, so streamed frames are timed as
+the app sends them and no network or provider is involved. The chat model and
+search backend are replaced by the fakes in ``tests.benchmarks.fakes``.
+
+Examples:
+    python -m tests.benchmarks.run --endpoint stream --concurrency 16 --conversations 200
+    python -m tests.benchmarks.run --save-baseline main
+    python -m tests.benchmarks.run --compare main
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import math
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from tests.benchmarks.fakes import BenchChatModel, BenchSearch
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+LOWER_IS_BETTER = (
+    "latency_p50",
+    "latency_p95",
+    "latency_p99",
+    "ttft_p50",
+    "ttft_p95",
+    "ttft_p99",
+    "memory_per_conversation_bytes",
+)
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+@dataclass
+class RequestResult:
+    """Timing of one request."""
+
+    status: int
+    latency: float
+    ttft: Optional[float] = None
+    body_bytes: int = 0
+
+
+@dataclass
+class Report:
+    """Aggregated results of one benchmark run."""
+
+    endpoint: str
+    concurrency: int
+    conversations: int
+    turns: int
+    requests: int
+    errors: int
+    throughput_rps: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    ttft_p50: Optional[float] = None
+    ttft_p95: Optional[float] = None
+    ttft_p99: Optional[float] = None
+    memory_per_conversation_bytes: Optional[int] = None
+    settings: Dict[str, Any] = field(default_factory=dict)
+    commit: str = ""
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Return the nearest-rank `p`th percentile of `values`."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def install_fakes(args: argparse.Namespace) -> None:
+    """Swap the agent's chat model and search backend for the benchmark fakes."""
+    graph_module = importlib.import_module("react_agent.graph")
+    from react_agent import tools
+
+    model = BenchChatModel(
+        search_rounds=args.search_rounds,
+        parallel_searches=args.parallel_searches,
+        first_token_latency=args.model_latency,
+        token_latency=args.token_latency,
+        answer_words=args.answer_words,
+    )
+    graph_module.load_bound_chat_model = lambda *_, **__: model  # type: ignore[attr-defined]
+    BenchSearch.latency = args.search_latency
+    BenchSearch.results = args.search_results
+    tools.TavilySearch = BenchSearch  # type: ignore[misc]
+    tools._tavily_search.cache_clear()
+    tools.SEARCH_CACHE.clear()
+
+
+async def call_app(app: Any, path: str, payload: Dict[str, Any]) -> RequestResult:
+    """POST `payload` to `path` over ASGI and time the response."""
+    body = json.dumps(payload).encode()
+    done = asyncio.Event()
+    request_sent = False
+    status = 0
+    ttft: Optional[float] = None
+    body_bytes = 0
+    started = time.perf_counter()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, ttft, body_bytes
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            body_bytes += len(chunk)
+            if ttft is None and b'"type":"content"' in chunk:
+                ttft = time.perf_counter() - started
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    return RequestResult(status, time.perf_counter() - started, ttft, body_bytes)
+
+
+async def run_conversations(
+    app: Any, args: argparse.Namespace, count: int, prefix: str
+) -> Tuple[List[RequestResult], float]:
+    """Run `count` conversations of `args.turns` turns, `args.concurrency` at a time."""
+    path = "/api/chat/stream" if args.endpoint == "stream" else "/api/chat"
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: List[RequestResult] = []
+
+    async def conversation(index: int) -> None:
+        async with semaphore:
+            for turn in range(args.turns):
+                payload = {
+                    "message": f"question {index}-{turn}",
+                    "conversation_id": f"{prefix}-{index}",
+                }
+                results.append(await call_app(app, path, payload))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(count)))
+    return results, time.perf_counter() - started
+
+
+async def measure_memory(app: Any, args: argparse.Namespace) -> int:
+    """Return the memory retained per finished conversation, in bytes."""
+    await run_conversations(app, args, 2, "warmup-memory")
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        await run_conversations(app, args, args.memory_conversations, "memory")
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return max(after - before, 0) // args.memory_conversations
+
+
+def current_commit() -> str:
+    """Return the short hash of HEAD, or an empty string outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def run_benchmark(args: argparse.Namespace) -> Report:
+    """Run the benchmark described by `args` and return its report."""
+    install_fakes(args)
+    from src.api.direct_fastapi_app import app
+
+    async with app.router.lifespan_context(app):
+        await run_conversations(app, args, min(args.concurrency, 4), "warmup")
+        results, elapsed = await run_conversations(
+            app, args, args.conversations, "bench"
+        )
+        memory = await measure_memory(app, args) if args.memory_conversations else None
+
+    ok = [r for r in results if r.status == 200]
+    latencies = [r.latency for r in ok]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    settings = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("save_baseline", "compare", "tolerance", "json")
+    }
+    return Report(
+        endpoint=args.endpoint,
+        concurrency=args.concurrency,
+        conversations=args.conversations,
+        turns=args.turns,
+        requests=len(results),
+        errors=len(results) - len(ok),
+        throughput_rps=len(ok) / elapsed if elapsed else 0.0,
+        latency_p50=percentile(latencies, 50),
+        latency_p95=percentile(latencies, 95),
+        latency_p99=percentile(latencies, 99),
+        ttft_p50=percentile(ttfts, 50) if ttfts else None,
+        ttft_p95=percentile(ttfts, 95) if ttfts else None,
+        ttft_p99=percentile(ttfts, 99) if ttfts else None,
+        memory_per_conversation_bytes=memory,
+        settings=settings,
+        commit=current_commit(),
+    )
+
+
+def compare(report: Report, baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a line per metric that regressed beyond `tolerance` (a fraction)."""
+    current = asdict(report)
+    regressions = []
+    for key in (*LOWER_IS_BETTER, *HIGHER_IS_BETTER):
+        old, new = baseline.get(key), current.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if key in LOWER_IS_BETTER else change < -tolerance
+        if worse:
+            regressions.append(f"{key}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+    return regressions
+
+
+def format_report(report: Report) -> str:
+    """Render `report` as a short human-readable table."""
+
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    memory = report.memory_per_conversation_bytes
+    return "\n".join(
+        [
+            f"endpoint        {report.endpoint} (concurrency {report.concurrency}, "
+            f"{report.conversations} conversations x {report.turns} turns)",
+            f"requests        {report.requests} ({report.errors} errors)",
+            f"throughput      {report.throughput_rps:.1f} req/s",
+            f"latency         p50 {ms(report.latency_p50)}  p95 {ms(report.latency_p95)}"
+            f"  p99 {ms(report.latency_p99)}",
+            f"ttft            p50 {ms(report.ttft_p50)}  p95 {ms(report.ttft_p95)}"
+            f"  p99 {ms(report.ttft_p99)}",
+            f"memory/conv     {'-' if memory is None else f'{memory / 1024:.1f} KiB'}",
+        ]
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command-line parser."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=("chat", "stream"), default="stream")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=1, help="requests per conversation")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between tokens")
+    parser.add_argument("--answer-words", type=int, default=40)
+    parser.add_argument("--search-rounds", type=int, default=1)
+    parser.add_argument("--parallel-searches", type=int, default=1)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--search-results", type=int, default=5)
+    parser.add_argument(
+        "--memory-conversations",
+        type=int,
+        default=20,
+        help="conversations traced for memory growth (0 skips the pass)",
+    )
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line; return the exit status."""
+    args = build_parser().parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    print(json.dumps(asdict(report), indent=2) if args.json else format_report(report))
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(asdict(report), indent=2) + "\n")
+        print(f"baseline saved to {path}")
+
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"regressions against {args.compare} ({baseline.get('commit')}):")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"no regressions against {args.compare} ({baseline.get('commit')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
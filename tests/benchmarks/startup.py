@@ -0,0 +1,291 @@
+"""Cold-start benchmark: import time and time to the first served request.
+
+Every measurement starts a fresh interpreter. Import time is the wall time of
+``import src.api.direct_fastapi_app``. Server runs start the app under uvicorn,
+pointed at the stand-in provider in ``tests.standin.server``, and time the span
+from spawning the process to the first successful ``/api/health`` (alive),
+``/api/ready`` (ready) and ``/api/chat`` (first request served). Reported values
+are medians over ``--runs``.
+
+Examples:
+    python -m tests.benchmarks.startup --runs 5
+    python -m tests.benchmarks.startup --imports 15
+    python -m tests.benchmarks.startup --save-baseline main
+    python -m tests.benchmarks.startup --compare main --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from tests.benchmarks.run import BASELINE_DIR, current_commit
+
+APP = "src.api.direct_fastapi_app"
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    f"import {APP}; print(time.perf_counter() - started)"
+)
+LOWER_IS_BETTER = (
+    "import_seconds",
+    "alive_seconds",
+    "ready_seconds",
+    "first_response_seconds",
+)
+
+
+@dataclass
+class StartupReport:
+    """Median start-up timings over several fresh processes."""
+
+    runs: int
+    import_seconds: float
+    alive_seconds: Optional[float] = None
+    ready_seconds: Optional[float] = None
+    first_response_seconds: Optional[float] = None
+    slowest_imports: List[Dict[str, Any]] = field(default_factory=list)
+    """Modules with the largest self import time, from ``-X importtime``."""
+    settings: Dict[str, Any] = field(default_factory=dict)
+    commit: str = ""
+
+
+def free_port() -> int:
+    """Return a TCP port that is free on localhost."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    """Return the seconds a fresh interpreter takes to import the app."""
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: Dict[str, str], count: int) -> List[Dict[str, Any]]:
+    """Return the `count` modules with the largest self import time."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {APP}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    modules.sort(key=lambda m: m["self_ms"], reverse=True)
+    return modules[:count]
+
+
+def wait_until_ok(
+    process: "subprocess.Popen[bytes]",
+    request: Any,
+    timeout: float,
+) -> None:
+    """Call `request` until it returns a 2xx response or `timeout` passes."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with status {process.returncode}")
+        try:
+            if request().is_success:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"no successful response within {timeout} s")
+
+
+def measure_server(env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    """Start the app under uvicorn and time it until it served a first chat."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", f"{APP}:app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    timings = {}
+    try:
+        with httpx.Client(base_url=base, timeout=timeout) as client:
+            wait_until_ok(process, lambda: client.get("/api/health"), timeout)
+            timings["alive_seconds"] = time.perf_counter() - started
+            wait_until_ok(process, lambda: client.get("/api/ready"), timeout)
+            timings["ready_seconds"] = time.perf_counter() - started
+            response = client.post("/api/chat", json={"message": "hi"})
+            response.raise_for_status()
+            timings["first_response_seconds"] = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return timings
+
+
+def start_standin(
+    env: Dict[str, str], timeout: float
+) -> Tuple["subprocess.Popen[bytes]", int]:
+    """Start the stand-in provider with instant replies; return it and its port."""
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "tests.standin.server", "--port", str(port),
+            "--first-token-latency", "0", "--search-latency", "0", "--search-rounds", "0",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/stats"
+    wait_until_ok(process, lambda: httpx.get(url), timeout)
+    return process, port
+
+
+def run_benchmark(args: argparse.Namespace) -> StartupReport:
+    """Run the benchmark described by `args` and return its report."""
+    # The child processes import `src.` and `tests.` modules from the checkout.
+    path = [os.getcwd(), *filter(None, [os.getenv("PYTHONPATH")])]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(path)}
+    imports = [measure_import(env) for _ in range(args.runs)]
+    report = StartupReport(
+        runs=args.runs,
+        import_seconds=statistics.median(imports),
+        slowest_imports=slowest_imports(env, args.imports) if args.imports else [],
+        settings={"runs": args.runs, "server": not args.no_server},
+        commit=current_commit(),
+    )
+    if args.no_server:
+        return report
+
+    standin, standin_port = start_standin(env, args.timeout)
+    try:
+        with tempfile.TemporaryDirectory() as data:
+            server_env = {
+                **env,
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{standin_port}/v1",
+                "OPENAI_API_KEY": "standin",
+                "TAVILY_BASE_URL": f"http://127.0.0.1:{standin_port}",
+                "TAVILY_API_KEY": "standin",
+                "CHECKPOINTER": "memory",
+                "JOB_DB_PATH": os.path.join(data, "jobs.sqlite"),
+            }
+            runs = [measure_server(server_env, args.timeout) for _ in range(args.runs)]
+    finally:
+        standin.terminate()
+        standin.wait(timeout=10)
+    for key in ("alive_seconds", "ready_seconds", "first_response_seconds"):
+        setattr(report, key, statistics.median(run[key] for run in runs))
+    return report
+
+
+def compare(
+    report: StartupReport, baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Return a line per timing that grew beyond `tolerance` (a fraction)."""
+    current = asdict(report)
+    regressions = []
+    for key in LOWER_IS_BETTER:
+        old, new = baseline.get(key), current.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{key}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+    return regressions
+
+
+def format_report(report: StartupReport) -> str:
+    """Render `report` as a short human-readable table."""
+
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.0f} ms"
+
+    lines = [
+        f"runs            {report.runs} (medians)",
+        f"import          {ms(report.import_seconds)}",
+        f"alive           {ms(report.alive_seconds)}",
+        f"ready           {ms(report.ready_seconds)}",
+        f"first response  {ms(report.first_response_seconds)}",
+    ]
+    if report.slowest_imports:
+        lines.append("slowest imports (self time)")
+        lines.extend(
+            f"  {m['self_ms']:8.1f} ms  {m['module']}" for m in report.slowest_imports
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command-line parser."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument(
+        "--imports", type=int, default=0, metavar="N", help="list the N slowest imports"
+    )
+    parser.add_argument(
+        "--no-server", action="store_true", help="only measure the import time"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line; return the exit status."""
+    args = build_parser().parse_args(argv)
+    report = run_benchmark(args)
+    print(json.dumps(asdict(report), indent=2) if args.json else format_report(report))
+
+    # Kept apart from the load-test baselines of the same name.
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"startup-{args.save_baseline}.json"
+        path.write_text(json.dumps(asdict(report), indent=2) + "\n")
+        print(f"baseline saved to {path}")
+
+    if args.compare:
+        path = BASELINE_DIR / f"startup-{args.compare}.json"
+        baseline = json.loads(path.read_text())
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"regressions against {args.compare} ({baseline.get('commit')}):")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"no regressions against {args.compare} ({baseline.get('commit')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
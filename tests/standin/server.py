@@ -0,0 +1,407 @@
+"""Local stand-in for the OpenAI chat-completions and Tavily search APIs.
+
+Point the service at it with ``OPENAI_BASE_URL=http://localhost:8100/v1`` and
+``TAVILY_BASE_URL=http://localhost:8100`` to load-test the real HTTP clients with
+no outside services. Replies are scripted (search a configurable number of
+times, then answer) or replayed from VCR cassettes such as
+``tests/cassettes/*.yaml``. Latency, token rate, a requests-per-minute quota,
+random 429s and hung requests can all be injected.
+
+Examples:
+    python -m tests.standin.server --port 8100 --first-token-latency 0.3 --tokens-per-second 60
+    python -m tests.standin.server --cassette tests/cassettes/*.yaml --rate-limit-ratio 0.05
+"""
+
+import argparse
+import asyncio
+import glob
+import gzip
+import itertools
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import yaml
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+@dataclass
+class Settings:
+    """Behaviour of the stand-in server."""
+
+    first_token_latency: float = 0.2
+    """Seconds before the first token (or the whole non-streamed reply)."""
+    tokens_per_second: float = 0.0
+    """Streaming pace; 0 sends every token at once."""
+    search_latency: float = 0.1
+    search_rounds: int = 1
+    """Scripted replies call the search tool this many times per user turn."""
+    answer_words: int = 60
+    requests_per_minute: int = 0
+    """Quota reported in x-ratelimit-* headers and enforced with 429s; 0 = none."""
+    rate_limit_ratio: float = 0.0
+    """Fraction of chat requests answered with a random 429."""
+    timeout_ratio: float = 0.0
+    """Fraction of chat requests that hang for `hang_seconds` before answering."""
+    hang_seconds: float = 120.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class Reply:
+    """An assistant reply in chat-completions form."""
+
+    content: str = ""
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _response_body(response: Dict[str, Any]) -> str:
+    body = response["body"]["string"]
+    if isinstance(body, bytes):
+        encoding = {k.lower(): v for k, v in response["headers"].items()}.get(
+            "content-encoding", [""]
+        )
+        return (gzip.decompress(body) if "gzip" in encoding else body).decode()
+    return str(body)
+
+
+def _reply_from_recording(payload: Dict[str, Any]) -> Reply:
+    if "choices" in payload:  # OpenAI chat completion
+        message = payload["choices"][0]["message"]
+        return Reply(message.get("content") or "", message.get("tool_calls") or [])
+    reply = Reply()  # Anthropic message
+    for block in payload.get("content", []):
+        if block["type"] == "text":
+            reply.content += block["text"]
+        elif block["type"] == "tool_use":
+            reply.tool_calls.append(
+                {
+                    "id": block["id"],
+                    "type": "function",
+                    "function": {
+                        "name": block["name"],
+                        "arguments": json.dumps(block["input"]),
+                    },
+                }
+            )
+    return reply
+
+
+class Cassette:
+    """Chat replies and search results recorded in VCR cassettes.
+
+    Chat replies are grouped by step, the number of assistant messages already in
+    the recorded request, and served round-robin within a step. Search results
+    are matched by query, falling back to round-robin.
+    """
+
+    def __init__(self, paths: List[str]) -> None:
+        """Load every interaction from the cassette files at `paths`."""
+        replies: Dict[int, List[Reply]] = {}
+        self.searches: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            with open(path) as f:
+                interactions = yaml.safe_load(f)["interactions"]
+            for interaction in interactions:
+                request, response = interaction["request"], interaction["response"]
+                if response["status"]["code"] != 200:
+                    continue
+                payload = json.loads(_response_body(response))
+                if request["uri"].endswith("/search"):
+                    self.searches[payload.get("query", "")] = payload
+                    continue
+                recorded = json.loads(request["body"] or "{}")
+                step = sum(
+                    1 for m in recorded.get("messages", []) if m["role"] == "assistant"
+                )
+                replies.setdefault(step, []).append(_reply_from_recording(payload))
+        self._replies = {step: itertools.cycle(r) for step, r in replies.items()}
+        self._max_step = max(replies, default=-1)
+        self._searches = itertools.cycle(list(self.searches.values()) or [{}])
+
+    def reply(self, step: int) -> Optional[Reply]:
+        """Return the next recorded reply for `step`, or None if there are none."""
+        if self._max_step < 0:
+            return None
+        return next(self._replies.get(min(step, self._max_step)) or iter([None]))
+
+    def search(self, query: str) -> Dict[str, Any]:
+        """Return the recorded results for `query`, or the next recorded results."""
+        return self.searches.get(query) or next(self._searches)
+
+
+def _current_turn(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    start = max(
+        (i for i, m in enumerate(messages) if m.get("role") == "user"), default=0
+    )
+    return messages[start:]
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") for part in content or [] if isinstance(part, dict)
+    )
+
+
+def scripted_reply(body: Dict[str, Any], settings: Settings) -> Reply:
+    """Search `settings.search_rounds` times per turn, then answer."""
+    turn = _current_turn(body.get("messages", []))
+    question = _text(turn[0].get("content")) if turn else ""
+    rounds = sum(1 for m in turn if m.get("role") == "assistant" and m.get("tool_calls"))
+    tool_names = [t["function"]["name"] for t in body.get("tools", [])]
+    if "search" in tool_names and rounds < settings.search_rounds:
+        return Reply(
+            tool_calls=[
+                {
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {
+                        "name": "search",
+                        "arguments": json.dumps({"query": question[:200]}),
+                    },
+                }
+            ]
+        )
+    sources = sum(1 for m in turn if m.get("role") == "tool")
+    words = " ".join(f"word{i}" for i in range(settings.answer_words))
+    return Reply(content=f"Stand-in answer using {sources} tool results: {words}")
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _tokens(text: str) -> Iterator[str]:
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        yield word if i == 0 else " " + word
+
+
+class Quota:
+    """A fixed one-minute request window, reported like OpenAI's headers."""
+
+    def __init__(self, requests_per_minute: int) -> None:
+        """Allow `requests_per_minute` requests per window (0 = unlimited)."""
+        self.limit = requests_per_minute
+        self.window_start = time.monotonic()
+        self.used = 0
+
+    def take(self) -> Optional[float]:
+        """Count a request; return seconds until reset if it is over quota."""
+        if not self.limit:
+            return None
+        now = time.monotonic()
+        if now - self.window_start >= 60:
+            self.window_start, self.used = now, 0
+        if self.used >= self.limit:
+            return 60 - (now - self.window_start)
+        self.used += 1
+        return None
+
+    def headers(self) -> Dict[str, str]:
+        """Return the x-ratelimit-* headers describing the current window."""
+        if not self.limit:
+            return {}
+        reset = max(60 - (time.monotonic() - self.window_start), 0)
+        return {
+            "x-ratelimit-limit-requests": str(self.limit),
+            "x-ratelimit-remaining-requests": str(max(self.limit - self.used, 0)),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+
+def create_app(settings: Settings, cassette: Optional[Cassette] = None) -> FastAPI:
+    """Build the stand-in application."""
+    app = FastAPI(title="OpenAI/Tavily stand-in")
+    rng = random.Random(settings.seed)
+    quota = Quota(settings.requests_per_minute)
+    stats = {"chat_requests": 0, "search_requests": 0, "rate_limited": 0, "hung": 0}
+
+    def rate_limited(retry_after: float) -> JSONResponse:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {
+                "error": {
+                    "message": "Rate limit reached (stand-in)",
+                    "type": "requests",
+                    "code": "rate_limit_exceeded",
+                }
+            },
+            status_code=429,
+            headers={"retry-after": f"{max(retry_after, 0.001):.3f}", **quota.headers()},
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        stats["chat_requests"] += 1
+        over_quota = quota.take()
+        if over_quota is not None:
+            return rate_limited(over_quota)
+        if rng.random() < settings.rate_limit_ratio:
+            return rate_limited(1.0)
+        if rng.random() < settings.timeout_ratio:
+            stats["hung"] += 1
+            await asyncio.sleep(settings.hang_seconds)
+
+        turn = _current_turn(body.get("messages", []))
+        step = sum(1 for m in turn if m.get("role") == "assistant")
+        reply = (cassette.reply(step) if cassette else None) or scripted_reply(
+            body, settings
+        )
+        prompt_tokens = _estimate_tokens(json.dumps(body.get("messages", [])))
+        completion_tokens = _estimate_tokens(
+            reply.content + json.dumps(reply.tool_calls)
+        )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "stand-in")
+        finish_reason = "tool_calls" if reply.tool_calls else "stop"
+        headers = quota.headers()
+
+        if not body.get("stream"):
+            await asyncio.sleep(settings.first_token_latency)
+            if settings.tokens_per_second:
+                await asyncio.sleep(completion_tokens / settings.tokens_per_second)
+            message: Dict[str, Any] = {"role": "assistant", "content": reply.content}
+            if reply.tool_calls:
+                message["tool_calls"] = reply.tool_calls
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": finish_reason}
+                    ],
+                    "usage": usage,
+                },
+                headers=headers,
+            )
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream() -> AsyncIterator[str]:
+            await asyncio.sleep(settings.first_token_latency)
+            yield chunk({"role": "assistant", "content": ""})
+            if reply.content:
+                for token in _tokens(reply.content):
+                    yield chunk({"content": token})
+                    if settings.tokens_per_second:
+                        await asyncio.sleep(1 / settings.tokens_per_second)
+            for index, tool_call in enumerate(reply.tool_calls):
+                yield chunk({"tool_calls": [{"index": index, **tool_call}]})
+            yield chunk({}, finish_reason)
+            if include_usage:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                yield f"data: {json.dumps(payload)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(
+            stream(), media_type="text/event-stream", headers=headers
+        )
+
+    @app.post("/search")
+    async def search(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        stats["search_requests"] += 1
+        await asyncio.sleep(settings.search_latency)
+        query = body.get("query", "")
+        if cassette and cassette.searches:
+            return {**cassette.search(query), "query": query}
+        max_results = int(body.get("max_results") or 5)
+        return {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": [
+                {
+                    "title": f"Stand-in result {i} for {query}",
+                    "url": f"https://standin.example/{uuid.uuid4().hex[:8]}",
+                    "content": f"Stand-in content {i} about {query}. " * 8,
+                    "score": round(1 - i / 10, 2),
+                    "raw_content": None,
+                }
+                for i in range(max_results)
+            ],
+            "response_time": settings.search_latency,
+        }
+
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, int]:
+        return stats
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command-line parser."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--cassette", nargs="*", default=[], help="VCR cassette files or globs")
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--search-rounds", type=int, default=1)
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--requests-per-minute", type=int, default=0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--timeout-ratio", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the stand-in server from the command line."""
+    import uvicorn
+
+    args = build_parser().parse_args(argv)
+    settings = Settings(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        search_latency=args.search_latency,
+        search_rounds=args.search_rounds,
+        answer_words=args.answer_words,
+        requests_per_minute=args.requests_per_minute,
+        rate_limit_ratio=args.rate_limit_ratio,
+        timeout_ratio=args.timeout_ratio,
+        hang_seconds=args.hang_seconds,
+        seed=args.seed,
+    )
+    paths = sorted({p for pattern in args.cassette for p in glob.glob(pattern)})
+    cassette = Cassette(paths) if paths else None
+    uvicorn.run(create_app(settings, cassette), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Shared fakes for unit tests: a scripted tool-calling chat model and search."""
+
+import importlib
+import json
+import re
+from typing import Any, Iterator, List, Optional
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+
+class FakeToolChatModel(GenericFakeChatModel):
+    """Fake chat model that streams text word by word and supports tool calls."""
+
+    received: List[List[BaseMessage]] = []
+    """The prompt messages of every call, in order."""
+
+    def _generate(self, messages: List[BaseMessage], *args: Any, **kwargs: Any):
+        self.received.append(list(messages))
+        return super()._generate(messages, *args, **kwargs)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeToolChatModel":
+        return self
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._generate(messages).generations[0].message
+        assert isinstance(message, AIMessage)
+        for token in re.split(r"(\s)", str(message.content)):
+            if not token:
+                continue
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=token, id=message.id)
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        if message.tool_calls:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    id=message.id,
+                    tool_call_chunks=[
+                        {
+                            "name": tc["name"],
+                            "args": json.dumps(tc["args"]),
+                            "id": tc["id"],
+                            "index": i,
+                        }
+                        for i, tc in enumerate(message.tool_calls)
+                    ],
+                )
+            )
+
+
+def sse_events(body: str) -> List[dict[str, Any]]:
+    """Decode the JSON ``data:`` lines of a server-sent event stream."""
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+class FakeTavilySearch:
+    """Stand-in for ``TavilySearch`` that records every query it receives."""
+
+    calls: List[str] = []
+
+    def __init__(self, max_results: int = 10, **kwargs: Any) -> None:
+        self.max_results = max_results
+
+    async def ainvoke(self, payload: dict[str, Any]) -> dict[str, Any]:
+        FakeTavilySearch.calls.append(payload["query"])
+        return {
+            "query": payload["query"],
+            "results": [
+                {
+                    "url": "https://example.com/langchain",
+                    "title": "LangChain",
+                    "content": "LangChain was founded by Harrison Chase.",
+                    "score": 0.9,
+                }
+            ],
+        }
+
+
+@pytest.fixture
+def fake_search(monkeypatch: pytest.MonkeyPatch):
+    from react_agent import tools
+
+    FakeTavilySearch.calls = []
+    monkeypatch.setattr(tools, "TavilySearch", FakeTavilySearch)
+    tools._tavily_search.cache_clear()
+    tools.SEARCH_CACHE.clear()
+    yield FakeTavilySearch
+    tools._tavily_search.cache_clear()
+    tools.SEARCH_CACHE.clear()
+
+
+@pytest.fixture
+def script_model(monkeypatch: pytest.MonkeyPatch):
+    """Return a function that scripts the replies of the agent's chat model."""
+
+    def _script(*replies: AIMessage | str) -> FakeToolChatModel:
+        model = FakeToolChatModel(messages=iter(replies), received=[])
+        graph_module = importlib.import_module("react_agent.graph")
+        monkeypatch.setattr(graph_module, "load_bound_chat_model", lambda *_, **__: model)
+        return model
+
+    return _script
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from react_agent.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_queued_run_starts_when_slot_frees() -> None:
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    first = await controller.acquire("openai/a")
+    waiting = asyncio.ensure_future(controller.acquire("openai/a"))
+    await asyncio.sleep(0)
+    assert controller.queued == 1
+
+    first.release()
+    second = await waiting
+    assert controller.running == 1 and controller.queued == 0
+    second.release()
+    assert controller.as_dict()["admitted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full_or_wait_too_long() -> None:
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    ticket = await controller.acquire("openai/a")
+    waiting = asyncio.ensure_future(controller.acquire("openai/a"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as full:
+        await controller.acquire("openai/a")
+    assert full.value.status_code == 429 and full.value.retry_after >= 1
+
+    with pytest.raises(AdmissionRejected) as timed_out:
+        await waiting
+    assert timed_out.value.status_code == 503
+    ticket.release()
+    assert controller.running == 0
+
+
+@pytest.mark.asyncio
+async def test_per_model_limit_does_not_block_other_models() -> None:
+    controller = AdmissionController(
+        max_concurrent=4, max_queue=4, queue_timeout=0.05, model_limits={"openai/a": 1}
+    )
+    await controller.acquire("openai/a")
+    other = await controller.acquire("openai/b")
+    assert controller.running == 2
+    with pytest.raises(AdmissionRejected):
+        await controller.acquire("openai/a")
+    other.release()
+
+
+@pytest.mark.asyncio
+async def test_admission_racing_the_queue_timeout_keeps_its_slot(monkeypatch) -> None:
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    first = await controller.acquire("openai/a")
+
+    async def late_wait_for(future, timeout):
+        # As on Python 3.12: the slot is handed over, then the timeout fires.
+        first.release()
+        raise TimeoutError
+
+    monkeypatch.setattr(asyncio, "wait_for", late_wait_for)
+    second = await controller.acquire("openai/a")
+    assert controller.running == 1
+    second.release()
+    assert controller.running == 0
+
+
+@pytest.mark.asyncio
+async def test_multi_slot_ticket_counts_against_both_limits() -> None:
+    controller = AdmissionController(
+        max_concurrent=4, max_queue=1, queue_timeout=5, model_limits={"openai/a": 3}
+    )
+    batch = await controller.acquire("openai/a", slots=8)
+    # Reduced to the per-model cap, which it then uses up.
+    assert (batch.slots, controller.running) == (3, 3)
+    waiting = asyncio.ensure_future(controller.acquire("openai/a"))
+    other = await controller.acquire("openai/b")
+    await asyncio.sleep(0)
+    assert not waiting.done() and controller.running == 4
+
+    batch.release()
+    other.release()
+    (await waiting).release()
+    assert controller.running == 0
+
+
+@pytest.mark.asyncio
+async def test_multi_slot_waiter_is_not_passed_by_later_runs() -> None:
+    controller = AdmissionController(max_concurrent=2, max_queue=4, queue_timeout=5)
+    first = await controller.acquire("openai/a")
+    batch = asyncio.ensure_future(controller.acquire("openai/a", slots=2))
+    await asyncio.sleep(0)
+    # A slot is free, but the batch waiting for two came first.
+    later = asyncio.ensure_future(controller.acquire("openai/b"))
+    await asyncio.sleep(0)
+    assert controller.queued == 2 and controller.running == 1
+
+    first.release()
+    ticket = await batch
+    await asyncio.sleep(0)
+    assert ticket.slots == 2 and not later.done()
+    ticket.release()
+    (await later).release()
+    assert controller.running == 0
+
+
+@pytest.mark.asyncio
+async def test_partial_ticket_takes_the_free_slots() -> None:
+    controller = AdmissionController(
+        max_concurrent=4, max_queue=2, queue_timeout=5, model_limits={"openai/a": 3}
+    )
+    other = await controller.acquire("openai/b")
+    assert (await controller.acquire("openai/a", slots=4, partial=True)).slots == 3
+
+    # Nothing free: wait for a single slot.
+    waiting = asyncio.ensure_future(controller.acquire("openai/b", 3, partial=True))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    other.release()
+    assert (await waiting).slots == 1
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.admission import AdmissionController
+from react_agent.batch import run_batch
+from src.api import direct_fastapi_app
+from src.api.direct_fastapi_app import app
+
+
+@pytest.mark.asyncio
+async def test_failed_prompt_does_not_fail_the_batch(script_model) -> None:
+    # Only two replies are scripted, so the third run fails.
+    script_model(AIMessage(content="one"), AIMessage(content="two"))
+
+    results = [r async for r in run_batch(["a", "b", "c"], max_concurrency=1)]
+
+    assert sorted(r.index for r in results) == [0, 1, 2]
+    assert sorted(r.response for r in results if r.ok) == ["one", "two"]
+    assert len([r for r in results if not r.ok]) == 1
+
+
+def test_batch_endpoint_streams_ndjson(script_model) -> None:
+    script_model(AIMessage(content="x"), AIMessage(content="y"))
+
+    response = TestClient(app).post(
+        "/api/chat/batch",
+        json={
+            "items": [{"message": "a", "id": "first"}, {"message": "b"}],
+            "max_concurrency": 1,
+        },
+    )
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((line["index"], line["id"], line["status"]) for line in lines) == [
+        (0, "first", "success"),
+        (1, None, "success"),
+    ]
+    assert sorted(line["response"] for line in lines) == ["x", "y"]
+
+
+def test_batch_runs_at_the_width_of_the_free_slots(script_model, monkeypatch) -> None:
+    script_model(*(AIMessage(content=str(n)) for n in range(3)))
+    controller = AdmissionController(max_concurrent=3, max_queue=4, queue_timeout=1)
+    monkeypatch.setattr(direct_fastapi_app, "admission", controller)
+    widths = []
+    generate = direct_fastapi_app.generate_batch_response
+
+    def recording(request, http_request=None, max_concurrency=None):
+        widths.append((max_concurrency, controller.running))
+        return generate(request, http_request, max_concurrency)
+
+    monkeypatch.setattr(direct_fastapi_app, "generate_batch_response", recording)
+    tickets = [asyncio.run(controller.acquire("openai/other")) for _ in range(2)]
+
+    response = TestClient(app).post(
+        "/api/chat/batch",
+        json={"items": [{"message": m} for m in "abc"], "max_concurrency": 3},
+    )
+
+    # Two of three slots are taken: the batch runs one prompt at a time.
+    assert widths == [(1, 3)]
+    statuses = [json.loads(line)["status"] for line in response.text.splitlines()]
+    assert statuses == ["success"] * 3
+    for ticket in tickets:
+        ticket.release()
+    assert controller.running == 0
@@ -0,0 +1,32 @@
+import importlib
+
+import pytest
+
+from react_agent import tools
+from tests.benchmarks import run
+
+
+def test_benchmark_smoke(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    monkeypatch.setenv("JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    # The benchmark swaps these globals in; restore them afterwards.
+    graph_module = importlib.import_module("react_agent.graph")
+    monkeypatch.setattr(
+        graph_module, "load_bound_chat_model", graph_module.load_bound_chat_model
+    )
+    monkeypatch.setattr(tools, "TavilySearch", tools.TavilySearch)
+
+    args = run.build_parser().parse_args(
+        [
+            "--conversations", "4",
+            "--concurrency", "2",
+            "--model-latency", "0",
+            "--search-latency", "0",
+            "--memory-conversations", "2",
+        ]
+    )
+    report = run.asyncio.run(run.run_benchmark(args))
+    tools._tavily_search.cache_clear()
+
+    assert report.requests == 4 and report.errors == 0
+    assert report.ttft_p50 is not None and report.throughput_rps > 0
+    assert run.compare(report, {"latency_p50": report.latency_p50 / 2}, 0.1)
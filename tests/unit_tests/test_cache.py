@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from react_agent import tools
+from react_agent.cache import SQLiteCacheBackend, TTLCache
+
+
+def test_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("react_agent.cache.time.time", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats.expirations == 1
+
+
+def test_lru_eviction_by_count_and_bytes() -> None:
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    small = TTLCache(ttl=60, max_bytes=20)
+    small.set("x", "a" * 10)
+    small.set("y", "b" * 10)
+    assert len(small) == 1 and small.get("y") == "b" * 10
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_computation() -> None:
+    cache = TTLCache(ttl=60)
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("q", compute) for _ in range(20))
+    )
+    assert results == ["result"] * 20
+    assert calls == 1
+    assert cache.stats.misses == 1 and cache.stats.coalesced == 19
+    assert await cache.get_or_compute("q", compute) == "result"
+    assert cache.stats.hits == 1
+
+
+def test_sqlite_backend_survives_restart(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    TTLCache(ttl=60, backend=SQLiteCacheBackend(path)).set("k", {"v": 1})
+    assert TTLCache(ttl=60, backend=SQLiteCacheBackend(path)).get("k") == {"v": 1}
+
+
+def test_sqlite_backend_purges_expired_and_caps_entries(tmp_path) -> None:
+    path = str(tmp_path / "cache.sqlite")
+    backend = SQLiteCacheBackend(path, max_entries=3, purge_interval=4)
+    backend.set("expired", "1", 0.0)
+    for i in range(3):
+        backend.set(f"k{i}", "1", 1e12 + i)
+    # The fourth write purged the expired entry; the newest three remain.
+    assert len(backend) == 3 and backend.get("expired") is None
+
+    for i in range(3, 6):
+        backend.set(f"k{i}", "1", 1e12 + i)
+    reopened = SQLiteCacheBackend(path, max_entries=3)
+    assert len(reopened) == 3 and reopened.get("k5") is not None
+    assert reopened.get("k2") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_search_is_not_cached(fake_search, monkeypatch) -> None:
+    original = fake_search.ainvoke
+    outage = [True]
+
+    async def ainvoke(self, payload):
+        if outage[0]:
+            fake_search.calls.append(payload["query"])
+            return {"error": "quota exceeded"}
+        return await original(self, payload)
+
+    monkeypatch.setattr(fake_search, "ainvoke", ainvoke)
+    with pytest.raises(tools.SearchError, match="quota exceeded"):
+        await tools._cached_search("langchain", 5)
+
+    outage[0] = False
+    result = await tools._cached_search("langchain", 5)
+    assert result["results"] and fake_search.calls == ["langchain", "langchain"]
+    assert await tools._cached_search("langchain", 5) == result
+    assert fake_search.calls == ["langchain", "langchain"]
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from react_agent.cancellation import CancellationStats, RunCancelled, iterate_until
+
+
+@pytest.mark.asyncio
+async def test_iterate_until_cancels_pending_step() -> None:
+    closed = asyncio.Event()
+
+    async def slow_stream():
+        try:
+            yield 1
+            await asyncio.sleep(60)
+            yield 2
+        finally:
+            closed.set()
+
+    stop = asyncio.get_running_loop().create_future()
+    received = []
+    with pytest.raises(RunCancelled):
+        async for item in iterate_until(slow_stream(), stop):
+            received.append(item)
+            asyncio.get_running_loop().call_later(0.01, stop.set_result, None)
+
+    assert received == [1]
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_iterate_until_passes_through_complete_stream() -> None:
+    async def stream():
+        for i in range(3):
+            yield i
+
+    stop = asyncio.get_running_loop().create_future()
+    assert [i async for i in iterate_until(stream(), stop)] == [0, 1, 2]
+
+
+def test_stats_estimate_avoided_tokens() -> None:
+    stats = CancellationStats()
+    stats.record_completed(1000)
+    stats.record_completed(3000)
+    stats.record_cancelled(500)
+    assert stats.tokens_avoided_estimate == 1500
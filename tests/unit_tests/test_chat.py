@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.api.direct_fastapi_app import app
+
+
+def test_follow_up_turn_reuses_checkpointed_state(script_model, fake_search) -> None:
+    model = script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+        ),
+        AIMessage(content="First answer.", id="ai-2"),
+        AIMessage(content="Second answer.", id="ai-3"),
+    )
+    client = TestClient(app)
+
+    first = client.post("/api/chat", json={"message": "one", "conversation_id": "cp-1"})
+    second = client.post("/api/chat", json={"message": "two", "conversation_id": "cp-1"})
+
+    assert first.json()["response"] == "First answer."
+    assert second.json()["response"] == "Second answer."
+    prompt = model.received[-1][1:]
+    assert [type(m) for m in prompt] == [
+        HumanMessage,
+        AIMessage,
+        ToolMessage,
+        AIMessage,
+        HumanMessage,
+    ]
+    assert client.get("/api/chat/history/cp-1").json()["messages"][-1] == {
+        "role": "assistant",
+        "content": "Second answer.",
+    }
+
+
+def test_chat_rejected_with_retry_after_when_queue_full(monkeypatch) -> None:
+    from react_agent.admission import AdmissionController
+    from src.api import direct_fastapi_app
+
+    controller = AdmissionController(max_concurrent=0, max_queue=0)
+    monkeypatch.setattr(controller, "_can_run", lambda model, slots=1: False)
+    monkeypatch.setattr(direct_fastapi_app, "admission", controller)
+
+    response = TestClient(app).post("/api/chat", json={"message": "hi"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert controller.as_dict()["rejected_queue_full"] == 1
+
+
+def test_evicted_conversation_drops_its_checkpoints(script_model, monkeypatch) -> None:
+    from react_agent.conversations import InMemoryConversationStore
+    from src.api import direct_fastapi_app
+
+    script_model(AIMessage(content="One.", id="ai-1"), AIMessage(content="Two.", id="ai-2"))
+    monkeypatch.setattr(
+        direct_fastapi_app, "conversation_store", InMemoryConversationStore(max_conversations=1)
+    )
+    # Build a fresh in-memory checkpointer wired to the new store.
+    monkeypatch.setattr(direct_fastapi_app, "agent_graph", None)
+    monkeypatch.setattr(direct_fastapi_app, "checkpointer", None)
+    client = TestClient(app)
+
+    client.post("/api/chat", json={"message": "one", "conversation_id": "ev-1"})
+    assert "ev-1" in direct_fastapi_app.checkpointer.storage
+    client.post("/api/chat", json={"message": "two", "conversation_id": "ev-2"})
+
+    assert "ev-1" not in direct_fastapi_app.checkpointer.storage
+    assert "ev-2" in direct_fastapi_app.checkpointer.storage
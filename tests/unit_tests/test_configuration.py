@@ -18,3 +18,11 @@ def test_context_init_with_env_vars_and_passed_values() -> None:
     os.environ["MODEL"] = "openai/gpt-4o-mini"
     context = Context(model="openai/gpt-5o-mini")
     assert context.model == "openai/gpt-5o-mini"
+
+
+def test_context_env_vars_are_coerced(monkeypatch) -> None:
+    monkeypatch.setenv("MAX_CONTEXT_TOKENS", "8000")
+    monkeypatch.setenv("SUMMARIZE_DROPPED_TURNS", "true")
+    context = Context()
+    assert context.max_context_tokens == 8000
+    assert context.summarize_dropped_turns is True
@@ -0,0 +1,49 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from react_agent.context_window import count_message_tokens, fit_context
+
+
+def _turn(i: int, tool_output: str = "") -> list:
+    messages = [HumanMessage(content=f"question {i}", id=f"h{i}")]
+    if tool_output:
+        messages += [
+            AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=[{"name": "search", "args": {"query": "q"}, "id": f"c{i}"}],
+            ),
+            ToolMessage(content=tool_output, tool_call_id=f"c{i}", id=f"t{i}"),
+        ]
+    return messages + [AIMessage(content=f"answer {i}", id=f"r{i}")]
+
+
+def test_fit_context_disabled_keeps_everything() -> None:
+    messages = _turn(1) + _turn(2)
+    assert fit_context(messages, max_tokens=0).messages == messages
+
+
+def test_fit_context_drops_whole_old_turns() -> None:
+    messages = _turn(1, "x " * 400) + _turn(2) + _turn(3, "y " * 50)
+    budget = count_message_tokens(_turn(2) + _turn(3, "y " * 50))
+
+    window = fit_context(messages, max_tokens=budget)
+
+    assert [m.id for m in window.dropped] == ["h1", "a1", "t1", "r1"]
+    assert [m.id for m in window.messages][0] == "h2"
+    tool_call_ids = {
+        tc["id"] for m in window.messages if isinstance(m, AIMessage) for tc in m.tool_calls
+    }
+    assert tool_call_ids == {
+        m.tool_call_id for m in window.messages if isinstance(m, ToolMessage)
+    }
+
+
+def test_fit_context_trims_old_tool_results_first() -> None:
+    messages = _turn(1, "word " * 2000) + _turn(2)
+
+    window = fit_context(messages, max_tokens=1000, max_tool_result_tokens=100)
+
+    assert not window.dropped
+    tool_message = window.messages[2]
+    assert tool_message.content.endswith("[truncated]")
+    assert messages[2].content == "word " * 2000
@@ -0,0 +1,35 @@
+from react_agent.conversations import (
+    InMemoryConversationStore,
+    SQLiteConversationStore,
+)
+
+
+def test_in_memory_store_evicts_least_recently_used() -> None:
+    store = InMemoryConversationStore(max_conversations=2, max_messages=3)
+    store.append("a", {"role": "human", "content": "1"})
+    store.append("b", {"role": "human", "content": "2"})
+    store.get("a")
+    store.append("c", {"role": "human", "content": "3"})
+    assert not store.exists("b")
+    assert store.exists("a") and store.exists("c")
+
+    for i in range(5):
+        store.append("a", {"role": "human", "content": str(i)})
+    assert [m["content"] for m in store.get("a")] == ["2", "3", "4"]
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path) -> None:
+    path = str(tmp_path / "conversations.sqlite")
+    writer = SQLiteConversationStore(path)
+    reader = SQLiteConversationStore(path)
+    writer.append(
+        "c1",
+        {"role": "human", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    )
+    writer.append("c1", {"role": "human", "content": "again"})
+
+    assert [m["content"] for m in reader.get("c1")] == ["hi", "hello", "again"]
+    assert [m["content"] for m in reader.get("c1", limit=2)] == ["hello", "again"]
+    assert reader.delete("c1")
+    assert not writer.exists("c1")
@@ -0,0 +1,115 @@
+import importlib
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.runtime import Runtime
+
+from react_agent import prompts
+from react_agent.context import Context
+from react_agent.deadline import DEADLINE_STATS, STEP_ESTIMATOR, StepEstimator
+from react_agent.metrics import Histogram
+from react_agent.state import State
+from src.api.direct_fastapi_app import app
+
+SEARCH_CALL = AIMessage(
+    content="Best guess so far.",
+    id="ai-1",
+    tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+)
+
+
+def test_estimator_uses_defaults_until_enough_samples() -> None:
+    histogram = Histogram("demo_seconds", "Demo.", (0.1, 1.0, 10.0), ("node",))
+    estimator = StepEstimator(
+        quantile=0.5,
+        min_samples=2,
+        default_model_seconds=7,
+        default_tool_seconds=3,
+        histogram=histogram,
+    )
+    histogram.observe(0.5, "call_model")
+    assert estimator.model_seconds() == 7
+
+    histogram.observe(0.5, "call_model")
+    assert estimator.model_seconds() == 0.55
+    assert estimator.tool_seconds() == 3
+    # 0.55 + 3 + 0.55 seconds are needed before the next model call.
+    assert estimator.allows_tool_round(time.time() + 5, before_model_call=True)
+    assert not estimator.allows_tool_round(time.time() + 4, before_model_call=True)
+    assert estimator.allows_tool_round(0, before_model_call=True)
+
+
+def test_short_deadline_forces_final_answer(
+    script_model, fake_search, monkeypatch
+) -> None:
+    monkeypatch.setattr(STEP_ESTIMATOR, "min_samples", 10**9)
+    model = script_model(SEARCH_CALL)
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/chat",
+        json={"message": "hi", "conversation_id": "dl-1", "deadline_seconds": 1},
+    )
+
+    assert response.json()["response"] == "Best guess so far."
+    assert fake_search.calls == []
+    assert prompts.DEADLINE_SECTION in str(model.received[0][0].content)
+
+
+def test_slow_model_call_answers_with_its_text(
+    script_model, fake_search, monkeypatch
+) -> None:
+    # The deadline allows the model call, but no tool round after it.
+    monkeypatch.setattr(
+        STEP_ESTIMATOR,
+        "allows_tool_round",
+        lambda deadline, before_model_call: before_model_call,
+    )
+    model = script_model(SEARCH_CALL)
+    skipped = DEADLINE_STATS.tool_rounds_skipped
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/chat",
+        json={"message": "hi", "conversation_id": "dl-2", "deadline_seconds": 30},
+    )
+
+    assert response.json()["response"] == "Best guess so far."
+    assert fake_search.calls == [] and len(model.received) == 1
+    assert prompts.DEADLINE_SECTION not in str(model.received[0][0].content)
+    assert DEADLINE_STATS.tool_rounds_skipped == skipped + 1
+
+
+@pytest.mark.asyncio
+async def test_dropped_tool_calls_leave_no_tool_use_blocks(monkeypatch) -> None:
+    # Anthropic replies keep their tool_use blocks in the content list.
+    reply = AIMessage(
+        content=[
+            {"type": "text", "text": "Best guess so far."},
+            {"type": "tool_use", "id": "call-1", "name": "search", "input": {}},
+        ],
+        id="ai-1",
+        tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+    )
+
+    class Model:
+        async def ainvoke(self, prompt):
+            return reply
+
+    graph_module = importlib.import_module("react_agent.graph")
+    monkeypatch.setattr(graph_module, "load_bound_chat_model", lambda *_, **__: Model())
+    monkeypatch.setattr(
+        STEP_ESTIMATOR,
+        "allows_tool_round",
+        lambda deadline, before_model_call: before_model_call,
+    )
+
+    update = await graph_module.call_model(
+        State(messages=[HumanMessage(content="hi")]),
+        Runtime(context=Context(deadline=time.time() + 30)),
+    )
+
+    [answer] = update["messages"]
+    assert answer.content == "Best guess so far." and not answer.tool_calls
@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.admission import AdmissionController
+from react_agent.jobs import Job, SQLiteJobQueue, WorkerPool
+from src.api import direct_fastapi_app
+from src.api.direct_fastapi_app import app
+from tests.unit_tests.conftest import sse_events
+
+
+def test_queue_claims_by_priority_and_recovers_running_jobs(tmp_path) -> None:
+    path = str(tmp_path / "jobs.sqlite")
+    queue = SQLiteJobQueue(path)
+    low = queue.submit({"n": 1})
+    high = queue.submit({"n": 2}, priority=5)
+
+    claimed = queue.claim()
+    assert claimed is not None and claimed.id == high.id
+    queue.close()
+
+    # Once its heartbeat is stale, the job that was running goes back in the queue.
+    reopened = SQLiteJobQueue(path, heartbeat_timeout=0)
+    assert reopened.recover() == 1
+    assert [reopened.claim().id, reopened.claim().id] == [high.id, low.id]
+    assert reopened.claim() is None
+    assert reopened.get(high.id).attempts == 2
+
+
+def test_recover_skips_live_jobs_and_fails_after_max_attempts(tmp_path) -> None:
+    path = str(tmp_path / "jobs.sqlite")
+    worker = SQLiteJobQueue(path)
+    sibling = SQLiteJobQueue(path, heartbeat_timeout=0.05, max_attempts=2)
+    job = worker.submit({"n": 1})
+    worker.claim()
+
+    # A sibling sharing the file leaves a job with a fresh heartbeat alone.
+    worker.heartbeat([job.id])
+    assert SQLiteJobQueue(path).recover() == 0
+    assert worker.get(job.id).status == "running"
+
+    time.sleep(0.1)
+    assert sibling.recover() == 1
+    assert sibling.claim().owner == sibling.owner
+    # The presumed-dead owner can no longer record an outcome.
+    assert not worker.finish(job.id, "succeeded", result={})
+
+    time.sleep(0.1)
+    assert sibling.recover() == 0
+    failed = sibling.get(job.id)
+    assert (failed.status, failed.error) == ("failed", "abandoned after 2 attempts")
+
+
+@pytest.mark.asyncio
+async def test_pool_isolates_failures_and_cancels_running_jobs() -> None:
+    release = asyncio.Event()
+
+    async def handler(job, emit):
+        if job.payload["kind"] == "fail":
+            raise RuntimeError("boom")
+        if job.payload["kind"] == "block":
+            await release.wait()
+        emit({"type": "progress"})
+        return {"ok": True}
+
+    pool = WorkerPool(SQLiteJobQueue(":memory:"), handler, workers=2)
+    pool.start()
+    blocked = pool.submit({"kind": "block"})
+    failed = pool.submit({"kind": "fail"})
+    await asyncio.sleep(0.05)
+    assert pool.cancel(blocked.id)
+    ok = pool.submit({"kind": "ok"})
+    events = [e["type"] async for e in pool.events.subscribe(ok.id)]
+    await pool.stop()
+
+    assert events == ["queued", "started", "progress", "done"]
+    assert pool.queue.get(ok.id).result == {"ok": True}
+    assert pool.queue.get(failed.id).error == "RuntimeError: boom"
+    assert pool.queue.get(blocked.id).status == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_job_does_not_report_done(tmp_path) -> None:
+    path = str(tmp_path / "jobs.sqlite")
+    sibling = SQLiteJobQueue(path, heartbeat_timeout=0)
+
+    async def handler(job, emit):
+        # Another process takes the job over while this one still runs it.
+        sibling.recover()
+        sibling.claim()
+        return {"ok": True}
+
+    pool = WorkerPool(SQLiteJobQueue(path), handler, workers=1)
+    pool.start()
+    job = pool.submit({})
+    for _ in range(100):
+        if pool.events.history(job.id)[-1]["type"] == "started":
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    await pool.stop()
+
+    assert [e["type"] for e in pool.events.history(job.id)] == ["queued", "started"]
+    assert sibling.get(job.id).status == "running"
+
+
+@pytest.mark.asyncio
+async def test_job_runs_wait_for_an_admission_slot(script_model, monkeypatch) -> None:
+    script_model(AIMessage(content="Done.", id="ai-1"))
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    monkeypatch.setattr(direct_fastapi_app, "admission", controller)
+    busy = await controller.acquire("openai/other")
+    job = Job(id="job-admit", payload={"message": "hi", "conversation_id": "job-admit"})
+
+    run = asyncio.ensure_future(direct_fastapi_app.run_chat_job(job, lambda e: None))
+    await asyncio.sleep(0.05)
+    assert not run.done() and controller.queued == 1
+
+    busy.release()
+    result = await asyncio.wait_for(run, timeout=5)
+    assert result["response"] == "Done." and controller.running == 0
+
+
+def test_job_api_runs_chat_in_background(
+    script_model, fake_search, monkeypatch, tmp_path
+) -> None:
+    monkeypatch.setenv("JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+        ),
+        AIMessage(content="Background answer.", id="ai-2"),
+    )
+
+    with TestClient(app) as client:
+        submitted = client.post(
+            "/api/jobs", json={"message": "hi", "conversation_id": "job-1"}
+        )
+        assert submitted.status_code == 202
+        job_id = submitted.json()["job_id"]
+        events = sse_events(client.get(f"/api/jobs/{job_id}/events").text)
+        deadline = time.monotonic() + 5
+        while client.get(f"/api/jobs/{job_id}").json()["status"] != "succeeded":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        job = client.get(f"/api/jobs/{job_id}").json()
+        history = client.get("/api/chat/history/job-1").json()["messages"]
+
+    assert [e["type"] for e in events] == [
+        "queued",
+        "started",
+        "tool_call",
+        "tool_result",
+        "done",
+    ]
+    assert job["result"]["response"] == "Background answer."
+    assert history[-1] == {"role": "assistant", "content": "Background answer."}
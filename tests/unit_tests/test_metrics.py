@@ -0,0 +1,48 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent import metrics
+from react_agent.metrics import Histogram
+from src.api.direct_fastapi_app import app
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("demo_seconds", "Demo.", (0.1, 1.0), ("node",))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(3, "a")
+
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{node="a",le="0.1"} 1',
+        'demo_seconds_bucket{node="a",le="1"} 2',
+        'demo_seconds_bucket{node="a",le="+Inf"} 3',
+        'demo_seconds_sum{node="a"} 3.55',
+        'demo_seconds_count{node="a"} 3',
+    ]
+
+
+def test_streamed_run_is_instrumented(script_model, fake_search) -> None:
+    for histogram in metrics.HISTOGRAMS:
+        histogram.clear()
+    script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+        ),
+        AIMessage(content="Done searching.", id="ai-2"),
+    )
+    client = TestClient(app)
+
+    client.post("/api/chat/stream", json={"message": "hi", "conversation_id": "m-1"})
+    body = client.get("/api/metrics").text
+
+    assert metrics.NODE_SECONDS.count("call_model") == 2
+    assert metrics.NODE_SECONDS.count("tools") == 1
+    assert metrics.TOOL_SECONDS.count("search") == 1
+    assert metrics.ITERATIONS.count() == 1
+    assert metrics.SSE_BYTES.count() == 1
+    assert 'react_agent_iterations_bucket{le="2"} 1' in body
+    assert "react_agent_time_to_first_token_seconds_count" in body
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, ToolMessage
+
+from react_agent import tools
+from src.api.direct_fastapi_app import app
+
+
+def test_multi_search_merges_queries_and_skips_slow_ones(
+    script_model, fake_search, monkeypatch
+) -> None:
+    original = fake_search.ainvoke
+
+    async def ainvoke(self, payload):
+        if payload["query"] == "slow":
+            await asyncio.sleep(5)
+        return await original(self, payload)
+
+    monkeypatch.setattr(fake_search, "ainvoke", ainvoke)
+    monkeypatch.setattr(tools, "MULTI_SEARCH_QUERY_TIMEOUT", 0.05)
+    model = script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[
+                {
+                    "name": "multi_search",
+                    "args": {"queries": ["langchain", "founder", "slow", " LangChain"]},
+                    "id": "call-1",
+                }
+            ],
+        ),
+        AIMessage(content="Merged.", id="ai-2"),
+    )
+
+    response = TestClient(app).post(
+        "/api/chat", json={"message": "hi", "conversation_id": "multi-1"}
+    )
+
+    assert response.json()["response"] == "Merged."
+    assert sorted(fake_search.calls) == ["founder", "langchain"]
+    [tool_message] = [m for m in model.received[-1] if isinstance(m, ToolMessage)]
+    payload = json.loads(tool_message.content)
+    assert payload["queries"] == ["langchain", "founder", "slow"]
+    assert payload["failed_queries"] == ["slow"]
+    assert [r["url"] for r in payload["results"]] == ["https://example.com/langchain"]
+
+
+def test_queued_queries_are_timed_only_once_they_start(
+    script_model, fake_search, monkeypatch
+) -> None:
+    original = fake_search.ainvoke
+    in_flight, peak = 0, 0
+
+    async def ainvoke(self, payload):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            if payload["query"] == "slow":
+                await asyncio.sleep(0.3)
+            if payload["query"] == "broken":
+                return {"error": "quota exceeded"}
+            await asyncio.sleep(0.03)
+            return await original(self, payload)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(fake_search, "ainvoke", ainvoke)
+    monkeypatch.setattr(tools, "MULTI_SEARCH_QUERY_TIMEOUT", 0.05)
+    monkeypatch.setattr(tools, "MULTI_SEARCH_CONCURRENCY", 1)
+    model = script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[
+                {
+                    "name": "multi_search",
+                    "args": {"queries": ["slow", "broken", "fast", "later"]},
+                    "id": "call-1",
+                }
+            ],
+        ),
+        AIMessage(content="Done.", id="ai-2"),
+    )
+
+    TestClient(app).post(
+        "/api/chat", json={"message": "hi", "conversation_id": "multi-2"}
+    )
+
+    # Each query waits for the single slot, then gets the full timeout.
+    assert peak == 1 and fake_search.calls == ["fast", "later"]
+    [tool_message] = [m for m in model.received[-1] if isinstance(m, ToolMessage)]
+    payload = json.loads(tool_message.content)
+    assert payload["failed_queries"] == ["slow", "broken"]
+    assert [r["url"] for r in payload["results"]] == ["https://example.com/langchain"]
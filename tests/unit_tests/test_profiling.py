@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.profiling import Profile, current_profile, profile_section
+from src.api.direct_fastapi_app import app
+from tests.unit_tests.conftest import sse_events
+
+
+@pytest.mark.asyncio
+async def test_profile_records_sections_only_while_active() -> None:
+    profile = Profile("unit", lag_interval=0.001, max_events=3)
+
+    with profile_section("before"):
+        pass
+    profile.start()
+    with profile_section("first", "io"), profile_section("nested", "io"):
+        pass
+    profile.mark("point", "llm")
+    profile.mark("overflow", "llm")
+    await profile.stop()
+
+    assert current_profile() is None
+    assert [span.name for span in profile.spans] == ["nested", "first"]
+    assert profile.dropped >= 1
+    trace = profile.to_chrome_trace()
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    # Overlapping spans of one category land on different lanes.
+    assert len({e["tid"] for e in spans}) == 2
+    assert trace["otherData"]["span_ms_by_category"].keys() == {"io"}
+
+
+def test_chat_returns_inline_trace_when_requested(script_model, fake_search) -> None:
+    script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+        ),
+        AIMessage(content="Done.", id="ai-2"),
+        AIMessage(content="Unprofiled.", id="ai-3"),
+    )
+    client = TestClient(app)
+
+    profiled = client.post(
+        "/api/chat",
+        json={"message": "hi", "conversation_id": "p-1"},
+        headers={"X-Profile": "inline"},
+    )
+    plain = client.post("/api/chat", json={"message": "hi", "conversation_id": "p-0"})
+
+    assert plain.json()["profile"] is None
+    events = profiled.json()["profile"]["traceEvents"]
+    names = {e["name"] for e in events if e["ph"] == "X"}
+    assert {"call_model", "tools", "tool search", "search.compact"} <= names
+    assert "admission.wait" in names
+
+
+def test_stream_writes_trace_file_when_requested(
+    script_model, fake_search, monkeypatch, tmp_path
+) -> None:
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    script_model(AIMessage(content="Done.", id="ai-1"))
+
+    response = TestClient(app).post(
+        "/api/chat/stream",
+        json={"message": "hi", "conversation_id": "p-2"},
+        headers={"X-Profile": "file"},
+    )
+
+    events = sse_events(response.text)
+    assert [e["type"] for e in events][-2:] == ["profile", "done"]
+    path = events[-2]["profile"]["path"]
+    trace = json.loads(open(path).read())
+    assert any(e["name"] == "call_model" for e in trace["traceEvents"])
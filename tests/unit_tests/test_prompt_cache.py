@@ -0,0 +1,97 @@
+import sys
+from datetime import UTC, datetime
+from typing import Any, List
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from react_agent import utils
+from react_agent.prompt_cache import (
+    PromptCacheStats,
+    build_system_content,
+    truncate_time,
+)
+
+NOW = datetime(2024, 11, 13, 23, 50, 53, 832822, tzinfo=UTC)
+
+
+def test_truncate_time() -> None:
+    assert truncate_time(NOW, "minute").isoformat() == "2024-11-13T23:50:00+00:00"
+    assert truncate_time(NOW, "day").isoformat() == "2024-11-13T00:00:00+00:00"
+    assert truncate_time(NOW, "microsecond") == NOW
+
+
+def test_system_content_splits_stable_prefix() -> None:
+    template = "You are helpful.\n\nSystem time: {system_time}"
+    assert build_system_content(template, "T") == "You are helpful.\n\nSystem time: T"
+    assert build_system_content(template, "T", cache_breakpoint=True) == [
+        {
+            "type": "text",
+            "text": "You are helpful.\n\nSystem time: ",
+            "cache_control": {"type": "ephemeral"},
+        },
+        {"type": "text", "text": "T"},
+    ]
+
+
+def test_stats_hit_rate() -> None:
+    stats = PromptCacheStats()
+    stats.record(
+        AIMessage(
+            content="",
+            usage_metadata={
+                "input_tokens": 1000,
+                "output_tokens": 10,
+                "total_tokens": 1010,
+                "input_token_details": {"cache_read": 750},
+            },
+        )
+    )
+    stats.record(AIMessage(content=""))
+    assert stats.calls == 1
+    assert stats.hit_rate == 0.75
+
+
+class BindingModel:
+    """Records the tool schemas it is bound with."""
+
+    def __init__(self) -> None:
+        self.bound: List[Any] = []
+
+    def bind_tools(self, tools: List[Any]) -> "BindingModel":
+        self.bound = tools
+        return self
+
+
+def bind(monkeypatch: pytest.MonkeyPatch, tools: tuple) -> List[Any]:
+    model = BindingModel()
+    monkeypatch.setattr(utils, "_build_chat_model", lambda *_: model)
+    # Bypass the cache of bound models, which would outlive the monkeypatch.
+    utils._bind_chat_model.__wrapped__("anthropic/claude", None, None, tools, True)
+    return model.bound
+
+
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+def fetch(url: str) -> str:
+    """Fetch a page."""
+    return url
+
+
+def test_only_the_last_tool_carries_the_breakpoint(monkeypatch) -> None:
+    pytest.importorskip("langchain_anthropic")
+
+    schemas = bind(monkeypatch, (lookup, fetch))
+
+    assert [schema["name"] for schema in schemas] == ["lookup", "fetch"]
+    assert "cache_control" not in schemas[0]
+    assert schemas[1]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_tool_breakpoint_is_skipped_without_the_anthropic_extra(monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "langchain_anthropic.chat_models", None)
+
+    assert bind(monkeypatch, (lookup, fetch)) == [lookup, fetch]
@@ -0,0 +1,99 @@
+import time
+
+import httpx
+import pytest
+
+from react_agent import rate_limit, tools
+from react_agent.rate_limit import RateLimiter, install_rate_limit_hooks, parse_reset
+
+
+def test_parse_reset_formats() -> None:
+    assert parse_reset("2") == 2.0
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("2024-11-13T23:51:29Z", now=1731541879.0) == 10.0
+
+
+@pytest.mark.asyncio
+async def test_buckets_follow_headers_and_pace_calls() -> None:
+    limiter = RateLimiter()
+    key = "anthropic/claude"
+    assert await limiter.acquire(key) == 0.0
+
+    limiter.observe(
+        key,
+        {
+            "anthropic-ratelimit-requests-limit": "600",
+            "anthropic-ratelimit-requests-remaining": "0",
+            "anthropic-ratelimit-tokens-limit": "400000",
+        },
+    )
+    assert limiter.as_dict()[key]["requests_per_minute"] == 600
+    assert limiter.as_dict()[key]["tokens_per_minute"] == 400000
+
+    started = time.monotonic()
+    await limiter.acquire(key)
+    assert time.monotonic() - started >= 0.09
+    assert limiter.as_dict()[key]["waits"] == 1
+
+
+def test_429_pauses_key() -> None:
+    limiter = RateLimiter()
+    limiter.observe("openai/gpt", {"retry-after": "3"}, status_code=429)
+    limits = limiter.limits("openai/gpt")
+    assert limits.throttled == 1
+    assert limits.paused_until - time.monotonic() > 2.5
+
+
+@pytest.mark.asyncio
+async def test_hooks_key_calls_by_request_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    limiter = RateLimiter()
+    monkeypatch.setattr(rate_limit, "RATE_LIMITER", limiter)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers = {"x-ratelimit-limit-requests": "500"}
+        return httpx.Response(200, headers=headers, json={})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        install_rate_limit_hooks(client, "openai")
+        install_rate_limit_hooks(client, "openai")
+        assert len(client.event_hooks["request"]) == 1
+        await client.post("https://api.test/v1/chat", json={"model": "gpt-4o-mini"})
+
+    assert limiter.as_dict()["openai/gpt-4o-mini"]["requests_per_minute"] == 500
+
+
+@pytest.mark.asyncio
+async def test_tavily_429_pauses_search(fake_search, monkeypatch: pytest.MonkeyPatch) -> None:
+    limiter = RateLimiter()
+    monkeypatch.setattr(tools, "RATE_LIMITER", limiter)
+    request = httpx.Request("POST", "https://api.tavily.com/search")
+    response = httpx.Response(429, headers={"Retry-After": "5"}, request=request)
+    errors = [
+        # What the aiohttp client inside TavilySearch reports: no headers.
+        Exception("Error 429: Too Many Requests"),
+        httpx.HTTPStatusError("throttled", request=request, response=response),
+        Exception("Error 500: Internal Server Error"),
+    ]
+
+    async def ainvoke(self, payload):
+        return {"error": errors.pop(0)}
+
+    monkeypatch.setattr(fake_search, "ainvoke", ainvoke)
+    limits = limiter.limits(tools.SEARCH_RATE_LIMIT_KEY)
+
+    with pytest.raises(tools.SearchError):
+        await tools._cached_search("langchain", 5)
+    assert limits.throttled == 1
+    assert 0.5 < limits.paused_until - time.monotonic() <= 1.0
+
+    limits.paused_until = 0.0
+    with pytest.raises(tools.SearchError):
+        await tools._cached_search("langchain", 5)
+    assert limits.throttled == 2
+    assert limits.paused_until - time.monotonic() > 4.5
+
+    limits.paused_until = 0.0
+    with pytest.raises(tools.SearchError):
+        await tools._cached_search("langchain", 5)
+    assert limits.throttled == 2 and limits.paused_until == 0.0
@@ -0,0 +1,97 @@
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.cache import SQLiteCacheBackend, TTLCache
+from react_agent.context import Context
+from react_agent.deadline import STEP_ESTIMATOR
+from react_agent.response_cache import response_cache_key
+from src.api import direct_fastapi_app
+from src.api.direct_fastapi_app import app
+from tests.unit_tests.conftest import sse_events
+
+
+def test_key_ignores_case_spacing_and_final_punctuation() -> None:
+    context = Context()
+
+    key = response_cache_key("What is  LangGraph?", context)
+
+    assert response_cache_key(" what is langgraph ", context) == key
+    assert response_cache_key("What is LangChain?", context) != key
+    assert response_cache_key("What is LangGraph?", Context(model="openai/gpt-4.1")) != key
+
+
+def test_first_turns_are_served_from_cache(script_model, monkeypatch, tmp_path) -> None:
+    cache = TTLCache(ttl=60, backend=SQLiteCacheBackend(str(tmp_path / "responses.sqlite")))
+    monkeypatch.setattr(direct_fastapi_app, "response_cache", cache)
+    model = script_model(
+        AIMessage(content="A graph library.", id="ai-1"),
+        AIMessage(content="Fresh answer.", id="ai-2"),
+        AIMessage(content="Follow-up answer.", id="ai-3"),
+    )
+    client = TestClient(app)
+
+    def chat(conversation_id: str, message: str = "What is LangGraph?", **kwargs):
+        return client.post(
+            "/api/chat",
+            json={"message": message, "conversation_id": conversation_id},
+            **kwargs,
+        ).json()
+
+    assert chat("rc-1")["cached"] is False
+    hit = chat("rc-2", "what is langgraph")
+    assert (hit["response"], hit["cached"]) == ("A graph library.", True)
+
+    body = client.post(
+        "/api/chat/stream",
+        json={"message": "What is LangGraph?", "conversation_id": "rc-3"},
+    ).text
+    events = sse_events(body)
+    assert [e["type"] for e in events] == ["start", "content", "done"]
+    assert events[-1]["cached"] and events[-1]["full_response"] == "A graph library."
+
+    assert chat("rc-4", headers={"X-Response-Cache": "bypass"})["response"] == "Fresh answer."
+    # A cached first turn is part of the conversation the next turn sees.
+    assert chat("rc-2", "Tell me more")["response"] == "Follow-up answer."
+    assert [m.content for m in model.received[-1][1:]] == [
+        "what is langgraph",
+        "A graph library.",
+        "Tell me more",
+    ]
+    assert len(model.received) == 3
+
+    stats = client.get("/api/health").json()["response_cache"]
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    # The answer survives a restart through the SQLite backend.
+    restarted = TTLCache(ttl=60, backend=SQLiteCacheBackend(str(tmp_path / "responses.sqlite")))
+    assert restarted.get(response_cache_key("What is LangGraph?", Context())) == {
+        "response": "Fresh answer."
+    }
+
+
+def test_answers_cut_short_by_the_deadline_are_not_cached(
+    script_model, fake_search, monkeypatch
+) -> None:
+    monkeypatch.setattr(direct_fastapi_app, "response_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(STEP_ESTIMATOR, "min_samples", 10**9)
+    search_call = AIMessage(
+        content="Best guess so far.",
+        id="ai-1",
+        tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+    )
+    script_model(
+        search_call,
+        AIMessage(content="Rushed answer.", id="ai-2"),
+        AIMessage(content="Full answer.", id="ai-3"),
+    )
+    client = TestClient(app)
+    rushed = {"message": "What is LangGraph?", "deadline_seconds": 1}
+
+    dropped = client.post("/api/chat", json={**rushed, "conversation_id": "cut-1"})
+    assert dropped.json()["response"] == "Best guess so far."
+    forced = client.post("/api/chat/stream", json={**rushed, "conversation_id": "cut-2"})
+    assert "Rushed answer." in forced.text
+
+    fresh = client.post(
+        "/api/chat", json={"message": "What is LangGraph?", "conversation_id": "cut-3"}
+    ).json()
+    assert (fresh["response"], fresh["cached"]) == ("Full answer.", False)
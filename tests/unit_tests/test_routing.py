@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from react_agent.metrics import Histogram
+from react_agent.routing import MODEL_ROUTER, Candidate, ModelRouter
+from src.api.direct_fastapi_app import app
+from tests.unit_tests.conftest import sse_events
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeStream:
+    """Streams `text` word by word after `delay` seconds, or raises `error`."""
+
+    def __init__(self, text: str = "", delay: float = 0.0, error=None) -> None:
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.tokens = []
+        self.cancelled = False
+
+    async def astream(self, input):
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            for word in self.text.split(" "):
+                self.tokens.append(word)
+                yield AIMessageChunk(content=word)
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def router(**kwargs) -> ModelRouter:
+    ttft = Histogram("ttft_seconds", "Demo.", (0.1, 1.0), ("model",))
+    return ModelRouter(hedge_default_seconds=0.02, ttft=ttft, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_and_cancels_the_slow_primary() -> None:
+    slow, fast = FakeStream("slow", delay=5), FakeStream("fast answer")
+
+    response = await router().ainvoke(
+        [Candidate("a/slow", slow, []), Candidate("b/fast", fast, [])]
+    )
+
+    assert response.content == "fastanswer"
+    assert slow.cancelled and slow.tokens == []
+    routing = response.response_metadata["routing"]
+    assert routing["primary"] == "a/slow" and routing["model"] == "b/fast"
+    assert routing["hedged"] and routing["hedge_after_seconds"] == 0.02
+
+
+@pytest.mark.asyncio
+async def test_fails_over_on_429_but_not_on_client_errors() -> None:
+    response = await router(hedge_quantile=0).ainvoke(
+        [
+            Candidate("a/limited", FakeStream(error=StatusError(429)), []),
+            Candidate("b/broken", FakeStream(error=StatusError(503)), []),
+            Candidate("c/ok", FakeStream("ok"), []),
+        ]
+    )
+    routing = response.response_metadata["routing"]
+    assert routing["model"] == "c/ok" and not routing["hedged"]
+    assert [f["status_code"] for f in routing["failovers"]] == [429, 503]
+
+    with pytest.raises(StatusError):
+        await router(hedge_quantile=0).ainvoke(
+            [
+                Candidate("a/bad-request", FakeStream(error=StatusError(400)), []),
+                Candidate("b/ok", FakeStream("ok"), []),
+            ]
+        )
+
+
+@pytest.mark.asyncio
+async def test_client_error_of_one_racer_waits_for_the_other() -> None:
+    primary = FakeStream(error=StatusError(400), delay=0.05)
+    backup = FakeStream("ok", delay=0.1)
+    spare = FakeStream("spare")
+
+    response = await router().ainvoke(
+        [
+            Candidate("a/bad-request", primary, []),
+            Candidate("b/slow", backup, []),
+            Candidate("c/spare", spare, []),
+        ]
+    )
+
+    routing = response.response_metadata["routing"]
+    assert response.content == "ok" and routing["model"] == "b/slow"
+    assert [f["status_code"] for f in routing["failovers"]] == [400]
+    # A client error is not failed over to models that were not racing yet.
+    assert spare.tokens == []
+
+    with pytest.raises(StatusError):
+        await router().ainvoke(
+            [
+                Candidate("a/bad-request", primary, []),
+                Candidate(
+                    "b/broken", FakeStream(error=StatusError(503), delay=0.1), []
+                ),
+                Candidate("c/spare", spare, []),
+            ]
+        )
+    assert spare.tokens == []
+
+
+def test_streamed_answer_reports_routing(script_model, monkeypatch) -> None:
+    script_model(AIMessage(content="Routed answer.", id="ai-1"))
+    monkeypatch.setattr(
+        MODEL_ROUTER, "fallbacks", {"openai/gpt-4o-mini": ["openai/gpt-4.1-mini"]}
+    )
+    client = TestClient(app)
+
+    body = client.post(
+        "/api/chat/stream", json={"message": "hi", "conversation_id": "route-1"}
+    ).text
+    events = sse_events(body)
+
+    content = "".join(e["content"] for e in events if e["type"] == "content")
+    assert content == "Routed answer."
+    [routing] = events[-1]["routing"]
+    assert routing["model"] == "openai/gpt-4o-mini" and not routing["hedged"]
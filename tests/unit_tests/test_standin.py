@@ -0,0 +1,58 @@
+import glob
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+from react_agent.tools import TOOLS
+from tests.standin.server import Cassette, Settings, create_app
+
+
+def _model(app) -> ChatOpenAI:
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        api_key="sk-test",
+        base_url="http://standin/v1",
+        http_async_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        max_retries=0,
+        stream_usage=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_openai_client_streams_scripted_tool_call() -> None:
+    app = create_app(Settings(first_token_latency=0, search_rounds=1))
+    model = _model(app).bind_tools(TOOLS)
+
+    chunks = [c async for c in model.astream([HumanMessage(content="who founded x?")])]
+    message = chunks[0]
+    for c in chunks[1:]:
+        message += c
+
+    assert message.tool_calls[0]["name"] == "search"
+    assert message.tool_calls[0]["args"] == {"query": "who founded x?"}
+    assert message.usage_metadata["input_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_replays_cassette_replies() -> None:
+    cassette = Cassette(glob.glob("tests/cassettes/*.yaml"))
+    app = create_app(Settings(first_token_latency=0), cassette)
+
+    reply = await _model(app).bind_tools(TOOLS).ainvoke([HumanMessage(content="hi")])
+
+    assert reply.tool_calls[0]["args"] == {"query": "founder of LangChain"}
+    assert "Harrison Chase" in str(cassette.search("founder of LangChain"))
+
+
+def test_quota_answers_429_with_headers() -> None:
+    client = TestClient(create_app(Settings(first_token_latency=0, requests_per_minute=1)))
+    body = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    assert client.post("/v1/chat/completions", json=body).status_code == 200
+    limited = client.post("/v1/chat/completions", json=body)
+    assert limited.status_code == 429
+    assert limited.headers["x-ratelimit-remaining-requests"] == "0"
+    assert float(limited.headers["retry-after"]) > 0
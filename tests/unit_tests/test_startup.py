@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from react_agent.startup import StartupStatus
+from src.api import direct_fastapi_app
+from src.api.direct_fastapi_app import app
+
+CHECK_DEFERRED = """
+import sys
+import react_agent.graph
+assert sys.modules["react_agent.graph"].compile_graph.cache_info().currsize == 0
+assert "langchain_tavily" not in sys.modules
+assert "langchain.chat_models" not in sys.modules
+from react_agent import graph
+assert graph.name == "ReAct Agent"
+"""
+
+
+def test_importing_the_graph_defers_compilation_and_providers() -> None:
+    subprocess.run([sys.executable, "-c", CHECK_DEFERRED], check=True)
+
+
+def wait_for_warm_up(client: TestClient) -> dict:
+    for _ in range(500):
+        body = client.get("/api/ready").json()
+        if body["ready_after_seconds"] is not None:
+            return body
+        time.sleep(0.01)
+    raise TimeoutError("warm-up did not finish")
+
+
+def test_ready_only_after_providers_are_imported(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("JOB_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(direct_fastapi_app, "startup", StartupStatus())
+
+    client = TestClient(app)
+    assert client.get("/api/health").status_code == 200
+    response = client.get("/api/ready")
+    assert (response.status_code, response.json()["status"]) == (503, "starting")
+
+    monkeypatch.setenv("WARMUP_MODELS", "openai/gpt-4o-mini")
+    with TestClient(app) as client:
+        body = wait_for_warm_up(client)
+        assert client.get("/api/ready").status_code == 200
+    assert body["status"] == "ready" and "langchain_openai" in body["preloaded"]
+
+    # A model whose integration is not installed keeps the process unready.
+    monkeypatch.setattr(direct_fastapi_app, "startup", StartupStatus())
+    monkeypatch.setenv("WARMUP_MODELS", "openai/gpt-4o-mini,nosuchprovider/model")
+    with TestClient(app) as client:
+        body = wait_for_warm_up(client)
+        assert client.get("/api/ready").status_code == 503
+    assert body["status"] == "failed" and list(body["errors"]) == ["nosuchprovider/model"]
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.cancellation import CANCELLATION_STATS
+from react_agent.sse import RunStream, StreamRegistry, coalesce
+from src.api import direct_fastapi_app
+from src.api.direct_fastapi_app import (
+    ChatRequest,
+    admit_run,
+    app,
+    conversation_store,
+    produce_stream,
+)
+from tests.unit_tests.conftest import sse_events
+
+
+def test_stream_emits_model_tokens(script_model) -> None:
+    script_model(AIMessage(content="Harrison Chase founded LangChain.", id="ai-1"))
+    client = TestClient(app)
+
+    resp = client.post(
+        "/api/chat/stream", json={"message": "hi", "conversation_id": "stream-1"}
+    )
+
+    events = sse_events(resp.text)
+    tokens = [e["content"] for e in events if e["type"] == "content"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Harrison Chase founded LangChain."
+    assert events[-1]["type"] == "done"
+    assert events[-1]["full_response"] == "Harrison Chase founded LangChain."
+
+
+def test_stream_runs_each_tool_call_once(script_model, fake_search) -> None:
+    script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[
+                {"name": "search", "args": {"query": "langchain founder"}, "id": "call-1"}
+            ],
+        ),
+        AIMessage(content="Harrison Chase.", id="ai-2"),
+    )
+    client = TestClient(app)
+
+    resp = client.post(
+        "/api/chat/stream", json={"message": "who?", "conversation_id": "stream-2"}
+    )
+
+    events = sse_events(resp.text)
+    assert fake_search.calls == ["langchain founder"]
+    tool_results = [e for e in events if e["type"] == "tool_result"]
+    assert [e["tool_call_id"] for e in tool_results] == ["call-1"]
+    assert "Harrison Chase" in tool_results[0]["content"]
+    assert events[-1]["full_response"] == "Harrison Chase."
+    assert events[-1]["tool_output_savings"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_cancels_running_graph(
+    script_model, fake_search, monkeypatch
+) -> None:
+    async def hang(self, payload):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(fake_search, "ainvoke", hang)
+    script_model(
+        AIMessage(
+            content="",
+            id="ai-1",
+            tool_calls=[{"name": "search", "args": {"query": "q"}, "id": "call-1"}],
+        ),
+    )
+
+    # Nobody follows the run, so it is given up on once the grace period passes.
+    registry = StreamRegistry(grace=0)
+    monkeypatch.setattr(direct_fastapi_app, "stream_registry", registry)
+    monkeypatch.setattr(direct_fastapi_app, "coalesce_settings", lambda: (0, 0))
+    cancelled_before = CANCELLATION_STATS.cancelled_runs
+    request = ChatRequest(message="hi", conversation_id="stream-cancel")
+    stream = registry.create()
+    ticket = await admit_run(request.model)
+    await asyncio.wait_for(produce_stream(stream, request, ticket), timeout=5)
+
+    frames = "".join(frame for _, frame in stream.frames)
+    assert [e["type"] for e in sse_events(frames)] == ["start", "tool_call"]
+    assert stream.closed and ticket.released
+    assert CANCELLATION_STATS.cancelled_runs == cancelled_before + 1
+    assert conversation_store.get("stream-cancel") == [
+        {"role": "human", "content": "hi"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_finished_stream_stops_watching_for_abandonment(
+    script_model, monkeypatch
+) -> None:
+    script_model(AIMessage(content="done", id="ai-1"))
+    registry = StreamRegistry(grace=60)
+    monkeypatch.setattr(direct_fastapi_app, "stream_registry", registry)
+    request = ChatRequest(message="hi", conversation_id="stream-finished")
+    stream = registry.create()
+    ticket = await admit_run(request.model)
+    await asyncio.wait_for(produce_stream(stream, request, ticket), timeout=5)
+    await asyncio.sleep(0)
+
+    watchers = [
+        task
+        for task in asyncio.all_tasks()
+        if task.get_coro().__qualname__ == "StreamRegistry.abandoned"
+    ]
+    assert stream.closed and watchers == []
+
+
+@pytest.mark.asyncio
+async def test_follower_that_falls_behind_the_buffer_gets_a_gap() -> None:
+    stream = RunStream("run", max_events=2)
+    follower = stream.follow()
+    stream.publish({"type": "start"})
+    assert "id: run:1" in await anext(follower)
+
+    # Three more events push the first unread one out of the buffer.
+    for n in range(3):
+        stream.publish({"type": "content", "content": str(n)})
+    gap = await anext(follower)
+
+    assert sse_events(gap) == [{"type": "gap", "last_event_id": "run:1"}]
+    assert not gap.startswith("id:")
+    assert not stream.can_resume(1)
+    with pytest.raises(StopAsyncIteration):
+        await anext(follower)
+    assert stream.followers == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_batches_tokens_between_other_events() -> None:
+    async def events():
+        yield {"type": "start"}
+        for token in ["a", "b", "c"]:
+            yield {"type": "content", "content": token}
+        yield {"type": "tool_call", "tools": []}
+        await asyncio.sleep(0.05)
+        yield {"type": "content", "content": "d"}
+
+    merged = [e async for e in coalesce(events(), window=1.0, max_bytes=1024)]
+
+    assert merged == [
+        {"type": "start"},
+        {"type": "content", "content": "a"},
+        {"type": "content", "content": "bc"},
+        {"type": "tool_call", "tools": []},
+        {"type": "content", "content": "d"},
+    ]
+
+
+def test_stream_resumes_from_last_event_id(script_model) -> None:
+    script_model(AIMessage(content="one two three four", id="ai-1"))
+    client = TestClient(app)
+
+    first = client.post(
+        "/api/chat/stream", json={"message": "hi", "conversation_id": "resume-1"}
+    )
+    ids = [
+        line[len("id: ") :]
+        for line in first.text.splitlines()
+        if line.startswith("id: ")
+    ]
+    # Reconnecting after the second event replays the rest without rerunning the graph.
+    resumed = client.post(
+        "/api/chat/stream",
+        json={"message": "hi", "conversation_id": "resume-1"},
+        headers={"Last-Event-ID": ids[1]},
+    )
+
+    assert first.headers["content-type"].startswith("text/event-stream")
+    assert ids[0].startswith(first.headers["X-Run-Id"] + ":")
+    assert sse_events(resumed.text) == sse_events(first.text)[2:]
+    assert sse_events(resumed.text)[-1]["full_response"] == "one two three four"
+    missing = client.post(
+        "/api/chat/stream",
+        json={"message": "hi"},
+        headers={"Last-Event-ID": "unknown-run:3"},
+    )
+    assert missing.status_code == 404
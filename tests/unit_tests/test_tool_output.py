@@ -0,0 +1,60 @@
+from react_agent.tool_output import (
+    compact_search_results,
+    merge_search_results,
+    track_request,
+)
+
+RAW = {
+    "query": "langchain founder",
+    "follow_up_questions": None,
+    "answer": None,
+    "images": ["https://example.com/a.png"],
+    "response_time": 1.2,
+    "results": [
+        {
+            "url": "https://example.com/langchain/",
+            "title": "LangChain",
+            "content": "LangChain was founded by Harrison Chase. " * 50,
+            "score": 0.9,
+            "raw_content": None,
+        },
+        {
+            "url": "https://EXAMPLE.com/langchain#about",
+            "title": "LangChain (dup)",
+            "content": "duplicate",
+            "score": 0.8,
+        },
+        {
+            "url": "https://example.org/other",
+            "title": "Other",
+            "content": "Another page.",
+            "score": 0.5,
+        },
+    ],
+}
+
+
+def test_compaction_drops_unused_fields_and_duplicate_urls() -> None:
+    stats = track_request()
+
+    compacted = compact_search_results(RAW, max_result_tokens=20)
+
+    assert set(compacted) == {"query", "results"}
+    assert [r["title"] for r in compacted["results"]] == ["LangChain", "Other"]
+    assert set(compacted["results"][0]) == {"title", "url", "content"}
+    assert compacted["results"][0]["content"].endswith("[truncated]")
+    assert stats.calls == 1 and stats.bytes_saved > 0 and stats.tokens_saved > 0
+
+
+def test_compaction_total_budget_keeps_top_result() -> None:
+    compacted = compact_search_results(RAW, max_total_tokens=1)
+    assert [r["title"] for r in compacted["results"]] == ["LangChain"]
+
+
+def test_merge_ranks_pages_found_by_several_queries_first() -> None:
+    first = {"results": [{"url": "https://a.com", "score": 0.9}, {"url": "https://b.com/"}]}
+    second = {"results": [{"url": "https://c.com", "score": 0.99}, {"url": "https://B.com"}]}
+
+    merged = merge_search_results([first, second])
+
+    assert [r["url"] for r in merged] == ["https://b.com/", "https://c.com", "https://a.com"]
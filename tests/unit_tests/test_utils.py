@@ -0,0 +1,40 @@
+import pytest
+
+from react_agent.tools import TOOLS
+from react_agent.utils import (
+    clear_chat_model_cache,
+    load_bound_chat_model,
+    load_chat_model,
+)
+
+
+@pytest.fixture(autouse=True)
+def _openai_env(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:9999/v1")
+    clear_chat_model_cache()
+    yield
+    clear_chat_model_cache()
+
+
+def test_chat_model_is_reused() -> None:
+    assert load_chat_model("openai/gpt-4o-mini") is load_chat_model(
+        "openai/gpt-4o-mini"
+    )
+    assert load_bound_chat_model("openai/gpt-4o-mini", TOOLS) is (
+        load_bound_chat_model("openai/gpt-4o-mini", TOOLS)
+    )
+
+
+def test_chat_model_keyed_by_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    first = load_chat_model("openai/gpt-4o-mini")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:9998/v1")
+    assert load_chat_model("openai/gpt-4o-mini") is not first
+
+
+def test_chat_model_calls_go_through_rate_limiter() -> None:
+    from react_agent.rate_limit import rate_limit_hooks
+
+    model = load_chat_model("openai/gpt-4o-mini")
+    hooks = model.root_async_client._client.event_hooks  # type: ignore[attr-defined]
+    assert rate_limit_hooks("openai")["request"][0] in hooks["request"]
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from react_agent.multiplex import Multiplexer
+from src.api.direct_fastapi_app import app
+
+
+@pytest.mark.asyncio
+async def test_runs_pause_until_acked_and_cancel_alone() -> None:
+    sent = []
+
+    async def send(text: str) -> None:
+        sent.append(json.loads(text))
+
+    def counting(stop):
+        async def events():
+            for i in range(5):
+                yield {"type": "content", "content": str(i)}
+
+        return events()
+
+    def hanging(stop):
+        async def events():
+            yield {"type": "start"}
+            await stop
+
+        return events()
+
+    mux = Multiplexer(send, window=2)
+    mux.start("a", counting)
+    mux.start("b", hanging)
+    await asyncio.sleep(0.01)
+    assert [m["seq"] for m in sent if m["request_id"] == "a"] == [1, 2]
+
+    mux.ack("a", 2)
+    assert mux.cancel("b")
+    await asyncio.sleep(0.01)
+
+    assert [m["seq"] for m in sent if m["request_id"] == "a"] == [1, 2, 3, 4]
+    assert [m["type"] for m in sent if m["request_id"] == "b"] == [
+        "start",
+        "cancelled",
+    ]
+    assert mux.active == 1
+    await mux.close()
+    assert mux.active == 0
+
+
+def test_websocket_multiplexes_conversations(script_model) -> None:
+    script_model(AIMessage(content="same answer"), AIMessage(content="same answer"))
+    client = TestClient(app)
+
+    with client.websocket_connect("/api/ws") as ws:
+        for conversation in ("ws-1", "ws-2"):
+            ws.send_json({"type": "chat", "message": "hi", "conversation_id": conversation})
+        ws.send_json({"type": "cancel", "request_id": "missing"})
+        events: dict = {}
+        while sum(e[-1]["type"] == "done" for e in events.values()) < 2:
+            message = ws.receive_json()
+            events.setdefault(message["request_id"], []).append(message)
+
+    assert events["missing"][0]["type"] == "error"
+    for conversation in ("ws-1", "ws-2"):
+        run = events[conversation]
+        assert [e["seq"] for e in run] == list(range(1, len(run) + 1))
+        assert run[0]["type"] == "start" and run[-1]["full_response"] == "same answer"